@@ -2,14 +2,20 @@ from __future__ import annotations
 
 import subprocess
 import sys
+import threading
 from pathlib import Path
 from typing import Tuple
 
+from util import perf
+
 
 # Путь к скрипту dl24.py из репозитория tshaddack/dl24
 DL24_SCRIPT = Path(__file__).resolve().parent / "dl24.py"
 
 
+PROBE_CMD = perf.probe("atorch.cmd")
+
+
 class AtorchDL24:
     """
     Обёртка вокруг dl24.py (tshaddack/dl24),
@@ -18,7 +24,7 @@ class AtorchDL24:
         - read_identity()
         - set_current()
         - get_current_set()
-        - measure_voltage(), measure_current()
+        - measure_voltage(), measure_current(), measure()
         - set_output(state), get_output()
     """
 
@@ -30,6 +36,9 @@ class AtorchDL24:
         self._is_open: bool = False
         self._output_state: bool = False
         self._last_set_current: float = 0.0
+        # опрос (планировщик) и уставки (GUI / прогон КПД) идут из разных
+        # потоков, а порт у dl24.py один — вызовы по очереди
+        self._lock = threading.Lock()
 
     # ----------------------------------------------------------------------
     # helpers
@@ -58,12 +67,15 @@ class AtorchDL24:
         ]
         args.extend(commands)
 
-        proc = subprocess.run(
-            args,
-            capture_output=True,
-            text=True,
-            timeout=self.timeout_s,
-        )
+        t0 = PROBE_CMD.start()
+        with self._lock:
+            proc = subprocess.run(
+                args,
+                capture_output=True,
+                text=True,
+                timeout=self.timeout_s,
+            )
+        PROBE_CMD.stop(t0)
 
         if proc.returncode != 0:
             raise RuntimeError(
@@ -117,6 +129,11 @@ class AtorchDL24:
         _, ma = self._read_mv_ma()
         return ma / 1000.0
 
+    def measure(self) -> Tuple[float, float]:
+        """(V, A) одним запуском dl24.py — опросу не нужны два процесса на отсчёт."""
+        mv, ma = self._read_mv_ma()
+        return mv / 1000.0, ma / 1000.0
+
     # ----------------------------------------------------------------------
     # current set
     # ----------------------------------------------------------------------
@@ -1,16 +1,33 @@
 # gui/layout.py
 from tkinter import Frame, TOP, BOTTOM, LEFT, RIGHT, BOTH, X, Y
 from mppt.gui import MPPTTerminalPanel
-from psu.gui import PSUControlPanel
 from gui.statusbar import StatusBar
-from rigol.gui import RigolControlPanel
+from gui.ui_queue import UiQueue
+from gui.ui_bus import UiBus
+from util.port_registry import get_registry
+from util.poll_scheduler import get_scheduler
+from util.telemetry import get_telemetry
+from util import perf
 
 class AppLayout(Frame):
+    # как часто обновлять строку опроса приборов (частота / задержка), мс
+    POLL_STATS_INTERVAL_MS = 1000
+    # задание планировщика: история графиков из телеметрии, раз в секунду
+    PLOT_JOB = "plot"
+    PLOT_HISTORY_INTERVAL_S = 1.0
+
     def __init__(self, master, bg="#202124", fg="#e8eaed", **kwargs):
         super().__init__(master, bg=bg, **kwargs)
         self.bg = bg
         self.fg = fg
 
+        # Общая очередь фоновых шагов инициализации: панели рисуются сразу
+        # с заглушками, медленное (порты, VISA, пресеты, журнал) — в фоне
+        self.ui = UiQueue(self)
+        # Шина обновлений виджетов: фоновые потоки панелей (опрос приборов,
+        # ramp, reader MPPT, GitWorker) публикуют значения, Tk-поток применяет
+        self.bus = UiBus(self)
+
         # -------- верхняя панель с глобальными кнопками --------
         top_bar = Frame(self, bg=bg)
         top_bar.pack(side=TOP, fill=X)
@@ -28,33 +45,160 @@ class AppLayout(Frame):
         )
         self.btn_rescan_all.pack(side=LEFT, padx=4, pady=4)
 
+        # Переключатель многостанционного режима (N плат MPPT на N COM-портах)
+        self.btn_multi = Button(
+            top_bar,
+            text="Multi-station",
+            command=self._toggle_multi_station,
+            bg="#303134",
+            fg=fg,
+            activebackground="#3c4043",
+            activeforeground=fg
+        )
+        self.btn_multi.pack(side=LEFT, padx=4, pady=4)
+        self.station_grid = None  # создаётся при первом включении
+
+        # Запись телеметрии приборов (util.telemetry) в каталог сессии
+        self.btn_telemetry = Button(
+            top_bar,
+            text="Telemetry REC",
+            command=self._toggle_telemetry,
+            bg="#303134",
+            fg=fg,
+            activebackground="#3c4043",
+            activeforeground=fg
+        )
+        self.btn_telemetry.pack(side=LEFT, padx=4, pady=4)
+
+        # Графики V/I/P/КПД: история копится с запуска, окно — по кнопке
+        from gui.plot_panel import PlotHistory
+        self.plot_history = PlotHistory(get_telemetry())
+        get_scheduler().add(self.PLOT_JOB, self.plot_history.update, self.PLOT_HISTORY_INTERVAL_S)
+        self.plot_window = None  # создаётся при первом открытии
+        self.btn_plot = Button(
+            top_bar,
+            text="Plot",
+            command=self._toggle_plot,
+            bg="#303134",
+            fg=fg,
+            activebackground="#3c4043",
+            activeforeground=fg
+        )
+        self.btn_plot.pack(side=LEFT, padx=4, pady=4)
+
+        # Прогон КПД по сетке U ЛБП × I нагрузки (sweep.engine)
+        self.sweep_window = None  # создаётся при первом открытии
+        self.btn_sweep = Button(
+            top_bar,
+            text="Sweep",
+            command=self._open_sweep,
+            bg="#303134",
+            fg=fg,
+            activebackground="#3c4043",
+            activeforeground=fg
+        )
+        self.btn_sweep.pack(side=LEFT, padx=4, pady=4)
+
+        # Пробы производительности (util.perf) и их оверлей под верхней панелью
+        self.perf_overlay = None  # создаётся при первом включении
+        self.btn_perf = Button(
+            top_bar,
+            text="Perf",
+            command=self._toggle_perf,
+            bg="#303134",
+            fg=fg,
+            activebackground="#3c4043",
+            activeforeground=fg
+        )
+        self.btn_perf.pack(side=LEFT, padx=4, pady=4)
+        self._register_perf_gauges()
+
+        # Опрос приборов (util.poll_scheduler): достигнутая частота и задержка
+        from tkinter import Label
+        self.poll_stats_label = Label(top_bar, text="", bg=bg, fg="#80868b", font=("Consolas", 8))
+        self.poll_stats_label.pack(side=RIGHT, padx=4)
+        self.after(self.POLL_STATS_INTERVAL_MS, self._update_poll_stats)
+
         # -------- основной контейнер: слева MPPT, справа ЛБП --------
         main = Frame(self, bg=bg)
+        self._top_bar = top_bar
         main.pack(side=TOP, fill=BOTH, expand=True)
 
         # Панель MPPT терминала (слева)
-        self.mppt_panel = MPPTTerminalPanel(main, bg=bg, fg=fg)
+        self._main = main
+        self.mppt_panel = MPPTTerminalPanel(main, bg=bg, fg=fg, ui=self.ui, bus=self.bus)
         self.mppt_panel.pack(side=LEFT, fill=Y)
         self.mppt_panel.config(width=800)   # ← нужная ширина
 
 
+        # Панели приборов импортируются здесь, а не в шапке модуля: их бэкенды
+        # (pyvisa, owon_psu, list_ports) грузятся лениво/прогревом (util.warmup)
+        from rigol.gui import RigolControlPanel
+        from psu.gui import PSUControlPanel
+
         # Панель Rigol DL3021 (по центру справа)
-        self.rigol_panel = RigolControlPanel(main, bg=bg, fg=fg, width=320)
+        self.rigol_panel = RigolControlPanel(main, bg=bg, fg=fg, width=320, ui=self.ui, bus=self.bus)
         self.rigol_panel.pack(side=RIGHT, fill="y")
 
         # Панель ЛБП (Owon SPE6103) — самая правая
-        self.psu_panel = PSUControlPanel(main, bg=bg, fg=fg, width=320)
+        self.psu_panel = PSUControlPanel(main, bg=bg, fg=fg, width=320, ui=self.ui, bus=self.bus)
         self.psu_panel.pack(side=RIGHT, fill="y")
 
         # -------- общий статусбар приложения --------
         self.status = StatusBar(self, bg=bg, fg=fg)
         self.status.pack(side=BOTTOM, fill=X)
+        self.bus.bind("app.status", lambda st: self.status.set(st[0], color=st[1]))
 
         # Если панели умеют принимать глобальный статус — передадим
         if hasattr(self.mppt_panel, "set_global_status"):
-            self.mppt_panel.set_global_status(self.status.set)
+            self.mppt_panel.set_global_status(self.set_status)
         if hasattr(self.psu_panel, "set_global_status"):
-            self.psu_panel.set_global_status(self.status.set)
+            self.psu_panel.set_global_status(self.set_status)
+
+    def _register_perf_gauges(self):
+        """Очереди и опрос — датчики util.perf (считываются только при снимке)."""
+        ui, bus, hub, sched = self.ui, self.bus, get_telemetry(), get_scheduler()
+        perf.gauge("ui.queue", ui.pending)
+        perf.gauge("ui.bus", lambda: {k: v for k, v in bus.stats().items() if k in ("pending", "coalesced")})
+        perf.gauge(
+            "telemetry",
+            lambda: {
+                name: f"{s['pending']} ждут / {s['dropped']} потеряно"
+                for name, s in hub.stats()["sources"].items()
+                if s["written"]
+            },
+        )
+        perf.gauge(
+            "poll",
+            lambda: {
+                name: f"{s['rate_hz']:.1f}/s p95 {s['lat_p95_ms']:.0f} мс, пропусков {s['overruns']}"
+                for name, s in sched.stats().items()
+            },
+        )
+
+    def _toggle_perf(self):
+        """Включить пробы и показать оверлей / выключить и спрятать."""
+        if self.perf_overlay is not None and self.perf_overlay.winfo_ismapped():
+            self.perf_overlay.hide()
+            self.perf_overlay.pack_forget()
+            perf.enable(False)
+            self.btn_perf.config(bg="#303134")
+            return
+        if self.perf_overlay is None:
+            from gui.perf_overlay import PerfOverlay
+            self.perf_overlay = PerfOverlay(self, bg=self.bg, fg=self.fg, on_status=self.set_status)
+        perf.enable(True)
+        self.perf_overlay.pack(side=TOP, fill=X, after=self._top_bar)
+        self.perf_overlay.show()
+        self.btn_perf.config(bg="#1a73e8")
+
+    def _update_poll_stats(self):
+        self.poll_stats_label.config(text=get_scheduler().format_stats())
+        self.after(self.POLL_STATS_INTERVAL_MS, self._update_poll_stats)
+
+    def set_status(self, msg: str, color: str = "white"):
+        """Общий статусбар — из любого потока (через шину)."""
+        self.bus.set("app.status", (msg, color))
 
     # ============================================================
     #   Глобальные действия
@@ -62,17 +206,90 @@ class AppLayout(Frame):
 
     def _rescan_all_com(self):
         """
-        Глобальный рескан портов:
-        - ЛБП: обновить список COM
-        - MPPT: если в будущем появится метод rescan_ports(), тоже дернём.
+        Глобальный рескан портов: один опрос ОС в общем реестре
+        (util.port_registry) — все панели (MPPT, ЛБП, Atorch) получат
+        новый список через подписку.
         """
-        # ЛБП
-        if hasattr(self.psu_panel, "rescan_ports"):
-            self.psu_panel.rescan_ports()
-
-        # MPPT (на будущее, если добавим такой метод)
-        if hasattr(self.mppt_panel, "rescan_ports"):
-            self.mppt_panel.rescan_ports()
+        get_registry().rescan()
 
         # Отобразим в общем статусбаре
-        self.status.set("COM порты обновлены", color="cyan")
+        self.set_status("COM порты обновлены", color="cyan")
+
+    def _toggle_plot(self):
+        """Показать / спрятать окно живых графиков входа, выхода и КПД."""
+        if self.plot_window is None:
+            from gui.plot_panel import PlotWindow
+            self.plot_window = PlotWindow(self, self.plot_history, self.ui, bg=self.bg, fg=self.fg)
+            return
+        self.plot_window.toggle()
+
+    def _open_sweep(self):
+        """Окно прогона КПД (приборы — из панелей ЛБП и нагрузки)."""
+        if self.sweep_window is None:
+            from sweep.gui import SweepWindow
+            self.sweep_window = SweepWindow(
+                self, self.psu_panel, self.rigol_panel, self.ui, bg=self.bg, fg=self.fg
+            )
+            return
+        self.sweep_window.deiconify()
+        self.sweep_window.lift()
+
+    def _toggle_telemetry(self):
+        """Начать / закончить запись телеметрии ЛБП, нагрузки и кадров MPPT."""
+        hub = get_telemetry()
+        if hub.recording:
+            btn = self.btn_telemetry
+            btn.config(state="disabled")
+
+            def done(session):
+                btn.config(text="Telemetry REC", bg="#303134", state="normal")
+                self.set_status(f"Телеметрия сохранена: {session}", color="cyan")
+
+            def failed(e):
+                btn.config(text="Telemetry REC", bg="#303134", state="normal")
+                self.set_status(f"Телеметрия: ошибка записи: {e}", color="red")
+
+            # сброс хвоста — файловый ввод-вывод, не в Tk-потоке
+            self.ui.submit(hub.stop_session, on_done=done, on_error=failed, name="telemetry-stop")
+            return
+
+        try:
+            session = hub.start_session()
+        except OSError as e:
+            self.set_status(f"Телеметрия: не удалось начать запись: {e}", color="red")
+            return
+        self.btn_telemetry.config(text="Telemetry STOP", bg="#d93025")
+        self.set_status(f"Запись телеметрии: {session}", color="cyan")
+
+    def _toggle_multi_station(self):
+        """
+        Многостанционный режим: вместо одного MPPT-терминала — сетка станций,
+        по одной на каждый ST-Link VCP. Логгер общий (тот же, что у панели MPPT).
+        """
+        if self.station_grid is not None and self.station_grid.winfo_ismapped():
+            self.station_grid.stop()
+            self.station_grid.pack_forget()
+            self.mppt_panel.pack(side=LEFT, fill=Y, before=self.rigol_panel)
+            self.mppt_panel.resume()
+            self.btn_multi.config(text="Multi-station", bg="#303134")
+            self.set_status("Одностанционный режим MPPT", color="cyan")
+            return
+
+        if self.mppt_panel.logger is None:
+            self.set_status("Журнал MPPT ещё открывается — попробуйте через секунду", color="yellow")
+            return
+
+        from mppt.stations_gui import StationGridPanel
+
+        # одиночная панель отпускает свой COM-порт
+        self.mppt_panel.suspend()
+        self.mppt_panel.pack_forget()
+
+        if self.station_grid is None:
+            self.station_grid = StationGridPanel(
+                self._main, self.mppt_panel.logger, bg=self.bg, fg=self.fg, width=800
+            )
+        self.station_grid.pack(side=LEFT, fill=BOTH, expand=True, before=self.rigol_panel)
+        self.station_grid.start()
+        self.btn_multi.config(text="Single-station", bg="#1a73e8")
+        self.set_status("Многостанционный режим MPPT", color="cyan")
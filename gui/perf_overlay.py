@@ -0,0 +1,75 @@
+# gui/perf_overlay.py
+"""
+Оверлей производительности (кнопка «Perf» в верхней панели): раз в секунду
+показывает снимок util.perf — частоты и p50/p99/max горячих путей, счётчики,
+глубины очередей, пропущенные кадры. «Dump» пишет снимок с гистограммами
+в файл (для отчёта об ошибке), «Reset» обнуляет пробы.
+
+Снимок и форматирование — доли миллисекунды, поэтому прямо в Tk-потоке;
+скрытый оверлей не обновляется.
+"""
+
+from __future__ import annotations
+
+from typing import Callable, Optional
+
+from tkinter import Frame, Label, Button, LEFT, RIGHT, TOP, X
+
+from util import perf
+
+
+class PerfOverlay(Frame):
+    """
+    on_status — куда писать «снимок сохранён: …» (общий статусбар)
+    """
+
+    REFRESH_MS = 1000
+
+    def __init__(self, master, bg="#202124", fg="#e8eaed", on_status: Optional[Callable[[str, str], None]] = None, **kwargs):
+        super().__init__(master, bg=bg, **kwargs)
+        self.on_status = on_status
+        self._job = None
+
+        bar = Frame(self, bg=bg)
+        bar.pack(side=TOP, fill=X)
+        Label(bar, text="Perf: частота, p50/p99/max; очереди; кадры", bg=bg, fg="#80868b").pack(side=LEFT, padx=4)
+        for text, cmd in (("Dump", self._dump), ("Reset", self._reset)):
+            Button(
+                bar, text=text, command=cmd, bg="#303134", fg=fg,
+                activebackground="#3c4043", activeforeground=fg,
+            ).pack(side=RIGHT, padx=2, pady=2)
+
+        self.text = Label(self, text="", bg="#17181a", fg="#bdc1c6", font=("Consolas", 8), justify="left", anchor="nw")
+        self.text.pack(side=TOP, fill=X, padx=4, pady=(0, 4))
+
+    def show(self) -> None:
+        """Начать обновление (вызывать после pack)."""
+        if self._job is None:
+            self._refresh()
+
+    def hide(self) -> None:
+        if self._job is not None:
+            self.after_cancel(self._job)
+            self._job = None
+
+    def _refresh(self) -> None:
+        self.text.config(text="\n".join(perf.format_lines()))
+        self._job = self.after(self.REFRESH_MS, self._refresh)
+
+    def _dump(self) -> None:
+        try:
+            path = perf.dump()
+        except OSError as e:
+            self._status(f"Perf: не удалось сохранить снимок: {e}", "red")
+            return
+        self._status(f"Perf: снимок сохранён: {path}", "cyan")
+
+    def _reset(self) -> None:
+        perf.reset()
+        self._status("Perf: пробы обнулены", "cyan")
+
+    def _status(self, msg: str, color: str) -> None:
+        if self.on_status is not None:
+            self.on_status(msg, color)
+        else:
+            print(msg)
@@ -0,0 +1,396 @@
+# gui/plot_panel.py
+"""
+Живые графики стенда: напряжение, ток, мощность входа (ЛБП) и выхода
+(нагрузка), КПД.
+
+Данные — из телеметрии (util.telemetry), отрисовка — min/max-прореживание
+до ширины экрана: на каждый столбец пикселей — вертикальный отрезок
+от минимума до максимума попавших в него точек. Всплески не теряются,
+а число точек на линии не больше 2 × ширина, сколько бы данных ни было
+в окне — 1 минута или 8 часов.
+
+- PlotHistory   — копит историю: из колец телеметрии забирает новые строки
+                  (задание планировщика опроса раз в секунду) и сворачивает
+                  их в кольцо min/max по секундным корзинам (MinMaxRing,
+                  заранее выделенные массивы на HISTORY_S). Короткие окна
+                  (до RAW_SPAN_S) рисуются по сырым отсчётам телеметрии.
+- PlotPanel     — Canvas с четырьмя полосами. Прореживание и пересчёт
+                  в пиксели — в фоне (UiQueue.submit), в Tk-потоке только
+                  canvas.coords готовых списков: терминал MPPT на том же
+                  Tk-потоке не тормозит. Скрытая панель не пересчитывается.
+- PlotWindow    — отдельное окно с панелью (кнопка «Plot» в верхней панели).
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from tkinter import Toplevel, Frame, Canvas, Label, StringVar, OptionMenu, LEFT, RIGHT, TOP, BOTH, X
+
+from gui.ui_queue import UiQueue
+from util.telemetry import TelemetryHub, PSU_SOURCE, LOAD_SOURCE
+
+# Полосы графика: (подпись, [(серия, цвет, легенда)])
+IN_COLOR = "#8ab4f8"
+OUT_COLOR = "#f28b82"
+EFF_COLOR = "#81c995"
+ROWS = [
+    ("U, В", [("u_in", IN_COLOR, "вход"), ("u_out", OUT_COLOR, "выход")]),
+    ("I, А", [("i_in", IN_COLOR, "вход"), ("i_out", OUT_COLOR, "выход")]),
+    ("P, Вт", [("p_in", IN_COLOR, "вход"), ("p_out", OUT_COLOR, "выход")]),
+    ("КПД, %", [("eff", EFF_COLOR, "КПД")]),
+]
+
+# Окна просмотра: подпись → секунды
+SPANS = [("1 мин", 60), ("10 мин", 600), ("1 ч", 3600), ("8 ч", 8 * 3600)]
+
+IN_SERIES = ("u_in", "i_in", "p_in")
+OUT_SERIES = ("u_out", "i_out", "p_out", "eff")
+
+
+# ----------------------------------------------------------
+# Прореживание
+# ----------------------------------------------------------
+def minmax_decimate(
+    t: np.ndarray, lo: np.ndarray, hi: np.ndarray, t0: float, t1: float, n: int
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    t (по возрастанию), lo/hi — нижняя/верхняя оценка точки (для сырых
+    отсчётов lo = hi). Интервал [t0, t1) делится на n столбцов; для каждого
+    непустого столбца — (номер столбца, min lo, max hi). NaN пропускаются,
+    столбцы из одних NaN выбрасываются.
+    """
+    empty = np.empty(0)
+    if n <= 0 or not len(t) or t1 <= t0:
+        return empty.astype(np.int64), empty, empty
+    edges = t0 + (t1 - t0) * np.arange(n + 1) / n
+    bounds = np.searchsorted(t, edges)
+    starts, ends = bounds[:-1], bounds[1:]
+    cols = np.flatnonzero(ends > starts)
+    if not len(cols):
+        return cols, empty, empty
+    first, last = starts[cols], ends[cols[-1]]
+    # корзины смежные: reduceat по началам непустых столбцов, хвост отрезан
+    ymin = np.fmin.reduceat(lo[:last], first)
+    ymax = np.fmax.reduceat(hi[:last], first)
+    ok = np.isfinite(ymin) & np.isfinite(ymax)
+    return cols[ok], ymin[ok], ymax[ok]
+
+
+class MinMaxRing:
+    """
+    Кольцо секундных корзин: начало корзины + min/max каждой серии.
+    Память — capacity корзин, выделяется один раз.
+    """
+
+    def __init__(self, n_series: int, capacity: int, bucket_s: float):
+        self.bucket_s = bucket_s
+        self.capacity = capacity
+        self.bt = np.zeros(capacity, dtype=np.float64)
+        self.lo = np.full((capacity, n_series), np.nan)
+        self.hi = np.full((capacity, n_series), np.nan)
+        self.count = 0           # корзин записано всего
+        self._last_id: Optional[int] = None
+
+    def add(self, t: np.ndarray, v: np.ndarray) -> None:
+        """Новые отсчёты (t по возрастанию, v: len(t) × n_series)."""
+        if not len(t):
+            return
+        ids = np.floor(t / self.bucket_s).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        lo = np.fmin.reduceat(v, starts, axis=0)
+        hi = np.fmax.reduceat(v, starts, axis=0)
+        uid = ids[starts]
+
+        k = 0
+        if self._last_id is not None and uid[0] == self._last_id:
+            # досчитать открытую корзину
+            i = (self.count - 1) % self.capacity
+            self.lo[i] = np.fmin(self.lo[i], lo[0])
+            self.hi[i] = np.fmax(self.hi[i], hi[0])
+            k = 1
+        for j in range(k, len(uid)):
+            i = self.count % self.capacity
+            self.bt[i] = uid[j] * self.bucket_s
+            self.lo[i] = lo[j]
+            self.hi[i] = hi[j]
+            self.count += 1
+        self._last_id = int(uid[-1])
+
+    def since(self, t_from: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Корзины, закончившиеся после t_from: (середина корзины, lo, hi)."""
+        stop = self.count
+        start = max(0, stop - self.capacity)
+        idx = np.arange(start, stop) % self.capacity
+        bt = self.bt[idx]
+        mask = bt + self.bucket_s > t_from
+        return bt[mask] + self.bucket_s / 2, self.lo[idx][mask], self.hi[idx][mask]
+
+
+# ----------------------------------------------------------
+# История
+# ----------------------------------------------------------
+class PlotHistory:
+    """
+    hub — TelemetryHub (источники ЛБП и нагрузки).
+    update() — из потока планировщика; series() — из фонового шага отрисовки.
+    """
+
+    BUCKET_S = 1.0
+    HISTORY_S = 9 * 3600
+    # окна не длиннее — по сырым отсчётам телеметрии
+    RAW_SPAN_S = 600
+    # КПД: вход берётся из отсчёта ЛБП не дальше EFF_MAX_SKEW_S от отсчёта нагрузки
+    EFF_MAX_SKEW_S = 2.0
+    # и только при входной мощности выше EFF_MIN_P_IN, Вт
+    EFF_MIN_P_IN = 0.05
+
+    def __init__(self, hub: TelemetryHub):
+        self.hub = hub
+        capacity = int(self.HISTORY_S / self.BUCKET_S)
+        self.hist_in = MinMaxRing(len(IN_SERIES), capacity, self.BUCKET_S)
+        self.hist_out = MinMaxRing(len(OUT_SERIES), capacity, self.BUCKET_S)
+        self._psu_idx = 0
+        self._load_idx = 0
+        self._lock = threading.Lock()
+
+    def update(self) -> None:
+        """Забрать из телеметрии новые строки и свернуть в корзины."""
+        hub = self.hub
+        with self._lock:
+            self._psu_idx, t, v = hub.read_from(PSU_SOURCE, self._psu_idx)
+            if len(t):
+                self.hist_in.add(t, self._derive_in(v))
+            self._load_idx, t, v = hub.read_from(LOAD_SOURCE, self._load_idx)
+            if len(t):
+                self.hist_out.add(t, self._derive_out(t, v))
+
+    def series(self, span_s: float, now: float) -> Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Серии для окна [now - span_s, now]: имя → (t, lo, hi)."""
+        t_from = now - span_s
+        out: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        if span_s <= self.RAW_SPAN_S:
+            groups = []
+            t, v = self.hub.since(PSU_SOURCE, t_from)
+            groups.append((IN_SERIES, t, self._derive_in(v) if len(t) else None, None))
+            t, v = self.hub.since(LOAD_SOURCE, t_from)
+            groups.append((OUT_SERIES, t, self._derive_out(t, v) if len(t) else None, None))
+        else:
+            with self._lock:
+                groups = [
+                    (IN_SERIES,) + self.hist_in.since(t_from),
+                    (OUT_SERIES,) + self.hist_out.since(t_from),
+                ]
+        for names, t, lo, hi in groups:
+            if lo is None:
+                continue
+            if hi is None:
+                hi = lo
+            for k, name in enumerate(names):
+                out[name] = (t, lo[:, k], hi[:, k])
+        return out
+
+    @staticmethod
+    def _derive_in(v: np.ndarray) -> np.ndarray:
+        u, i = v[:, 0], v[:, 1]
+        return np.column_stack((u, i, u * i))
+
+    def _derive_out(self, t: np.ndarray, v: np.ndarray) -> np.ndarray:
+        u, i = v[:, 0], v[:, 1]
+        p = u * i
+        return np.column_stack((u, i, p, self._efficiency(t, p)))
+
+    def _efficiency(self, t: np.ndarray, p_out: np.ndarray) -> np.ndarray:
+        """КПД, %: выходная мощность к входной, входная — из ближайших отсчётов ЛБП."""
+        eff = np.full(len(t), np.nan)
+        t_in, v_in = self.hub.since(PSU_SOURCE, t[0] - self.EFF_MAX_SKEW_S)
+        if not len(t_in):
+            return eff
+        p_in = np.interp(t, t_in, v_in[:, 0] * v_in[:, 1])
+        # расстояние до ближайшего отсчёта ЛБП
+        j = np.clip(np.searchsorted(t_in, t), 1, max(1, len(t_in) - 1))
+        skew = np.minimum(np.abs(t - t_in[j - 1]), np.abs(t_in[np.minimum(j, len(t_in) - 1)] - t))
+        ok = (skew <= self.EFF_MAX_SKEW_S) & (p_in > self.EFF_MIN_P_IN)
+        eff[ok] = 100.0 * p_out[ok] / p_in[ok]
+        return eff
+
+
+def compute_frame(history: PlotHistory, span_s: float, width: int, height: int) -> List[dict]:
+    """
+    Фон: прореживание и пересчёт в пиксели. На полосу — рамка, границы
+    шкалы и плоские списки координат линий (зигзаг min/max по столбцам).
+    """
+    now = time.monotonic()
+    data = history.series(span_s, now)
+    plot_w = max(1, width - PlotPanel.MARGIN_L - PlotPanel.MARGIN_R)
+    row_h = max(1, (height - PlotPanel.MARGIN_B) // len(ROWS))
+    t0 = now - span_s
+
+    rows = []
+    for r, (_title, series) in enumerate(ROWS):
+        top = r * row_h + PlotPanel.GAP
+        h = row_h - 2 * PlotPanel.GAP
+        dec = {}
+        for name, _color, _legend in series:
+            if name in data:
+                t, lo, hi = data[name]
+                dec[name] = minmax_decimate(t, lo, hi, t0, now, plot_w)
+        vals = [a for c, a, b in dec.values() if len(c)] + [b for c, a, b in dec.values() if len(c)]
+        if vals:
+            vmin = float(min(a.min() for a in vals))
+            vmax = float(max(a.max() for a in vals))
+        else:
+            vmin, vmax = 0.0, 1.0
+        if vmax - vmin < 1e-9:
+            pad = abs(vmax) * 0.05 or 1.0
+            vmin, vmax = vmin - pad, vmax + pad
+        scale = h / (vmax - vmin)
+
+        lines = {}
+        for name, (cols, ymin, ymax) in dec.items():
+            if not len(cols):
+                continue
+            x = (PlotPanel.MARGIN_L + cols).astype(np.float64)
+            flat = np.empty(len(cols) * 4)
+            flat[0::4] = x
+            flat[1::4] = top + (vmax - ymin) * scale
+            flat[2::4] = x
+            flat[3::4] = top + (vmax - ymax) * scale
+            lines[name] = flat.round(1).tolist()
+        rows.append({"top": top, "bottom": top + h, "vmin": vmin, "vmax": vmax, "lines": lines})
+    return rows
+
+
+# ----------------------------------------------------------
+# Tk
+# ----------------------------------------------------------
+class PlotPanel(Frame):
+    """
+    history — PlotHistory (общая на приложение, копится и без открытой панели)
+    ui      — UiQueue: пересчёт кадра в фоне, отрисовка — в Tk-потоке
+    """
+
+    REFRESH_MS = 1000
+    MARGIN_L = 56
+    MARGIN_R = 8
+    MARGIN_B = 18
+    GAP = 6
+
+    def __init__(self, master, history: PlotHistory, ui: UiQueue, bg="#202124", fg="#e8eaed", **kwargs):
+        super().__init__(master, bg=bg, **kwargs)
+        self.history = history
+        self.ui = ui
+        self.bg = bg
+        self.fg = fg
+        self._pending = False
+
+        # -------- окно просмотра и легенда --------
+        top = Frame(self, bg=bg)
+        top.pack(side=TOP, fill=X)
+        self.span_var = StringVar(value=SPANS[1][0])
+        menu = OptionMenu(top, self.span_var, *[label for label, _ in SPANS], command=lambda _v: self.refresh())
+        menu.config(bg="#303134", fg=fg, activebackground="#3c4043", activeforeground=fg, highlightthickness=0)
+        menu.pack(side=LEFT, padx=4, pady=4)
+        for text, color in (("вход (ЛБП)", IN_COLOR), ("выход (нагрузка)", OUT_COLOR), ("КПД", EFF_COLOR)):
+            Label(top, text=f"■ {text}", bg=bg, fg=color).pack(side=LEFT, padx=6)
+        self.info_label = Label(top, text="", bg=bg, fg="#80868b", font=("Consolas", 8))
+        self.info_label.pack(side=RIGHT, padx=4)
+
+        # -------- полосы --------
+        self.canvas = Canvas(self, bg=bg, highlightthickness=0, width=720, height=480)
+        self.canvas.pack(side=TOP, fill=BOTH, expand=True)
+        c = self.canvas
+        self._row_items = []
+        for title, series in ROWS:
+            items = {
+                "frame": c.create_rectangle(0, 0, 0, 0, outline="#3c4043"),
+                "title": c.create_text(0, 0, text=title, fill=fg, anchor="nw", font=("Consolas", 8)),
+                "vmax": c.create_text(0, 0, text="", fill="#80868b", anchor="ne", font=("Consolas", 8)),
+                "vmin": c.create_text(0, 0, text="", fill="#80868b", anchor="se", font=("Consolas", 8)),
+                "lines": {
+                    name: c.create_line(0, 0, 0, 0, fill=color, state="hidden")
+                    for name, color, _legend in series
+                },
+            }
+            self._row_items.append(items)
+        self._axis_left = c.create_text(0, 0, text="", fill="#80868b", anchor="sw", font=("Consolas", 8))
+        self._axis_right = c.create_text(0, 0, text="сейчас", fill="#80868b", anchor="se", font=("Consolas", 8))
+
+        self.after(self.REFRESH_MS, self._tick)
+
+    def _span_s(self) -> float:
+        return dict(SPANS).get(self.span_var.get(), SPANS[1][1])
+
+    def _tick(self):
+        self.refresh()
+        self.after(self.REFRESH_MS, self._tick)
+
+    def refresh(self):
+        """Запросить новый кадр (не чаще одного в работе; скрытая панель не считается)."""
+        if self._pending or not self.winfo_viewable():
+            return
+        w, h = self.canvas.winfo_width(), self.canvas.winfo_height()
+        if w < 2 or h < 2:
+            return
+        self._pending = True
+        span = self._span_s()
+        t0 = time.perf_counter()
+        self.ui.submit(
+            lambda: compute_frame(self.history, span, w, h),
+            on_done=lambda rows: self._draw(rows, span, w, h, t0),
+            on_error=self._on_error,
+            name="plot",
+        )
+
+    def _on_error(self, e):
+        self._pending = False
+        self.info_label.config(text=f"ошибка: {e}")
+
+    def _draw(self, rows, span, w, h, t0):
+        """Tk-поток: только перенос готовых координат в canvas."""
+        self._pending = False
+        c = self.canvas
+        for items, row in zip(self._row_items, rows):
+            top, bottom = row["top"], row["bottom"]
+            c.coords(items["frame"], self.MARGIN_L, top, w - self.MARGIN_R, bottom)
+            c.coords(items["title"], self.MARGIN_L + 4, top + 2)
+            c.coords(items["vmax"], self.MARGIN_L - 4, top)
+            c.coords(items["vmin"], self.MARGIN_L - 4, bottom)
+            c.itemconfigure(items["vmax"], text=f"{row['vmax']:.3g}")
+            c.itemconfigure(items["vmin"], text=f"{row['vmin']:.3g}")
+            for name, item in items["lines"].items():
+                flat = row["lines"].get(name)
+                if flat:
+                    c.coords(item, flat)
+                    c.itemconfigure(item, state="normal")
+                else:
+                    c.itemconfigure(item, state="hidden")
+        c.coords(self._axis_left, self.MARGIN_L, h)
+        c.itemconfigure(self._axis_left, text=f"−{self.span_var.get()}")
+        c.coords(self._axis_right, w - self.MARGIN_R, h)
+        points = sum(len(f) // 2 for row in rows for f in row["lines"].values())
+        ms = (time.perf_counter() - t0) * 1000.0
+        self.info_label.config(text=f"{points} точек, {ms:.0f} мс")
+
+
+class PlotWindow(Toplevel):
+    """Отдельное окно графиков; закрытие окна его только прячет."""
+
+    def __init__(self, master, history: PlotHistory, ui: UiQueue, bg="#202124", fg="#e8eaed"):
+        super().__init__(master, bg=bg)
+        self.title("V/I/P — вход / выход / КПД")
+        self.geometry("760x540")
+        self.panel = PlotPanel(self, history, ui, bg=bg, fg=fg)
+        self.panel.pack(fill=BOTH, expand=True)
+        self.protocol("WM_DELETE_WINDOW", self.withdraw)
+
+    def toggle(self):
+        if self.winfo_viewable():
+            self.withdraw()
+        else:
+            self.deiconify()
+            self.lift()
+            self.panel.refresh()
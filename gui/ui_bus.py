@@ -0,0 +1,102 @@
+# gui/ui_bus.py
+"""
+Шина обновлений интерфейса: фоновые потоки публикуют (ключ, значение),
+Tk-поток применяет.
+
+Tk не потокобезопасен: DoubleVar.set / Label.config из потока опроса
+нагрузки или ramp'а дают подёргивания и «main thread is not in main loop».
+Вместо этого поток делает
+
+    bus.set("load.v_meas", 12.034)
+
+а панель один раз в Tk-потоке привязывает ключ к виджету:
+
+    bus.bind("load.v_meas", self.v_meas_var.set)
+
+- публикация — append в collections.deque (атомарно в CPython, без блокировок);
+- один насос в Tk-потоке раз в pump_ms забирает всё накопившееся
+  (но не больше, чем было в очереди в начале прохода — продюсер
+  не удержит насос в цикле);
+- несколько значений одного ключа за проход склеиваются — применяется
+  последнее (измерения 50 раз в секунду не заставляют Tk рисовать 50 раз),
+  так что вызовов Tk за проход не больше, чем привязанных ключей;
+- порядок применения — порядок первого появления ключа в проходе.
+
+Разовые действия (показать окно, заполнить список) — через gui.ui_queue.UiQueue,
+шина — для «текущего состояния» виджетов.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Any, Callable, Dict
+
+
+class UiBus:
+    """
+    widget  — любой Tk-виджет (нужен только для after)
+    pump_ms — период насоса (ограничивает частоту обновлений Tk)
+    """
+
+    def __init__(self, widget, pump_ms: int = 50):
+        self.widget = widget
+        self.pump_ms = pump_ms
+
+        self._q: deque = deque()
+        self._bindings: Dict[str, Callable[[Any], None]] = {}
+
+        # счётчики
+        self.published = 0
+        self.applied = 0
+
+        self.widget.after(self.pump_ms, self._pump)
+
+    # ----------------------------------------------------------
+    # API
+    # ----------------------------------------------------------
+    def bind(self, key: str, setter: Callable[[Any], None]) -> None:
+        """Tk-поток: значение ключа key применяется вызовом setter(value)."""
+        self._bindings[key] = setter
+
+    def set(self, key: str, value: Any) -> None:
+        """Из любого потока: опубликовать новое значение ключа."""
+        self._q.append((key, value))
+        self.published += 1
+
+    def stats(self) -> dict:
+        return {
+            "published": self.published,
+            "applied": self.applied,
+            "coalesced": self.published - self.applied - len(self._q),
+            "pending": len(self._q),
+        }
+
+    # ----------------------------------------------------------
+    # Tk-поток
+    # ----------------------------------------------------------
+    def _pump(self) -> None:
+        latest: Dict[str, Any] = {}
+        q = self._q
+        for _ in range(len(q)):
+            try:
+                key, value = q.popleft()
+            except IndexError:
+                break
+            latest[key] = value
+
+        for key, value in latest.items():
+            setter = self._bindings.get(key)
+            if setter is None:
+                print(f"UiBus: ключ '{key}' не привязан")
+                continue
+            try:
+                setter(value)
+            except Exception as e:
+                print(f"UiBus: ошибка обновления '{key}': {e}")
+            self.applied += 1
+
+        try:
+            self.widget.after(self.pump_ms, self._pump)
+        except Exception:
+            # виджет уничтожен — приложение закрывается
+            pass
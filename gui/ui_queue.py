@@ -0,0 +1,125 @@
+# gui/ui_queue.py
+"""
+Потокобезопасная очередь вызовов в Tk-поток + фоновые шаги инициализации.
+
+Tk можно трогать только из главного потока. Всё медленное при старте
+(перечисление COM-портов, сканирование VISA, чтение пресетов, открытие
+журнала MPPT) выполняется в фоновых потоках, а результат возвращается
+в GUI через UiQueue:
+
+    ui = UiQueue(root)
+    ui.submit(scan_ports, on_done=panel.apply_ports, name="psu-ports")
+
+    # из любого потока
+    ui.post(label.config, text="готово")
+
+Панель сразу рисуется с заглушками («поиск портов…»), а данные
+подставляются, когда фоновый шаг закончился. Главный поток разбирает
+очередь по таймеру и не дольше budget_ms за один проход — поток событий
+Tk не блокируется даже при пачке результатов.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+
+class UiQueue:
+    """
+    widget     — любой Tk-виджет (нужен только для after)
+    poll_ms    — период разбора очереди в Tk-потоке
+    budget_ms  — сколько максимум тратить на разбор за один проход
+    workers    — потоков для фоновых шагов (submit)
+    """
+
+    def __init__(self, widget, poll_ms: int = 20, budget_ms: float = 8.0, workers: int = 4):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self.budget_s = budget_ms / 1000.0
+
+        self._q: "queue.Queue[tuple]" = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ui-bg")
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # длительность фоновых шагов: {name: секунды} — для замера старта
+        self.timings: Dict[str, float] = {}
+
+        self.widget.after(self.poll_ms, self._drain)
+
+    # ----------------------------------------------------------
+    # API (из любого потока)
+    # ----------------------------------------------------------
+    def pending(self) -> int:
+        """Сколько вызовов ждут разбора в Tk-потоке."""
+        return self._q.qsize()
+
+    def post(self, func: Callable[..., Any], *args, **kwargs) -> None:
+        """Выполнить func(*args, **kwargs) в Tk-потоке при ближайшем разборе."""
+        self._q.put((func, args, kwargs))
+
+    def submit(
+        self,
+        work: Callable[[], Any],
+        on_done: Optional[Callable[[Any], None]] = None,
+        on_error: Optional[Callable[[Exception], None]] = None,
+        name: str = "",
+    ) -> None:
+        """
+        work() — в фоновом потоке; on_done(result) / on_error(exc) — в Tk-потоке.
+        Без on_error исключение печатается (как у прочих фоновых потоков).
+        """
+        name = name or getattr(work, "__name__", "task")
+
+        def run():
+            t0 = time.perf_counter()
+            try:
+                result = work()
+            except Exception as e:
+                self.timings[name] = time.perf_counter() - t0
+                if on_error is not None:
+                    self.post(on_error, e)
+                else:
+                    print(f"Фоновый шаг '{name}' завершился ошибкой: {e}")
+                return
+            self.timings[name] = time.perf_counter() - t0
+            if on_done is not None:
+                self.post(on_done, result)
+
+        with self._lock:
+            if self._closed:
+                return
+            self._pool.submit(run)
+
+    def close(self) -> None:
+        """Не принимать новые шаги; начатые доработают в фоне."""
+        with self._lock:
+            self._closed = True
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ----------------------------------------------------------
+    # Tk-поток
+    # ----------------------------------------------------------
+    def _drain(self) -> None:
+        deadline = time.perf_counter() + self.budget_s
+        while time.perf_counter() < deadline:
+            try:
+                func, args, kwargs = self._q.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                func(*args, **kwargs)
+            except Exception as e:
+                print(f"UiQueue: ошибка в обработчике {getattr(func, '__name__', func)}: {e}")
+
+        # не успели разобрать всё — следующий проход сразу после событий Tk
+        delay = 1 if not self._q.empty() else self.poll_ms
+        try:
+            self.widget.after(delay, self._drain)
+        except Exception:
+            # виджет уничтожен — приложение закрывается
+            pass
@@ -1,11 +1,23 @@
+import time
+
+# отсчёт времени до первого кадра — до импорта GUI
+T_START = time.perf_counter()
+
 from tkinter import Tk
 from gui.layout import AppLayout
+from util.warmup import start_warmup
+from util.telemetry import get_telemetry
 import sys
 import os
 
 APP_TITLE = "v7 Terminal"
 APP_WIDTH = 1280
 APP_HEIGHT = 760
+# через сколько после показа окна начинать фоновый импорт бэкендов приборов
+WARMUP_DELAY_MS = 300
+# бюджет времени до первого кадра окна (импорты + сборка панелей), мс;
+# всё медленное вынесено в фоновые шаги (gui.ui_queue), от приборов не зависит
+FIRST_FRAME_BUDGET_MS = 1500
 
 def resource_path(relative_path):
     """ Возвращает корректный путь как при запуске .py, так и .exe """
@@ -13,6 +25,16 @@ def resource_path(relative_path):
         return os.path.join(sys._MEIPASS, relative_path)
     return relative_path
 
+def report_first_frame(app):
+    """Время от старта процесса до первого отрисованного окна — в статусбар."""
+    ms = (time.perf_counter() - T_START) * 1000.0
+    if ms > FIRST_FRAME_BUDGET_MS:
+        msg = f"Старт: {ms:.0f} мс (бюджет {FIRST_FRAME_BUDGET_MS} мс превышен)"
+        print(msg)
+        app.set_status(msg, color="yellow")
+    else:
+        app.set_status(f"Старт: {ms:.0f} мс", color="#80868b")
+
 def main():
     root = Tk()
     root.title(APP_TITLE)
@@ -33,8 +55,21 @@ def main():
     app = AppLayout(root, bg=bg, fg=fg)
     app.pack(fill="both", expand=True)
 
+    # pyvisa / owon_psu / openpyxl — в фоне, когда окно уже на экране
+    root.after(WARMUP_DELAY_MS, start_warmup)
+
+    # первый кадр: idle-перерисовка окна прошла → следующий таймер
+    root.after_idle(lambda: root.after(0, lambda: report_first_frame(app)))
+
     root.mainloop()
 
+    # дописать несброшенные отсчёты телеметрии
+    get_telemetry().stop_session()
+
+    # дописать в Excel строки, которые ExcelWriter ещё не сохранил
+    if app.mppt_panel.logger is not None:
+        app.mppt_panel.logger.close()
+
 
 if __name__ == "__main__":
     main()
@@ -5,7 +5,8 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[('ward.ico', '.')],
-    hiddenimports=[],
+    # импортируются лениво / по строке в util.warmup — PyInstaller их не видит
+    hiddenimports=['serial.tools.list_ports', 'openpyxl', 'owon_psu', 'pyvisa'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -0,0 +1,152 @@
+# mppt/bench_parse.py
+"""
+Микробенчмарк разбора кадра MPPT (MPPTLogger._parse_frame) на записанных кадрах.
+
+Корпус — кадры из записей сырого потока (*.v7cap, см. mppt.capture): каждый
+кадр прогоняется через pyte, берутся строки и матрица цветов — ровно то, что
+получает логгер. Для каждого кадра сравнивается результат текущего разбора
+с прежним (_parse_frame_legacy ниже) — вывод обязан совпадать.
+
+    python -m mppt.bench_parse session.v7cap [other.v7cap ...] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import time
+from typing import List, Tuple
+
+from mppt.capture import read_capture
+from mppt.logger import FIELD_RULES, LOG_HEADER, MPPTLogger
+from mppt.pipeline import FramePipeline
+from mppt.terminal_pyte import PYTE_FG_TO_HEX, PyteTerminal
+
+
+def _strip_ansi_legacy(s: str) -> str:
+    return re.sub(r'\x1B\[[0-?]*[ -/]*[@-~]', '', s).replace("\x00", "")
+
+
+def _excel_color_legacy(term_hex: str) -> str:
+    if not term_hex:
+        return "000000"
+    hex_clean = term_hex.lstrip("#").lower()
+    green_set = {
+        PYTE_FG_TO_HEX["green"].lstrip("#").lower(),
+        PYTE_FG_TO_HEX.get("brightgreen", "").lstrip("#").lower(),
+    }
+    red_set = {
+        PYTE_FG_TO_HEX["red"].lstrip("#").lower(),
+        PYTE_FG_TO_HEX.get("brightred", "").lstrip("#").lower(),
+    }
+    if hex_clean in green_set:
+        return "00AA00"
+    if hex_clean in red_set:
+        return "FF0000"
+    return "000000"
+
+
+def _parse_frame_legacy(logger: MPPTLogger, lines: List[str], color_matrix) -> Tuple[List[str], List[str]]:
+    """Прежний разбор (эталон для сравнения) — без изменений, вместе с прежними strip_ansi и цветом."""
+    values = ["" for _ in range(len(LOG_HEADER))]
+    colors = ["000000" for _ in range(len(LOG_HEADER))]
+
+    plain_lines = [_strip_ansi_legacy(l) for l in lines]
+
+    id_pattern = re.compile(r"ID:([0-9A-Fa-f]{4})")
+    for row_idx, ln in enumerate(plain_lines):
+        m = id_pattern.search(ln)
+        if m:
+            values[0] = m.group(1).upper()
+            term_hex = logger._row_hex_color(color_matrix, row_idx)
+            colors[0] = _excel_color_legacy(term_hex)
+            break
+
+    for row_idx, ln in enumerate(plain_lines):
+        if not ln.strip():
+            continue
+
+        for label, col_idx, mode in FIELD_RULES:
+            if label not in ln:
+                continue
+
+            term_hex = logger._row_hex_color(color_matrix, row_idx)
+            colors[col_idx] = _excel_color_legacy(term_hex)
+
+            if mode == "bracket":
+                m = re.search(r"\[([^\]]*)\]", ln)
+                if m:
+                    values[col_idx] = m.group(1).strip()
+
+            elif mode == "number":
+                m = re.search(rf"{re.escape(label)}\s+(-?\d+)", ln)
+                if m:
+                    values[col_idx] = m.group(1).strip()
+
+    return values, colors
+
+
+def load_corpus(paths: List[str]) -> List[Tuple[List[str], list]]:
+    """Кадры из записей: [(строки pyte, матрица цветов), ...]."""
+    corpus = []
+    for path in paths:
+        term = PyteTerminal(cols=64, rows=18)
+        pipeline = None
+
+        def on_frame():
+            pipeline.sync_term()
+            corpus.append((term.get_lines(), term.color_matrix()))
+
+        pipeline = FramePipeline(term, None, on_frame=on_frame)
+        for _, data in read_capture(path):
+            pipeline.feed_bytes(data)
+    return corpus
+
+
+def _time(func, corpus, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for lines, colors in corpus:
+            func(lines, colors)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="бенчмарк MPPTLogger._parse_frame на записанных кадрах")
+    ap.add_argument("paths", nargs="+", help="файлы *.v7cap")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    corpus = load_corpus(args.paths)
+    if not corpus:
+        print("в записях нет ни одного кадра")
+        return 1
+
+    # логгер нужен только ради _row_hex_color / _parse_frame — без файлов и git
+    logger = MPPTLogger.__new__(MPPTLogger)
+
+    mismatches = 0
+    for i, (lines, colors) in enumerate(corpus):
+        new = logger._parse_frame(lines, colors)
+        old = _parse_frame_legacy(logger, lines, colors)
+        if new != old:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"кадр {i}: расхождение\n  было:  {old}\n  стало: {new}")
+
+    t_old = _time(lambda l, c: _parse_frame_legacy(logger, l, c), corpus, args.repeat)
+    t_new = _time(logger._parse_frame, corpus, args.repeat)
+    n = len(corpus)
+    print(
+        f"{n} кадров | legacy {t_old / n * 1e6:.1f} мкс/кадр | "
+        f"new {t_new / n * 1e6:.1f} мкс/кадр | ×{t_old / t_new:.2f} | "
+        f"расхождений: {mismatches}"
+    )
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
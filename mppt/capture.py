@@ -0,0 +1,242 @@
+# mppt/capture.py
+"""
+Запись и воспроизведение сырого потока MPPT (байты из SerialAuto.ser).
+
+Формат файла (*.v7cap), little-endian:
+    заголовок:  b"V7CAP\\x01" + <d>  (wall-clock time.time() момента t=0)
+    запись:     <d> t  — секунды от t=0 (time.monotonic())
+                <I> n  — длина куска
+                n байт — кусок как есть
+Накладные расходы — 12 байт на кусок; обрыв файла на середине записи
+(падение/выключение питания) при чтении просто отбрасывается.
+
+- CaptureRecorder — дописывает куски с ротацией по размеру (.1, .2, ...)
+- read_capture()  — итератор (t, data) по файлу
+- replay()        — подаёт запись в приёмник (например FramePipeline.feed_bytes)
+                    в реальном времени, с ускорением N× или максимально быстро
+
+Бенчмарк конвейера (нарезка, pyte/шаблон, парсинг, логирование):
+    python -m mppt.capture bench session.v7cap [--speed 0] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Callable, Iterator, Optional, Tuple
+
+MAGIC = b"V7CAP\x01"
+_HEADER = struct.Struct("<d")
+_RECORD = struct.Struct("<dI")
+
+CAPTURE_EXT = ".v7cap"
+
+
+class CaptureRecorder:
+    """
+    Потокобезопасная запись сырого потока в *.v7cap.
+
+    path      — путь к файлу записи
+    max_bytes — размер файла, после которого делается ротация (0 — без ротации)
+    backups   — сколько старых файлов хранить (path.1 ... path.N)
+    """
+
+    def __init__(self, path: str, max_bytes: int = 64 * 1024 * 1024, backups: int = 5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+
+        self._lock = threading.Lock()
+        self._t0 = time.monotonic()
+        self._wall0 = time.time()
+        self._f = None
+        self._size = 0
+
+        self.chunks = 0
+        self.bytes = 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._open()
+
+    # ----------------------------------------------------------
+    def _open(self) -> None:
+        self._f = open(self.path, "wb")
+        self._f.write(MAGIC + _HEADER.pack(self._wall0))
+        self._size = len(MAGIC) + _HEADER.size
+
+    def _rotate(self) -> None:
+        self._f.close()
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                src = f"{self.path}.{i}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self._open()
+
+    # ----------------------------------------------------------
+    def write(self, data: bytes, t: Optional[float] = None) -> None:
+        """Дописать кусок. t — time.monotonic() момента чтения (по умолчанию — сейчас)."""
+        if not data:
+            return
+        if t is None:
+            t = time.monotonic()
+        with self._lock:
+            if self._f is None:
+                return
+            self._f.write(_RECORD.pack(t - self._t0, len(data)))
+            self._f.write(data)
+            self._size += _RECORD.size + len(data)
+            self.chunks += 1
+            self.bytes += len(data)
+            if self.max_bytes and self._size >= self.max_bytes:
+                self._rotate()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._f is not None:
+                self._f.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+
+
+# ----------------------------------------------------------------------
+# Чтение / воспроизведение
+# ----------------------------------------------------------------------
+
+def read_capture(path: str) -> Iterator[Tuple[float, bytes]]:
+    """Итератор (t, data) по файлу записи. Неполная последняя запись пропускается."""
+    with open(path, "rb") as f:
+        head = f.read(len(MAGIC) + _HEADER.size)
+        if not head.startswith(MAGIC) or len(head) < len(MAGIC) + _HEADER.size:
+            raise ValueError(f"Не v7cap-файл: {path}")
+
+        while True:
+            rec = f.read(_RECORD.size)
+            if len(rec) < _RECORD.size:
+                return
+            t, n = _RECORD.unpack(rec)
+            data = f.read(n)
+            if len(data) < n:
+                return
+            yield t, data
+
+
+def replay(
+    path: str,
+    sink: Callable[[bytes], None],
+    speed: float = 1.0,
+    stop_flag: Optional[Callable[[], bool]] = None,
+) -> dict:
+    """
+    Подать запись в sink.
+
+    speed — 1.0: реальное время, N: в N раз быстрее, <= 0: максимально быстро
+    stop_flag — если возвращает True, воспроизведение прерывается
+    Возвращает статистику: chunks, bytes, elapsed_s, capture_s.
+    """
+    chunks = 0
+    nbytes = 0
+    first_t: Optional[float] = None
+    last_t = 0.0
+    start = time.perf_counter()
+
+    for t, data in read_capture(path):
+        if stop_flag is not None and stop_flag():
+            break
+        if first_t is None:
+            first_t = t
+        last_t = t
+
+        if speed > 0:
+            due = start + (t - first_t) / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        sink(data)
+        chunks += 1
+        nbytes += len(data)
+
+    return {
+        "chunks": chunks,
+        "bytes": nbytes,
+        "elapsed_s": time.perf_counter() - start,
+        "capture_s": (last_t - first_t) if first_t is not None else 0.0,
+    }
+
+
+# ----------------------------------------------------------------------
+# CLI: информация о записи и бенчмарк конвейера
+# ----------------------------------------------------------------------
+
+def _bench(path: str, speed: float, repeat: int, log_dir: Optional[str]) -> None:
+    from mppt.terminal_pyte import PyteTerminal
+    from mppt.logger import MPPTLogger
+    from mppt.pipeline import FramePipeline
+
+    base = log_dir or tempfile.mkdtemp(prefix="v7cap_bench_")
+    logger = MPPTLogger(base_dir=base, status_callback=lambda m, c="white": None)
+
+    for run in range(1, repeat + 1):
+        term = PyteTerminal(cols=64, rows=18)
+        pipeline = FramePipeline(term, logger)
+        res = replay(path, pipeline.feed_bytes, speed=speed)
+        pipeline.sync_term()
+
+        el = res["elapsed_s"] or 1e-9
+        st = pipeline.stats()
+        print(
+            f"run {run}: {res['chunks']} chunks, {res['bytes'] / 1024:.1f} KiB, "
+            f"{st['frames']} frames (fast {st['fast_frames']}, pyte {st['pyte_frames']}) "
+            f"in {el:.3f} s → {st['frames'] / el:.0f} frames/s, "
+            f"{res['bytes'] / el / 1024 / 1024:.2f} MiB/s; "
+            f"UID: reused {st['mask_reused']}, scans {st['mask_scans']}, "
+            f"crc {st['mask_crc']}, none {st['mask_no_uid']}"
+        )
+
+    print(f"logs: {base}")
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="v7cap: запись сырого потока MPPT")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p_info = sub.add_parser("info", help="сводка по файлу записи")
+    p_info.add_argument("path")
+
+    p_bench = sub.add_parser("bench", help="прогнать запись через конвейер MPPT")
+    p_bench.add_argument("path")
+    p_bench.add_argument("--speed", type=float, default=0.0,
+                         help="1 — реальное время, N — ускорение, 0 — максимально быстро")
+    p_bench.add_argument("--repeat", type=int, default=1)
+    p_bench.add_argument("--log-dir", default=None,
+                         help="каталог для логов (по умолчанию — временный)")
+
+    args = ap.parse_args(argv)
+
+    if args.cmd == "info":
+        chunks = 0
+        nbytes = 0
+        first = last = None
+        for t, data in read_capture(args.path):
+            chunks += 1
+            nbytes += len(data)
+            first = t if first is None else first
+            last = t
+        dur = (last - first) if first is not None else 0.0
+        print(f"{args.path}: {chunks} chunks, {nbytes} bytes, {dur:.2f} s")
+    elif args.cmd == "bench":
+        _bench(args.path, args.speed, args.repeat, args.log_dir)
+
+
+if __name__ == "__main__":
+    main()
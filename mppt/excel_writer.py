@@ -0,0 +1,350 @@
+# mppt/excel_writer.py
+"""
+Фоновая пакетная запись mppt_log.xlsx.
+
+Workbook держится открытым в памяти в отдельном потоке; строки приходят через
+очередь и сразу дописываются в лист, а на диск файл уходит пачкой:
+    - через flush_delay_s после первой несохранённой строки (debounce), или
+    - сразу, когда несохранённых строк набралось flush_rows.
+Сохранение атомарное (временный файл + os.replace). Если xlsx открыт в Excel
+(PermissionError) — строки остаются в памяти, сохранение повторяется через
+retry_delay_s, ничего не теряется.
+
+Вместо «одна строка = полная перезапись файла» получаем сотни строк на одно
+сохранение. Источник истины — журнал (mppt.journal); если xlsx нет или он
+битый, книга собирается из журнала (битый файл сначала переименовывается
+в *.corrupt — его место займёт книга из журнала).
+
+Восстановление: в свойствах самой книги (custom doc property) хранится
+отметка «сколько записей журнала в книге : ключ последней из них»
+(mppt.journal.record_key). Она сохраняется атомарно вместе с книгой, поэтому
+после сбоя recover() дописывает ровно недостающие записи журнала — без дублей
+и без полной пересборки. Если на месте отметки в журнале другая запись
+(git pull/rebase вставил строки других станций, строку не удалось прочитать),
+книга собирается из журнала заново: по номеру строки дописывать нельзя.
+"""
+
+from __future__ import annotations
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from mppt.journal import append_row, backup_corrupt_xlsx, build_workbook, record_key, save_workbook_atomic
+
+
+# Имя свойства книги с отметкой журнала "<число записей>:<ключ последней>"
+# (старая отметка v7_journal_seq — номер строки — не читается: книга пересобирается)
+WATERMARK_PROP = "v7_journal_mark"
+
+# Сколько ключей последних записей журнала помнить после сборки книги: строки
+# из очереди, уже вошедшие в книгу при сборке, повторно не дописываются
+TAIL_KEYS = 4096
+
+
+def get_watermark(wb) -> Optional[Tuple[int, str]]:
+    """Отметка журнала в книге: (число записей, ключ последней); None — нет отметки."""
+    props = getattr(wb, "custom_doc_props", None)
+    if props is None:
+        return None
+    for prop in props.props:
+        if prop.name == WATERMARK_PROP:
+            count, _, key = str(prop.value).partition(":")
+            try:
+                return int(count), key
+            except ValueError:
+                return None
+    return None
+
+
+def set_watermark(wb, count: int, key: str) -> None:
+    props = getattr(wb, "custom_doc_props", None)
+    if props is None:
+        # старый openpyxl без custom_doc_props — восстановление через пересборку
+        return
+    from openpyxl.packaging.custom import StringProperty
+
+    value = f"{count}:{key}"
+    for prop in props.props:
+        if prop.name == WATERMARK_PROP:
+            prop.value = value
+            return
+    props.append(StringProperty(name=WATERMARK_PROP, value=value))
+
+
+class ExcelWriter:
+    """
+    Единственный владелец Workbook: все операции с книгой — в потоке писателя.
+
+    xlsx_path     — путь к mppt_log.xlsx
+    header        — шапка листов
+    records       — функция, возвращающая записи журнала (для пересборки)
+    status        — callback статуса (msg, color)
+    """
+
+    def __init__(
+        self,
+        xlsx_path: str,
+        header: List[str],
+        records: Callable[[], Iterable[dict]],
+        status: Optional[Callable[[str, str], None]] = None,
+        flush_delay_s: float = 5.0,
+        flush_rows: int = 200,
+        retry_delay_s: float = 30.0,
+    ):
+        self.xlsx_path = xlsx_path
+        self.header = list(header)
+        self._records = records
+        self._status = status
+        self.flush_delay_s = flush_delay_s
+        self.flush_rows = flush_rows
+        self.retry_delay_s = retry_delay_s
+
+        self._q: "queue.Queue[tuple]" = queue.Queue()
+        self._wb = None
+        self._fonts: Dict[str, object] = {}
+        self._dirty = 0                  # строк в памяти, ещё не сохранённых на диск
+        self._due: Optional[float] = None  # когда сохранять (time.monotonic())
+        self._applied = 0                # сколько записей журнала в книге
+        self._last_key = ""              # ключ последней из них (record_key)
+        self._tail_keys: Set[str] = set()  # ключи хвоста журнала на момент сборки
+
+        # счётчики
+        self.rows_applied = 0
+        self.saves = 0
+        self.failed_saves = 0
+        self.last_save_rows = 0
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # ----------------------------------------------------------
+    # API (из любого потока)
+    # ----------------------------------------------------------
+    def enqueue(self, sheet: str, values: List[str], colors: List[str], key: str = "") -> None:
+        """
+        Поставить строку в очередь записи (не блокирует).
+        key — ключ записи журнала (ResultJournal.last_key): строки, уже
+        попавшие в книгу при пересборке/восстановлении, повторно не дописываются.
+        """
+        self._q.put(("row", sheet, list(values), list(colors), key))
+
+    def recover(self) -> None:
+        """
+        В фоне: открыть книгу и дописать записи журнала, которых в ней нет
+        (сбой до сохранения xlsx). Вызывается при старте.
+        """
+        self._q.put(("recover", None, [False]))
+
+    def schedule_rebuild(self) -> None:
+        """Пересобрать книгу из журнала в фоне (xlsx отстал от журнала)."""
+        self._q.put(("rebuild", None, [False]))
+
+    def rebuild(self, timeout: Optional[float] = None) -> bool:
+        """Пересобрать книгу из журнала и сохранить; ждёт результата."""
+        return self._call("rebuild", timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Сохранить несохранённые строки сейчас; ждёт результата."""
+        return self._call("flush", timeout)
+
+    def close(self, timeout: Optional[float] = 10.0) -> bool:
+        """Сохранить хвост и остановить поток."""
+        ok = self._call("stop", timeout)
+        self._thread.join(timeout)
+        return ok
+
+    def stats(self) -> dict:
+        return {
+            "rows_applied": self.rows_applied,
+            "pending": self._dirty,
+            "saves": self.saves,
+            "failed_saves": self.failed_saves,
+            "last_save_rows": self.last_save_rows,
+        }
+
+    def _call(self, kind: str, timeout: Optional[float]) -> bool:
+        done = threading.Event()
+        result = [False]
+        self._q.put((kind, done, result))
+        if not done.wait(timeout):
+            return False
+        return result[0]
+
+    # ----------------------------------------------------------
+    # Поток писателя
+    # ----------------------------------------------------------
+    def _run(self) -> None:
+        while True:
+            timeout = None
+            if self._due is not None:
+                timeout = max(0.0, self._due - time.monotonic())
+            try:
+                cmd = self._q.get(timeout=timeout)
+            except queue.Empty:
+                self._save()
+                continue
+
+            kind = cmd[0]
+            if kind == "row":
+                try:
+                    self._apply_row(cmd[1], cmd[2], cmd[3], cmd[4])
+                except Exception as e:
+                    # строка всё равно есть в журнале — попадёт в xlsx при пересборке
+                    self._set_status(f"MPPT: ошибка записи строки в Excel: {e}", "red")
+                    continue
+                # пока очередь не пуста — набираем пачку, не сохраняя
+                if self._dirty >= self.flush_rows:
+                    self._save()
+                elif self._due is None:
+                    self._due = time.monotonic() + self.flush_delay_s
+                continue
+
+            _, done, result = cmd
+            try:
+                if kind == "rebuild":
+                    result[0] = self._rebuild()
+                elif kind == "recover":
+                    self._ensure_loaded()
+                    result[0] = self._save() if self._dirty else True
+                else:
+                    result[0] = self._save() if self._dirty else True
+            except Exception as e:
+                self._set_status(f"MPPT: ошибка Excel-писателя: {e}", "red")
+            finally:
+                if done is not None:
+                    done.set()
+            if kind == "stop":
+                return
+
+    def _ensure_loaded(self) -> None:
+        if self._wb is not None:
+            return
+        if os.path.exists(self.xlsx_path):
+            wb = None
+            try:
+                from openpyxl import load_workbook
+
+                wb = load_workbook(self.xlsx_path)
+            except PermissionError:
+                # файл занят — не собираем поверх него; строки ждут в журнале
+                raise
+            except Exception as e:
+                # битый файл отодвигаем, прежде чем собрать новый на его месте;
+                # не получилось (OSError) — ошибка уходит наверх, файл не перезаписан
+                backup = backup_corrupt_xlsx(self.xlsx_path)
+                self._set_status(f"MPPT: Excel-лог повреждён ({e}), копия: {backup}; собираю из журнала", "yellow")
+            wm = get_watermark(wb) if wb is not None else None
+            if wm is not None and "Sheet" in wb.sheetnames and "PASSED" in wb.sheetnames:
+                self._wb = wb
+                if self._replay_tail(*wm):
+                    return
+                self._set_status("MPPT: журнал изменился до отметки Excel, собираю из журнала", "yellow")
+        # нет файла / битый / без отметки / отметка не сходится — собираем из журнала
+        self._wb = self._build()
+        self._dirty += 1
+
+    def _build(self):
+        """Собрать книгу из журнала, запомнив отметку и ключи хвоста."""
+        n = [0]
+        tail: deque = deque(maxlen=TAIL_KEYS)
+
+        def counted():
+            for rec in self._records():
+                n[0] += 1
+                tail.append(record_key(rec))
+                yield rec
+
+        wb = build_workbook(counted(), self.header)
+        self._applied = n[0]
+        self._last_key = tail[-1] if tail else ""
+        self._tail_keys = set(tail)
+        return wb
+
+    def _replay_tail(self, count: int, key: str) -> bool:
+        """
+        Дописать в открытую книгу записи журнала после отметки (count, key).
+        False — на позиции отметки в журнале другая запись (нужна пересборка).
+        """
+        self._applied, self._last_key = count, key
+        tail: deque = deque(maxlen=TAIL_KEYS)
+        pending = []
+        n = 0
+        for rec in self._records():
+            n += 1
+            k = record_key(rec)
+            tail.append(k)
+            if n == count and k != key:
+                return False
+            if n > count:
+                pending.append((rec, k))
+        if n < count:
+            return False
+
+        self._tail_keys = set()
+        for rec, k in pending:
+            self._apply_row(rec.get("sheet", "Sheet"), rec.get("values", []), rec.get("colors", []), k)
+        self._tail_keys = set(tail)
+        if pending:
+            self._set_status(f"MPPT: Excel восстановлен из журнала (+{len(pending)} строк)", "cyan")
+        return True
+
+    def _apply_row(self, sheet: str, values: List[str], colors: List[str], key: str) -> None:
+        self._ensure_loaded()
+        if key and key in self._tail_keys:
+            # строка уже есть в книге (сборка/восстановление из журнала)
+            self._tail_keys.discard(key)
+            return
+        ws = self._wb["PASSED"] if sheet == "PASSED" else self._wb["Sheet"]
+        append_row(ws, values, colors, self._fonts)
+        self._applied += 1
+        if key:
+            self._last_key = key
+        self._dirty += 1
+        self.rows_applied += 1
+
+    def _rebuild(self) -> bool:
+        try:
+            self._wb = self._build()
+        except Exception as e:
+            self._set_status(f"MPPT: ошибка сборки Excel: {e}", "red")
+            return False
+        self._dirty = max(self._dirty, 1)
+        return self._save()
+
+    def _save(self) -> bool:
+        """Атомарно сохранить книгу. При ошибке строки остаются в памяти до повтора."""
+        if self._wb is None:
+            self._due = None
+            return True
+        try:
+            set_watermark(self._wb, self._applied, self._last_key)
+            save_workbook_atomic(self._wb, self.xlsx_path)
+        except PermissionError:
+            self.failed_saves += 1
+            self._due = time.monotonic() + self.retry_delay_s
+            self._set_status(
+                f"MPPT: не удалось обновить Excel (файл открыт?), повтор позже: {self.xlsx_path}",
+                "yellow",
+            )
+            return False
+        except Exception as e:
+            self.failed_saves += 1
+            self._due = time.monotonic() + self.retry_delay_s
+            self._set_status(f"MPPT: ошибка записи Excel: {e}", "red")
+            return False
+
+        self.saves += 1
+        self.last_save_rows = self._dirty
+        self._dirty = 0
+        self._due = None
+        return True
+
+    def _set_status(self, msg: str, color: str) -> None:
+        if self._status:
+            self._status(msg, color)
+        else:
+            print(msg)
@@ -0,0 +1,239 @@
+# mppt/frame_template.py
+# --------------------------------------------------
+# Быстрый разбор стандартного тестового экрана MPPT без pyte.
+#
+# Шаблон компилируется из FIELD_RULES логгера и за ОДИН проход по сырому
+# ANSI-потоку кадра:
+#   - разбивает кадр на строки (CRLF)
+#   - отслеживает текущий цвет по SGR (ESC[..m) так же, как это делает pyte;
+#     ESC[2J цвет не сбрасывает, поэтому цвет на конце кадра переходит в
+#     следующий (FrameTemplate.fg)
+#   - сразу вытаскивает значения полей и цвет строки в FrameRecord
+#
+# Если кадр не похож на известную раскладку (позиционирование курсора,
+# табы, перенос строк, неполный набор полей и т.п.) — parse() возвращает None,
+# и вызывающий код идёт старым путём через PyteTerminal.
+# --------------------------------------------------
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from mppt.logger import FIELD_RULES, LOG_HEADER, _excel_color_from_hex
+from mppt.terminal_pyte import PYTE_FG_TO_HEX
+
+
+# Имена цветов pyte для SGR 30-37 / 90-97 (см. pyte.graphics)
+_SGR_FG_NAMES = {
+    30: "black", 31: "red", 32: "green", 33: "brown",
+    34: "blue", 35: "magenta", 36: "cyan", 37: "white",
+    90: "brightblack", 91: "brightred", 92: "brightgreen", 93: "brightyellow",
+    94: "brightblue", 95: "brightmagenta", 96: "brightcyan", 97: "brightwhite",
+}
+
+# Токены кадра: CSI-последовательность | CRLF | любой одиночный ESC | прочий текст
+_TOKEN_RE = re.compile(r"\x1b\[([0-9;?]*)([@-~])|(\r\n)|(\x1b)|([^\x1b\r\n]+)|([\r\n])")
+
+# Текст строки, который pyte рисует "как есть" (печатный ASCII)
+_PRINTABLE_RE = re.compile(r"[ -~]*\Z")
+
+_ID_RE = re.compile(r"ID:([0-9A-Fa-f]{4})")
+_BRACKET_RE = re.compile(r"\[([^\]]*)\]")
+
+# Параметры ESC[...H, означающие "курсор в начало экрана"
+_HOME_PARAMS = {"", "0", "1", "0;0", "1;1"}
+
+
+@dataclass
+class FrameRecord:
+    """Результат быстрого разбора кадра."""
+    lines: List[str]     # строки кадра без ANSI (дополнены до rows)
+    values: List[str]    # значения колонок LOG_HEADER
+    colors: List[str]    # Excel-цвета колонок ("RRGGBB")
+    is_passed: bool
+
+
+class FrameTemplate:
+    """
+    Скомпилированный шаблон тестового экрана MPPT.
+
+    rules    — список (label, column_index, mode), как MPPTLogger FIELD_RULES
+    cols/rows — размер экрана pyte: кадры, которые не влезают, разбираются через pyte
+    """
+
+    def __init__(
+        self,
+        rules: Optional[List[Tuple[str, int, str]]] = None,
+        cols: int = 64,
+        rows: int = 18,
+    ):
+        self.rules = list(rules or FIELD_RULES)
+        self.cols = cols
+        self.rows = rows
+        self.n_fields = len(LOG_HEADER)
+
+        # одна регулярка на все метки: в строке ищем только реально встреченные
+        labels = sorted({label for label, _c, _m in self.rules}, key=len, reverse=True)
+        self._label_re = re.compile("|".join(re.escape(l) for l in labels))
+        self._by_label = {}
+        for label, col_idx, mode in self.rules:
+            number_re = re.compile(rf"{re.escape(label)}\s+(-?\d+)") if mode == "number" else None
+            self._by_label.setdefault(label, []).append((col_idx, mode, number_re))
+        self._required = {col_idx for _l, col_idx, _m in self.rules}
+
+        self._default_hex = PYTE_FG_TO_HEX["default"]
+        # кеш "hex терминала -> цвет Excel"
+        self._excel_cache: dict[str, str] = {}
+
+        # цвет текста на начало следующего кадра (как у курсора pyte);
+        # None — неизвестен (256/truecolor): до явного SGR кадр идёт в pyte
+        self.fg: Optional[str] = "default"
+
+        # счётчики (для отладки/статистики)
+        self.matched = 0
+        self.fallback = 0
+
+    # ----------------------------------------------------------
+    def _excel(self, term_hex: str) -> str:
+        col = self._excel_cache.get(term_hex)
+        if col is None:
+            col = _excel_color_from_hex(term_hex)
+            self._excel_cache[term_hex] = col
+        return col
+
+    def _apply_sgr(self, params: str, fg: Optional[str]) -> Optional[str]:
+        """Новый цвет по SGR-параметрам; None — если SGR нам непонятен (→ pyte)
+        или цвет так и остался неизвестным."""
+        if not params:
+            return "default"
+        for p in params.split(";"):
+            if not p:
+                fg = "default"
+                continue
+            if not p.isdigit():
+                # приватные/нестандартные параметры (ESC[?1;32m и т.п.) — в pyte
+                return None
+            code = int(p)
+            if code == 0 or code == 39:
+                fg = "default"
+            elif code in _SGR_FG_NAMES:
+                fg = _SGR_FG_NAMES[code]
+            elif code in (38, 48):
+                # 256/truecolor — не поддерживаем в быстром пути
+                return None
+            # остальные атрибуты (bold, фон и т.п.) на цвет текста не влияют
+        return fg
+
+    # ----------------------------------------------------------
+    def parse(self, frame_text: str) -> Optional[FrameRecord]:
+        """
+        Разобрать кадр (начинается с ESC[2J). Возвращает FrameRecord
+        или None, если раскладка не совпала с шаблоном.
+        """
+        record = self._parse(frame_text)
+        if record is None:
+            self.fallback += 1
+        else:
+            self.matched += 1
+        return record
+
+    def _parse(self, frame_text: str) -> Optional[FrameRecord]:
+        values = ["" for _ in range(self.n_fields)]
+        colors = ["000000" for _ in range(self.n_fields)]
+        seen: set[int] = set()
+        id_found = False
+        is_passed = False
+
+        lines: List[str] = []
+        fg = self.fg
+        homed = False
+        cur_text: List[str] = []
+        cur_len = 0
+        line_hex: Optional[str] = None  # цвет первого символа строки
+
+        def finish_line() -> bool:
+            nonlocal id_found, is_passed
+            ln = "".join(cur_text)
+            row_idx = len(lines)
+            if row_idx >= self.rows:
+                return False  # pyte начал бы скроллить экран
+            lines.append(ln)
+            if not ln.strip():
+                return True
+
+            excel = self._excel(line_hex or self._default_hex)
+
+            if not id_found:
+                m = _ID_RE.search(ln)
+                if m:
+                    values[0] = m.group(1).upper()
+                    colors[0] = excel
+                    id_found = True
+
+            if not is_passed and "PASSED" in ln.upper():
+                is_passed = True
+
+            for lm in self._label_re.finditer(ln):
+                for col_idx, mode, number_re in self._by_label[lm.group(0)]:
+                    colors[col_idx] = excel
+                    seen.add(col_idx)
+                    if mode == "bracket":
+                        m = _BRACKET_RE.search(ln)
+                    else:
+                        m = number_re.search(ln)
+                    if m:
+                        values[col_idx] = m.group(1).strip()
+            return True
+
+        for m in _TOKEN_RE.finditer(frame_text):
+            params, final, crlf, lone_esc, text, lone_ctl = m.groups()
+
+            if final is not None:
+                if final == "m":
+                    fg = self._apply_sgr(params, fg)
+                    if fg is None:
+                        return None
+                elif final == "J" and params == "2":
+                    if cur_text or lines:
+                        return None  # очистка посреди кадра
+                elif final in ("H", "f") and params in _HOME_PARAMS:
+                    if cur_text or lines:
+                        return None  # возврат курсора посреди кадра
+                    homed = True
+                else:
+                    return None  # позиционирование/стирание — только pyte
+                continue
+
+            if crlf is not None:
+                if not homed or not finish_line():
+                    return None
+                cur_text = []
+                cur_len = 0
+                line_hex = None
+                continue
+
+            if text is not None:
+                if not homed or fg is None or not _PRINTABLE_RE.match(text):
+                    return None
+                if line_hex is None:
+                    line_hex = PYTE_FG_TO_HEX.get(fg, self._default_hex)
+                cur_text.append(text)
+                cur_len += len(text)
+                if cur_len > self.cols:
+                    return None  # перенос строки в pyte
+                continue
+
+            # одиночный ESC / CR / LF — pyte трактует их по-своему
+            return None
+
+        if cur_text and not finish_line():
+            return None
+
+        if not self._required.issubset(seen):
+            return None
+
+        self.fg = fg
+        lines.extend("" for _ in range(self.rows - len(lines)))
+        return FrameRecord(lines=lines, values=values, colors=colors, is_passed=is_passed)
@@ -4,7 +4,6 @@ from __future__ import annotations
 import threading
 import time
 import re
-import zlib
 from typing import Optional
 
 from tkinter import (
@@ -19,13 +18,27 @@ from tkinter import (
     Label,
     Canvas,
 )
-from tkinter import ttk
+from tkinter import ttk, filedialog
 
 from mppt.serial_auto import SerialAuto
 from mppt.logger import MPPTLogger
-from util.ansi import strip_ansi
 from mppt.terminal_pyte import PyteTerminal
 from mppt.terminal_canvas import CanvasTerminal
+from mppt.render_scheduler import RenderScheduler
+from mppt.pipeline import FramePipeline
+from mppt.capture import CaptureRecorder, CAPTURE_EXT, replay
+from util.fileutil import DEFAULT_CAPTURE_DIR, get_capture_path
+from gui.ui_queue import UiQueue
+from gui.ui_bus import UiBus
+from util.port_registry import get_registry
+from util.poll_scheduler import get_scheduler
+from util.telemetry import get_telemetry
+from util import perf
+
+# Пробы (util.perf): чтение UART, отрисовка терминала
+PROBE_SERIAL = perf.probe("mppt.serial_read")
+PROBE_RENDER = perf.probe("mppt.render")
+SERIAL_BYTES = perf.counter("mppt.serial_bytes")
 
 
 def extract_com_number(text: str) -> str:
@@ -40,29 +53,44 @@ class MPPTTerminalPanel(Frame):
     """
     Панель MPPT-терминала:
     - буферизация по кадрам между ESC[2J]
-    - универсальная маскировка UID → ID:XXXX
+    - универсальная маскировка UID → ID:XXXX (сам конвейер — mppt.pipeline.FramePipeline)
+    - запись сырого потока (REC) и воспроизведение записи (Replay)
     - кнопка "+" с удержанием
     - авто-сохранение в Excel при появлении PASSED (через MPPTLogger.save_block(auto=True))
+    - быстрый разбор стандартного экрана без pyte (FrameTemplate), pyte — как fallback
     - кнопки Git: Commit и Push
     - отдельный Git-status-bar (нижняя строка в панели)
     """
 
-    # UID: строго 4 группы, разделённые "-", группы — любые символы кроме пробела, CR, LF и "-"
-    UID_REGEX = re.compile(r"\x1b\[0m\s*([^- \r\n]+-[^- \r\n]+-[^- \r\n]+-[^- \r\n]+)")
-    ESC_CLEAR = "\x1b[2J"
-
-    def __init__(self, master, bg: str = "#202124", fg: str = "#e8eaed", **kwargs):
+    # Скорости воспроизведения записи (0 — максимально быстро)
+    REPLAY_SPEEDS = {"1×": 1.0, "4×": 4.0, "16×": 16.0, "max": 0.0}
+
+    # Ограничение частоты перерисовки терминала (кадры сверх лимита склеиваются)
+    RENDER_MAX_FPS = 30
+    # Как часто обновлять строку статистики рендера, мс
+    RENDER_STATS_INTERVAL_MS = 1000
+    # Чтение UART — задание "mppt" в util.poll_scheduler (10 мс ≈ 115 байт на 115200)
+    READ_JOB = "mppt"
+    READ_INTERVAL_S = 0.01
+
+    def __init__(
+        self,
+        master,
+        bg: str = "#202124",
+        fg: str = "#e8eaed",
+        ui: Optional[UiQueue] = None,
+        bus: Optional[UiBus] = None,
+        **kwargs,
+    ):
         super().__init__(master, bg=bg, **kwargs)
         self.bg = bg
         self.fg = fg
+        # фоновые шаги инициализации (журнал, список портов) → результат в Tk-поток
+        self.ui = ui or UiQueue(self)
+        # статусы из потоков (reader, GitWorker, ExcelWriter) → виджеты через шину
+        self.bus = bus or UiBus(self)
         self.autoconnect_enabled = True  # автоконнект включён, пока пользователь не нажмёт Disconnect
 
-        # Короткий ID для текущего кадра (CRC16 от UID-строки)
-        self.device_short_id: Optional[str] = None
-
-        # Буфер текущего кадра (между ESC[2J])
-        self._frame_buf: str = ""
-
         # ---------------- Верхняя панель ----------------
         top = Frame(self, bg=bg)
         top.pack(side=TOP, fill=X)
@@ -117,6 +145,18 @@ class MPPTTerminalPanel(Frame):
         )
         self.btn_save.pack(side=LEFT, padx=2)
 
+        # Пересобрать Excel из журнала прямо сейчас (обычно делается в фоне)
+        self.btn_excel = Button(
+            btn_row,
+            text="→ Excel",
+            command=self._rebuild_excel_click,
+            bg="#303134",
+            fg=fg,
+            activebackground="#3c4043",
+            activeforeground=fg,
+        )
+        self.btn_excel.pack(side=LEFT, padx=2)
+
         # Кнопка "+" (удержание)
         self._plus_running = False
         self.btn_plus = Button(
@@ -155,6 +195,38 @@ class MPPTTerminalPanel(Frame):
         )
         self.btn_push.pack(side=LEFT, padx=2)
 
+        # Запись / воспроизведение сырого потока
+        self.btn_rec = Button(
+            btn_row,
+            text="REC",
+            command=self._toggle_record,
+            bg="#303134",
+            fg=fg,
+            activebackground="#3c4043",
+            activeforeground=fg,
+        )
+        self.btn_rec.pack(side=LEFT, padx=2)
+
+        self.btn_replay = Button(
+            btn_row,
+            text="Replay",
+            command=self._replay_click,
+            bg="#303134",
+            fg=fg,
+            activebackground="#3c4043",
+            activeforeground=fg,
+        )
+        self.btn_replay.pack(side=LEFT, padx=2)
+
+        self.replay_speed_var = StringVar(value="1×")
+        ttk.Combobox(
+            btn_row,
+            textvariable=self.replay_speed_var,
+            values=list(self.REPLAY_SPEEDS),
+            width=4,
+            state="readonly",
+        ).pack(side=LEFT, padx=2)
+
         # ---------------- Canvas-терминал ----------------
         self.canvas = Canvas(self, bg=bg, highlightthickness=0)
         self.canvas.pack(side=TOP, fill=BOTH, expand=True, padx=4, pady=4)
@@ -175,8 +247,20 @@ class MPPTTerminalPanel(Frame):
         # Вариант 3: в самом низу панели
         self.git_status_label.pack(side=BOTTOM, fill=X, padx=4, pady=(0, 4))
 
+        # Строка статистики рендера (кадры / пропуски / время отрисовки)
+        self.render_stats_label = Label(
+            self,
+            text="",
+            bg=bg,
+            fg="#80868b",
+            anchor="w",
+            font=("Consolas", 8),
+        )
+        self.render_stats_label.pack(side=BOTTOM, fill=X, padx=4)
+
         # ---------------- Логика терминала ----------------
-        self.serial = SerialAuto(baudrate=115200)
+        # ensure()/автоподбор зовутся из Tk-потока — первого снимка портов не ждём
+        self.serial = SerialAuto(baudrate=115200, ports_wait_s=0)
         self.term = PyteTerminal(cols=64, rows=18)
         self.canvas_term = CanvasTerminal(
             self.canvas,
@@ -188,22 +272,78 @@ class MPPTTerminalPanel(Frame):
             font_size=11,
         )
 
-        self.logger = MPPTLogger(status_callback=self._set_status_stub)
-        # назначаем GUI status_callback (дублируется позже в set_global_status)
-        self.logger.status_callback = self._set_status_stub
-        # и отдельный Git-status
-        self.logger.git_status_callback = self._set_git_status
+        # Git-статусы приходят из потока GitWorker — в Tk переносим через шину
+        # (из пачки статусов за проход показывается последний)
+        self.bus.bind("mppt.git_status", self._apply_git_status)
 
-        # вызываем git pull уже после появления интерфейса
-        self.after(200, self.logger._git_pull_on_start_ui)
+        # Логгер открывается в фоне (миграция журнала, индекс ID, импорт xlsx —
+        # на большом журнале это секунды). До готовности терминал уже работает,
+        # а авто-PASSED не пишется: экран PASSED висит много кадров подряд
+        # и будет записан, как только логгер подключится (см. _on_logger_ready).
+        self.logger: Optional[MPPTLogger] = None
+
+        # Конвейер: нарезка кадров, маскировка UID, шаблон/pyte, авто-PASSED
+        self.pipeline = FramePipeline(
+            self.term,
+            None,
+            cols=64,
+            rows=18,
+            on_frame=self._schedule_render,
+            telemetry=get_telemetry(),
+        )
+        # Конвейер, чей кадр показывается на экране: живой или конвейер replay
+        self._view_pipeline = self.pipeline
+
+        # Запись сырого потока (кнопка REC) и воспроизведение (кнопка Replay)
+        self.recorder: Optional[CaptureRecorder] = None
+        self._replay_thread: Optional[threading.Thread] = None
+        self._replay_stop = False
 
         self.running = False
-        self.thread: Optional[threading.Thread] = None
-        self._render_scheduled = False
+        # поколение задания чтения: задание снимает себя (и сообщает о потере
+        # порта), только если после него не было нового подключения
+        self._read_gen = 0
+        self._read_lock = threading.Lock()
+
+        # Перерисовка с ограничением FPS: reader-поток только помечает экран "грязным"
+        self.render_scheduler = RenderScheduler(
+            self, self._do_render, max_fps=self.RENDER_MAX_FPS
+        )
+        self.render_scheduler.start()
+        # кадры: разобрано / нарисовано / пропущено рендером (перекрыты более новым)
+        rs, pipe = self.render_scheduler, self.pipeline
+        perf.gauge(
+            "mppt.frames",
+            lambda: {"parsed": pipe.frames, "drawn": rs.rendered, "dropped": rs.skipped},
+        )
+        self.after(self.RENDER_STATS_INTERVAL_MS, self._update_render_stats)
 
-        self.rescan_ports()
+        self.ui.submit(
+            lambda: MPPTLogger(status_callback=self._set_status_threadsafe),
+            on_done=self._on_logger_ready,
+            on_error=lambda e: self._set_status_stub(f"MPPT: не удалось открыть журнал: {e}", "red"),
+            name="mppt-logger",
+        )
+        # Список портов — из общего реестра: снимок сразу при подписке,
+        # дальше — только при подключении/отключении адаптеров
+        get_registry().subscribe(self._on_ports_changed)
         self.after(500, self._autoconnect_loop)
 
+    def _on_logger_ready(self, logger: MPPTLogger) -> None:
+        """Tk-поток: логгер открыт — подключаем его к конвейеру и статусам."""
+        logger.status_callback = self._set_status_stub
+        logger.git_status_callback = self._set_git_status
+        self.logger = logger
+        self.pipeline.logger = logger
+        # git pull в фоне (GitWorker)
+        logger.git_pull_async()
+
+    def _logger_ready(self) -> bool:
+        if self.logger is None:
+            self._set_status_stub("MPPT: журнал ещё открывается…", "yellow")
+            return False
+        return True
+
     # --------------------------------------------------------------
     # Статус
     # --------------------------------------------------------------
@@ -214,23 +354,47 @@ class MPPTTerminalPanel(Frame):
         """
         print(msg)
 
+    def _set_status_threadsafe(self, msg: str, color: str = "white") -> None:
+        """
+        Статус из фонового потока (логгер при открытии). Общий статусбар,
+        переданный через set_global_status, сам идёт через шину (AppLayout).
+        """
+        self._set_status_stub(msg, color)
+
     def _set_git_status(self, msg: str, color: str = "#85c1ff") -> None:
-        """Обновление отдельного Git-status-bar внизу панели."""
+        """Git-статус (безопасно из любого потока): применяется насосом шины."""
+        self.bus.set("mppt.git_status", (msg, color))
+
+    def _apply_git_status(self, status) -> None:
+        msg, color = status
         self.git_status_label.config(text=msg, fg=color)
 
+    @property
+    def device_short_id(self) -> Optional[str]:
+        """Короткий ID (CRC16 от UID) текущего кадра."""
+        return self._view_pipeline.device_short_id
+
     def set_global_status(self, status_func) -> None:
         """
         Вызывается AppLayout'ом, чтобы передать общий статусбар.
         """
         self._set_status_stub = status_func
-        self.logger.status_callback = status_func
+        if self.logger is not None:
+            self.logger.status_callback = status_func
 
     # --------------------------------------------------------------
     # Работа с портами
     # --------------------------------------------------------------
     def rescan_ports(self) -> None:
-        """Обновляет список COM-портов с читаемым описанием."""
-        ports = self.serial.list_ports()
+        """Обновляет список COM-портов (опрос — в реестре, результат — в _on_ports_changed)."""
+        get_registry().rescan()
+
+    def _on_ports_changed(self, ports, added, removed) -> None:
+        """Поток реестра портов: перенести снимок в Tk-поток."""
+        self.ui.post(self._apply_ports, self.serial.filter_ports(ports), added, removed)
+
+    def _apply_ports(self, ports, added=(), removed=()) -> None:
+        """Tk-поток: заполнить Combobox портами с читаемым описанием."""
         labels = []
 
         for p in ports:
@@ -256,7 +420,14 @@ class MPPTTerminalPanel(Frame):
             self.port_var.set("")
             self.combo_port["values"] = []
 
-        self._set_status_stub("Порты MPPT обновлены", "green")
+        if added or removed:
+            parts = [f"+{d}" for d in added] + [f"−{d}" for d in removed]
+            self._set_status_stub(f"Порты MPPT: {' '.join(parts)}", "cyan")
+            if added:
+                # новый адаптер — подключаемся сразу, не дожидаясь таймера
+                self._try_autoconnect()
+        else:
+            self._set_status_stub("Порты MPPT обновлены", "green")
 
     def rescan_ports_external(self) -> None:
         """Внешний вызов из других частей GUI."""
@@ -266,22 +437,25 @@ class MPPTTerminalPanel(Frame):
     # Автоконнект
     # --------------------------------------------------------------
     def _autoconnect_loop(self) -> None:
-        if not self.autoconnect_enabled:
-            self.after(500, self._autoconnect_loop)
+        self._try_autoconnect()
+        self.after(500, self._autoconnect_loop)
+
+    def _try_autoconnect(self) -> None:
+        if not self.autoconnect_enabled or self.running:
             return
 
-        if not self.running:
-            port_display = self.port_var.get().strip() or None
-            port = extract_com_number(port_display) if port_display else None
+        port_display = self.port_var.get().strip() or None
+        port = extract_com_number(port_display) if port_display else None
 
-            if self.serial.ensure(port):
-                self.running = True
-                self.btn_connect.config(text=f"Disconnect ({self.serial.current_port})")
-                self._set_status_stub(f"Автоподключено к {self.serial.current_port}", "green")
-                self.thread = threading.Thread(target=self._reader_loop, daemon=True)
-                self.thread.start()
+        # выбранного порта нет в снимке реестра — не дёргаем ОС попыткой открыть
+        if port and not any(p.device == port for p in get_registry().ports(wait_s=0)):
+            return
 
-        self.after(500, self._autoconnect_loop)
+        if self.serial.ensure(port):
+            self.running = True
+            self.btn_connect.config(text=f"Disconnect ({self.serial.current_port})")
+            self._set_status_stub(f"Автоподключено к {self.serial.current_port}", "green")
+            self._start_reader()
 
     # --------------------------------------------------------------
     # Ручное подключение
@@ -323,14 +497,34 @@ class MPPTTerminalPanel(Frame):
         self.btn_connect.config(text=f"Disconnect ({self.serial.current_port})")
         self._set_status_stub(f"Подключено к {self.serial.current_port}", "green")
 
-        self.thread = threading.Thread(target=self._reader_loop, daemon=True)
-        self.thread.start()
+        self._start_reader()
+
+    # --------------------------------------------------------------
+    # Приостановка (многостанционный режим забирает COM-порты себе)
+    # --------------------------------------------------------------
+    def suspend(self) -> None:
+        """Отключиться и не переподключаться, пока не вызван resume()."""
+        self.autoconnect_enabled = False
+        if self.running:
+            self.running = False
+            try:
+                self.serial.close()
+            except Exception:
+                pass
+            self.btn_connect.config(text="Connect")
+
+    def resume(self) -> None:
+        """Вернуть автоподключение после suspend()."""
+        self.autoconnect_enabled = True
 
     # --------------------------------------------------------------
     # Обработка потери порта
     # --------------------------------------------------------------
-    def _on_port_lost(self, msg: str) -> None:
+    def _on_port_lost(self, msg: str, gen: int) -> None:
         """Обработчик потери COM-порта (вызывается из GUI-потока)."""
+        if gen != self._read_gen:
+            # пока сообщение шло в Tk, уже подключились заново
+            return
         self.running = False
         # автоконнект НЕ выключаем — пусть дальше пытается переподключиться
         try:
@@ -344,104 +538,151 @@ class MPPTTerminalPanel(Frame):
     # --------------------------------------------------------------
     # Чтение UART + буферизация по кадрам (между ESC[2J])
     # --------------------------------------------------------------
-    def _reader_loop(self) -> None:
-        esc = self.ESC_CLEAR
-
-        while self.running and self.serial.ser:
-            try:
-                data = self.serial.ser.read_all()
-            except Exception:
+    def _start_reader(self) -> None:
+        with self._read_lock:
+            self._read_gen += 1
+            gen = self._read_gen
+            get_scheduler().add(self.READ_JOB, lambda: self._read_once(gen), self.READ_INTERVAL_S)
+
+    def _drop_read_job(self, gen: int) -> bool:
+        """Снять задание чтения, если оно ещё текущее (не заменено новым подключением)."""
+        with self._read_lock:
+            if gen != self._read_gen:
+                return False
+            get_scheduler().remove(self.READ_JOB)
+            return True
+
+    def _read_once(self, gen: int) -> int:
+        """
+        Поток планировщика: забрать всё, что пришло в UART, и отдать конвейеру.
+        Вызовы одного задания не пересекаются — порядок байтов сохраняется.
+        """
+        if gen != self._read_gen:
+            # запоздалый вызов старого задания: порт уже читает новое
+            return 0
+        ser = self.serial.ser
+        if not self.running or ser is None:
+            # отключились (кнопка / suspend / потеря порта) — задание больше не нужно
+            self._drop_read_job(gen)
+            return 0
+        t0 = PROBE_SERIAL.start()
+        try:
+            data = ser.read_all()
+        except Exception:
+            if self._drop_read_job(gen):
                 msg = f"COM-порт {self.serial.current_port or ''} недоступен (устройство отключено?)"
-                self.after(0, lambda m=msg: self._on_port_lost(m))
-                break
+                self.ui.post(self._on_port_lost, msg, gen)
+            return 0
 
-            if not data:
-                time.sleep(0.01)
-                continue
+        PROBE_SERIAL.stop(t0)
+        if not data:
+            return 0
+        SERIAL_BYTES.add(len(data))
 
-            chunk = data.decode(errors="ignore").replace("\x00", "")
-            if not chunk:
-                continue
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.write(data)
 
-            buf = chunk
+        self.pipeline.feed_bytes(data)
+        return len(data)
 
-            # Разбираем текущий chunk на части относительно ESC[2J]
-            while True:
-                idx = buf.find(esc)
-                if idx == -1:
-                    # в этом куске больше нет ESC[2J] — просто добавляем остаток в текущий кадр
-                    self._frame_buf += buf
-                    break
+    # --------------------------------------------------------------
+    # Запись / воспроизведение сырого потока
+    # --------------------------------------------------------------
+    def _toggle_record(self) -> None:
+        """Кнопка REC: начать/остановить запись сырого потока в *.v7cap."""
+        if self.recorder is not None:
+            rec = self.recorder
+            self.recorder = None
+            rec.close()
+            self.btn_rec.config(text="REC", bg="#303134")
+            self._set_status_stub(
+                f"Запись остановлена: {rec.path} ({rec.chunks} кусков, {rec.bytes} байт)",
+                "yellow",
+            )
+            return
 
-                # всё до ESC[2J] — хвост предыдущего кадра
-                prefix = buf[:idx]
-                if prefix:
-                    self._frame_buf += prefix
+        path = get_capture_path("mppt")
+        try:
+            self.recorder = CaptureRecorder(path)
+        except OSError as e:
+            self._set_status_stub(f"Не удалось начать запись: {e}", "red")
+            return
+        self.btn_rec.config(text="■ REC", bg="#8a2d2d")
+        self._set_status_stub(f"Запись потока MPPT: {path}", "cyan")
 
-                # если в буфере уже что-то есть — это завершённый кадр
-                if self._frame_buf:
-                    self._process_full_frame(self._frame_buf)
+    def _replay_click(self) -> None:
+        """Кнопка Replay: воспроизвести *.v7cap через конвейер панели."""
+        if self._replay_thread is not None:
+            self._replay_stop = True
+            return
 
-                # начинаем новый кадр: кладём ESC[2J] как начало
-                self._frame_buf = esc
+        if self.running:
+            self._set_status_stub("Replay: сначала отключите COM-порт", "yellow")
+            return
 
-                # обрезаем обработанную часть + ESC[2J]
-                buf = buf[idx + len(esc):]
+        path = filedialog.askopenfilename(
+            title="Запись MPPT",
+            initialdir=DEFAULT_CAPTURE_DIR,
+            filetypes=[("v7 capture", f"*{CAPTURE_EXT}*"), ("Все файлы", "*.*")],
+        )
+        if path:
+            self.replay_capture(path, self.REPLAY_SPEEDS.get(self.replay_speed_var.get(), 1.0))
 
-    # --------------------------------------------------------------
-    # Обработка завершённого кадра
-    # --------------------------------------------------------------
-    def _process_full_frame(self, frame_text: str) -> None:
+    def replay_capture(self, path: str, speed: float = 1.0) -> None:
         """
-        На вход приходит ПОЛНЫЙ кадр, начинающийся с ESC[2J] и заканчивающийся
-        перед следующим ESC[2J].
+        Воспроизвести запись через такой же конвейер, как у живого потока,
+        но отдельный: без логгера и телеметрии — replay не пишет PASSED
+        в журнал/xlsx/git и не засоряет телеметрию. Терминал общий (и его
+        блокировка), на экране — кадры replay.
+        speed: 1.0 — реальное время, N — ускорение, <= 0 — максимально быстро.
         """
-        # --- 1. UID → short ID ---
-        m = self.UID_REGEX.search(frame_text)
-
-        if not m:
-            # В этом кадре UID нет — ID для этого кадра отсутствует
-            self.device_short_id = None
-        else:
-            full_uid = m.group(1)  # например "7-c-32305311-20383346" или любой другой вариант
-
-            # CRC считаем по UID как по строке (ASCII)
-            uid_bytes = full_uid.encode("ascii", errors="ignore")
-            crc = zlib.crc32(uid_bytes) & 0xFFFF
-            short = f"{crc:04X}"
+        if self._replay_thread is not None:
+            return
 
-            self.device_short_id = short
-            start, end = m.span()
-            masked = f"ID:{short}".ljust(end - start)
-            frame_text = frame_text[:start] + masked + frame_text[end:]
+        pipe = FramePipeline(
+            self.term,
+            None,
+            cols=64,
+            rows=18,
+            on_frame=self._schedule_render,
+            telemetry=None,
+        )
+        pipe.term_lock = self.pipeline.term_lock
+        self._view_pipeline = pipe
 
-        # --- 2. Кормим pyte целым кадром ---
-        self.term.feed(frame_text)
+        self._replay_stop = False
+        self.btn_replay.config(text="Stop replay")
+        self._set_status_stub(f"Replay: {path}", "cyan")
 
-        # --- 3. Авто-PASSED-сохранение ---
-        try:
-            lines = self.term.get_lines()
-        except Exception:
-            lines = []
-
-        has_passed = False
-        if lines:
-            plain_lines = [strip_ansi(l) for l in lines]
-            for ln in plain_lines:
-                if "PASSED" in ln.upper():
-                    has_passed = True
-                    break
+        def worker():
+            try:
+                res = replay(
+                    path,
+                    pipe.feed_bytes,
+                    speed=speed,
+                    stop_flag=lambda: self._replay_stop,
+                )
+                frames = pipe.stats()["frames"]
+                msg = (
+                    f"Replay завершён: {res['chunks']} кусков, {frames} кадров "
+                    f"за {res['elapsed_s']:.2f} с"
+                )
+                color = "green"
+            except Exception as e:
+                msg = f"Replay ошибка: {e}"
+                color = "red"
+            self.ui.post(self._on_replay_done, msg, color)
 
-        if has_passed:
-            self.logger.save_block(
-                lines,
-                getattr(self.canvas_term, "last_colors", None),
-                self.device_short_id,
-                auto=True,
-            )
+        self._replay_thread = threading.Thread(target=worker, daemon=True)
+        self._replay_thread.start()
 
-        # --- 4. Обновляем UI ---
-        self._schedule_render()
+    def _on_replay_done(self, msg: str, color: str) -> None:
+        self._replay_thread = None
+        self._view_pipeline.sync_term()
+        self._view_pipeline = self.pipeline
+        self.btn_replay.config(text="Replay")
+        self._set_status_stub(msg, color)
 
     # --------------------------------------------------------------
     # Кнопка "+"
@@ -481,6 +722,8 @@ class MPPTTerminalPanel(Frame):
     # --------------------------------------------------------------
     def _git_commit_click(self) -> None:
         """Обработчик кнопки Commit — делаем git commit логов."""
+        if not self._logger_ready():
+            return
         try:
             self.logger.git_commit_logs()
         except Exception as e:
@@ -488,26 +731,53 @@ class MPPTTerminalPanel(Frame):
 
     def _git_push_click(self) -> None:
         """Обработчик кнопки Push — делаем git push."""
+        if not self._logger_ready():
+            return
         try:
             self.logger.git_push()
         except Exception as e:
             self._set_git_status(f"Git: ошибка при push: {e}", "red")
 
+    # --------------------------------------------------------------
+    # Excel
+    # --------------------------------------------------------------
+    def _rebuild_excel_click(self) -> None:
+        """Пересборка xlsx из журнала в фоне (не блокирует GUI)."""
+        if not self._logger_ready():
+            return
+
+        def worker():
+            if self.logger.rebuild_xlsx():
+                self._set_status_stub(f"Excel обновлён: {self.logger.xlsx_path}", "green")
+
+        threading.Thread(target=worker, daemon=True).start()
+
     # --------------------------------------------------------------
     # Рендер
     # --------------------------------------------------------------
     def _schedule_render(self) -> None:
-        if self._render_scheduled:
-            return
-        self._render_scheduled = True
-        self.after(0, self._do_render)
+        """Запросить перерисовку (безопасно из reader-потока)."""
+        self.render_scheduler.request()
 
     def _do_render(self) -> None:
-        self._render_scheduled = False
-        if not self.running:
+        """Вызывается RenderScheduler'ом из main-thread не чаще RENDER_MAX_FPS."""
+        if not self.running and self._replay_thread is None:
             return
 
-        self.canvas_term.render_diff()
+        pipe = self._view_pipeline
+        with pipe.term_lock:
+            pipe.sync_term_locked()
+            t0 = PROBE_RENDER.start()
+            self.canvas_term.render_diff()
+            PROBE_RENDER.stop(t0)
+
+    def render_stats(self) -> dict:
+        """Статистика рендера: отрисовано/пропущено кадров и перцентили времени."""
+        return self.render_scheduler.stats()
+
+    def _update_render_stats(self) -> None:
+        self.render_stats_label.config(text=self.render_scheduler.format_stats())
+        self.after(self.RENDER_STATS_INTERVAL_MS, self._update_render_stats)
 
     # --------------------------------------------------------------
     # Ручное логирование
@@ -516,8 +786,11 @@ class MPPTTerminalPanel(Frame):
         """
         Сохраняем текущий экран по кнопке:
         - lines  — строки pyte (без ANSI)
-        - colors — матрица цветов из CanvasTerminal.last_colors
+        - colors — матрица цветов текущего экрана pyte
         """
+        if not self._logger_ready():
+            return
+        self._view_pipeline.sync_term()
         lines = self.term.get_lines()
-        color_matrix = getattr(self.canvas_term, "last_colors", None)
-        self.logger.save_block(lines, color_matrix, self.device_short_id)
+        color_matrix = self.term.color_matrix()
+        self.logger.save_block(lines, color_matrix, self.device_short_id, uid=self._view_pipeline.device_uid)
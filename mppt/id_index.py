@@ -0,0 +1,171 @@
+# mppt/id_index.py
+"""
+Постоянный индекс UID плат, попавших в лист PASSED.
+
+Нужен, чтобы отличать новую плату от повторного теста не только в пределах
+сеанса (MPPTLogger.last_passed_id), но и между станциями и перезапусками.
+Ключ — полный UID платы: 16-битный ID (CRC16) на экране и в листах
+совпадает у разных плат уже на сотнях штук и для решения «повтор» не годится.
+
+Файл (mppt_uids.tsv) — append-only, одна строка на событие:
+    UID <TAB> first_seen <TAB> last_seen <TAB> count
+При загрузке строки сливаются в dict (first = min, last = max, count — сумма),
+поэтому проверка UID — O(1), а запись — одна строка в конец файла.
+Когда событий становится заметно больше, чем UID, файл компактируется
+(по строке на UID, атомарная подмена через os.replace).
+
+Если файла нет, индекс один раз строится из журнала (mppt.journal) по листу
+PASSED — из записей с полем "uid" (старые записи без UID в индекс не попадают).
+Если есть — при старте дополняется UID из последнего шарда журнала, которых
+в нём нет (сбой между записью журнала и индекса).
+"""
+
+from __future__ import annotations
+
+import os
+import threading
+from typing import Dict, Iterable, Optional
+
+
+class IdEntry:
+    """Сводка по одному UID (время — строки "YYYY-mm-dd HH:MM:SS")."""
+
+    __slots__ = ("first", "last", "count")
+
+    def __init__(self, first: str, last: str, count: int = 1):
+        self.first = first
+        self.last = last
+        self.count = count
+
+    @property
+    def is_retest(self) -> bool:
+        return self.count > 1
+
+    def merge(self, first: str, last: str, count: int) -> None:
+        if first and (not self.first or first < self.first):
+            self.first = first
+        if last > self.last:
+            self.last = last
+        self.count += count
+
+
+class IdIndex:
+    """
+    Потокобезопасный индекс UID → IdEntry.
+
+    path          — файл индекса
+    compact_ratio — компактировать при загрузке, если строк больше, чем UID × ratio
+    """
+
+    def __init__(self, path: str, compact_ratio: float = 2.0):
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self._lock = threading.Lock()
+        self._ids: Dict[str, IdEntry] = {}
+        self._lines = 0
+
+        if os.path.exists(path):
+            self._load()
+            if self._ids and self._lines > len(self._ids) * self.compact_ratio:
+                self.compact()
+
+    # ----------------------------------------------------------
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, uid: str) -> bool:
+        return uid.strip() in self._ids
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def lookup(self, uid: str) -> Optional[IdEntry]:
+        return self._ids.get(uid.strip())
+
+    def record(self, uid: str, ts: str) -> IdEntry:
+        """Отметить, что плата попала в PASSED. Возвращает обновлённую запись."""
+        key = uid.strip()
+        with self._lock:
+            entry = self._ids.get(key)
+            if entry is None:
+                entry = IdEntry(ts, ts, 1)
+                self._ids[key] = entry
+            else:
+                entry.merge(ts, ts, 1)
+            self._append_lines([f"{key}\t{ts}\t{ts}\t1\n"])
+            return entry
+
+    # ----------------------------------------------------------
+    def bootstrap(self, records: Iterable[dict]) -> int:
+        """Построить индекс из записей журнала (лист PASSED, поле uid). Возвращает число UID."""
+        with self._lock:
+            for rec in records:
+                if rec.get("sheet") != "PASSED":
+                    continue
+                key = str(rec.get("uid") or "").strip()
+                if not key:
+                    continue
+                ts = rec.get("ts", "")
+                entry = self._ids.get(key)
+                if entry is None:
+                    self._ids[key] = IdEntry(ts, ts, 1)
+                else:
+                    entry.merge(ts, ts, 1)
+            lines = [f"{k}\t{e.first}\t{e.last}\t{e.count}\n" for k, e in self._ids.items()]
+            self._append_lines(lines)
+        return len(self._ids)
+
+    def catch_up(self, records: Iterable[dict]) -> int:
+        """Добавить UID из записей PASSED, которых в индексе нет. Возвращает число добавленных."""
+        lines = []
+        with self._lock:
+            for rec in records:
+                key = str(rec.get("uid") or "").strip()
+                if rec.get("sheet") != "PASSED" or not key or key in self._ids:
+                    continue
+                ts = rec.get("ts", "")
+                self._ids[key] = IdEntry(ts, ts, 1)
+                lines.append(f"{key}\t{ts}\t{ts}\t1\n")
+            self._append_lines(lines)
+        return len(lines)
+
+    def compact(self) -> None:
+        """Переписать файл по строке на UID (атомарно)."""
+        with self._lock:
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for k, e in self._ids.items():
+                    f.write(f"{k}\t{e.first}\t{e.last}\t{e.count}\n")
+            os.replace(tmp, self.path)
+            self._lines = len(self._ids)
+
+    # ----------------------------------------------------------
+    def _load(self) -> None:
+        ids = self._ids
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    # недописанная строка (сбой при записи)
+                    break
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) != 4 or not parts[0]:
+                    continue
+                key, first, last, count = parts
+                try:
+                    n = int(count)
+                except ValueError:
+                    continue
+                self._lines += 1
+                entry = ids.get(key)
+                if entry is None:
+                    ids[key] = IdEntry(first, last, n)
+                else:
+                    entry.merge(first, last, n)
+
+    def _append_lines(self, lines) -> None:
+        if not lines:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+        self._lines += len(lines)
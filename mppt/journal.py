@@ -0,0 +1,353 @@
+# mppt/journal.py
+"""
+Append-only журнал результатов MPPT — основное хранилище строк лога.
+
+Журнал разбит по дням: <logs>/journal/YYYY-MM-DD.jsonl. Каждая запись —
+одна строка JSON (JSONL):
+    {"ts": "2025-01-01 12:00:00", "sheet": "PASSED",
+     "values": ["BCFB", "++++++", ...], "colors": ["000000", "00AA00", ...],
+     "uid": "7-c-32305311-20383346", "id": "3f2a9c0d1e4b5a67"}
+("uid" — полный UID платы, если был в кадре; по нему строится индекс повторов.
+ "id" — уникальный ключ записи: по нему xlsx помнит, докуда он собран, —
+ позиция строки ненадёжна, git pull/rebase вставляет строки других станций.)
+
+Шарды — текстовые и только дописываются, поэтому git хранит их дельтами,
+а старые дни вообще не меняются: clone/pull/add остаются быстрыми годами.
+
+Журнал — это write-ahead log: строка результата пишется и сбрасывается на
+диск (fsync) ДО любой работы с txt/xlsx. Всё остальное восстанавливается
+из журнала, так что сбой питания не теряет результатов:
+- xlsx дописывается с записи, следующей за отметкой (record_key) в книге,
+  а если журнал до отметки изменился — собирается заново;
+- индекс UID при старте дополняется из последнего шарда (сбой между записью
+  журнала и индекса), а без файла индекса — строится из журнала целиком.
+Недописанная при сбое строка в конце шарда закрывается "\n" перед следующей
+записью (и при открытии журнала) — иначе новая строка склеилась бы с ней
+и тоже стала бы нечитаемой.
+
+- append()  — O(1): дописать строку в шард дня записи, без перечитывания лога
+- records() — прочитать все записи по порядку дней (недописанная строка пропускается)
+- migrate_legacy() — перенести старый единый mppt_log.jsonl в шарды
+- build_workbook() / materialize_workbook() — собрать mppt_log.xlsx (листы
+  Sheet / PASSED, цвета шрифта как у _excel_color_from_hex) из журнала
+- append_row() / save_workbook_atomic() — инкрементальная дозапись и атомарное
+  сохранение (используются mppt.excel_writer.ExcelWriter)
+- import_workbook() — одноразовый перенос истории из старого xlsx в журнал
+- backup_corrupt_xlsx() — отодвинуть нечитаемый xlsx, прежде чем собирать новый
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+
+SHEETS = ("Sheet", "PASSED")
+SHARD_EXT = ".jsonl"
+# Шард для записей без даты (старый перенос истории из xlsx) — идёт первым
+UNDATED_SHARD = "0000-00-00"
+# Так json.dumps() пишет лист PASSED — для быстрого подсчёта строк без разбора JSON
+_PASSED_MARK = '"sheet": "PASSED"'
+
+
+def record_key(rec: dict) -> str:
+    """Ключ записи: её "id", а у старых записей без id — хеш содержимого."""
+    key = rec.get("id")
+    if key:
+        return str(key)
+    raw = json.dumps(rec, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return "h" + hashlib.sha1(raw).hexdigest()[:16]
+
+
+def shard_name(ts: str) -> str:
+    """Имя шарда (день) по метке времени "YYYY-mm-dd HH:MM:SS"."""
+    day = ts[:10]
+    return day if len(day) == 10 else UNDATED_SHARD
+
+
+class ResultJournal:
+    """Потокобезопасный JSONL-журнал строк лога, по файлу на день."""
+
+    def __init__(self, dir_path: str, fsync: bool = True):
+        self.dir = dir_path
+        # fsync каждой записи (write-ahead); False — только для тестов/бенчмарков
+        self.fsync = fsync
+        self._lock = threading.Lock()
+        # сколько строк в каждом листе (для статуса "строка N")
+        self.counts: Dict[str, int] = {name: 0 for name in SHEETS}
+        # ключ (record_key) последней записи, сделанной через append()
+        self.last_key: Optional[str] = None
+
+        for path in self.shard_paths():
+            _terminate_torn_line(path)
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if not line.endswith("\n") or not line.strip():
+                        continue
+                    sheet = "PASSED" if _PASSED_MARK in line else "Sheet"
+                    self.counts[sheet] += 1
+
+    # ----------------------------------------------------------
+    def shard_paths(self) -> List[str]:
+        """Файлы шардов по порядку дней."""
+        if not os.path.isdir(self.dir):
+            return []
+        names = sorted(n for n in os.listdir(self.dir) if n.endswith(SHARD_EXT))
+        return [os.path.join(self.dir, n) for n in names]
+
+    def shard_path(self, ts: str) -> str:
+        return os.path.join(self.dir, shard_name(ts) + SHARD_EXT)
+
+    def exists(self) -> bool:
+        return bool(self.shard_paths())
+
+    def latest_mtime(self) -> float:
+        """Время последнего изменения журнала (0 — журнала нет)."""
+        return max((os.path.getmtime(p) for p in self.shard_paths()), default=0.0)
+
+    def append(self, sheet: str, values: List[str], colors: List[str], ts: str, uid: Optional[str] = None) -> int:
+        """Дописать строку. Возвращает номер строки на листе (с учётом шапки)."""
+        rec = {"ts": ts, "sheet": sheet, "values": list(values), "colors": list(colors)}
+        if uid:
+            rec["uid"] = uid
+        rec["id"] = uuid.uuid4().hex[:16]
+        line = json.dumps(rec, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._write(self.shard_path(ts), line, self.fsync)
+            self.counts[sheet] = self.counts.get(sheet, 0) + 1
+            self.last_key = rec["id"]
+            return self.counts[sheet] + 1
+
+    def append_many(self, sheet_rows, ts: str) -> int:
+        """
+        Дописать пачку строк [(sheet, values, colors), ...] с одной меткой
+        времени: одна запись в шард и один fsync на всю пачку (перенос
+        истории). Возвращает число строк.
+        """
+        lines = []
+        counts: Dict[str, int] = {}
+        last_key = None
+        for sheet, values, colors in sheet_rows:
+            last_key = uuid.uuid4().hex[:16]
+            rec = {"ts": ts, "sheet": sheet, "values": list(values), "colors": list(colors), "id": last_key}
+            lines.append(json.dumps(rec, ensure_ascii=False) + "\n")
+            counts[sheet] = counts.get(sheet, 0) + 1
+        if not lines:
+            return 0
+        with self._lock:
+            self._write(self.shard_path(ts), "".join(lines), self.fsync)
+            for sheet, k in counts.items():
+                self.counts[sheet] = self.counts.get(sheet, 0) + k
+            self.last_key = last_key
+        return len(lines)
+
+    def records(self) -> Iterator[dict]:
+        """Все записи журнала по порядку."""
+        for path in self.shard_paths():
+            yield from _read_jsonl(path)
+
+    def last_shard_records(self) -> Iterator[dict]:
+        """Записи последнего шарда (там же и последняя запись перед сбоем)."""
+        paths = self.shard_paths()
+        if paths:
+            yield from _read_jsonl(paths[-1])
+
+    def migrate_legacy(self, legacy_path: str) -> int:
+        """
+        Перенести старый единый журнал в шарды (если шардов ещё нет).
+        Старый файл переименовывается в *.migrated. Возвращает число записей.
+        """
+        if self.exists() or not os.path.exists(legacy_path):
+            return 0
+        shards: Dict[str, List[str]] = {}
+        n = 0
+        for rec in _read_jsonl(legacy_path):
+            line = json.dumps(rec, ensure_ascii=False) + "\n"
+            shards.setdefault(self.shard_path(rec.get("ts", "")), []).append(line)
+            sheet = rec.get("sheet", "Sheet")
+            self.counts[sheet] = self.counts.get(sheet, 0) + 1
+            n += 1
+        with self._lock:
+            for path, lines in sorted(shards.items()):
+                self._write(path, "".join(lines), True)
+        os.replace(legacy_path, legacy_path + ".migrated")
+        return n
+
+    def _write(self, path: str, text: str, sync: bool) -> None:
+        """Дописать текст в шард; sync — fsync файла (и каталога для нового шарда)."""
+        is_new = not os.path.exists(path)
+        if is_new:
+            os.makedirs(self.dir, exist_ok=True)
+        else:
+            _terminate_torn_line(path)
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(text)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        if sync and is_new:
+            _fsync_dir(self.dir)
+
+
+def _fsync_dir(path: str) -> None:
+    """fsync каталога — чтобы новый файл пережил сбой питания (на Windows не нужно)."""
+    if os.name == "nt":
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _terminate_torn_line(path: str) -> bool:
+    """
+    Если шард кончается не на "\n" (сбой посреди записи) — дописать "\n".
+    Недописанная строка остаётся отдельной (и пропускается при чтении, если
+    JSON неполный), а следующая запись не склеивается с ней. True — дописали.
+    """
+    try:
+        with open(path, "rb+") as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() == 0:
+                return False
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) == b"\n":
+                return False
+            f.write(b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+            return True
+    except OSError:
+        return False
+
+
+def _read_jsonl(path: str) -> Iterator[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                # недописанная строка (запись идёт прямо сейчас или был сбой)
+                break
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+# ----------------------------------------------------------------------
+# Excel-представление журнала
+# ----------------------------------------------------------------------
+
+def build_workbook(records, header: List[str]):
+    """Собрать Workbook (листы Sheet / PASSED) из записей журнала в памяти."""
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.title = "Sheet"
+    ws.append(list(header))
+    ws_passed = wb.create_sheet("PASSED")
+    ws_passed.append(list(header))
+
+    fonts: Dict[str, object] = {}
+    for rec in records:
+        target = ws_passed if rec.get("sheet") == "PASSED" else ws
+        append_row(target, rec.get("values", []), rec.get("colors", []), fonts)
+    return wb
+
+
+def append_row(ws, values: List[str], colors: List[str], fonts: Optional[Dict[str, object]] = None) -> int:
+    """
+    Дописать строку в лист с цветами шрифта. Возвращает номер строки.
+    fonts — кеш Font по цвету (Font неизменяемый, один экземпляр на цвет).
+    """
+    from openpyxl.styles import Font
+
+    row_idx = ws.max_row + 1
+    for i, (val, col) in enumerate(zip(values, colors), start=1):
+        cell = ws.cell(row=row_idx, column=i, value=val)
+        font = fonts.get(col) if fonts is not None else None
+        if font is None:
+            font = Font(color=col)
+            if fonts is not None:
+                fonts[col] = font
+        cell.font = font
+    return row_idx
+
+
+def save_workbook_atomic(wb, xlsx_path: str) -> None:
+    """
+    Сохранить во временный файл и атомарно подменить xlsx_path (os.replace):
+    обрыв посередине не портит существующий файл. PermissionError (файл
+    открыт в Excel) пробрасывается вызывающему.
+    """
+    os.makedirs(os.path.dirname(xlsx_path) or ".", exist_ok=True)
+    tmp = xlsx_path + ".tmp"
+    wb.save(tmp)
+    os.replace(tmp, xlsx_path)
+
+
+def backup_corrupt_xlsx(xlsx_path: str) -> str:
+    """
+    Переименовать нечитаемый xlsx в <имя>.YYYYmmdd_HHMMSS.corrupt рядом с ним
+    (до того, как на его месте будет собрана книга из журнала). Возвращает
+    путь копии; OSError (файл занят) пробрасывается — тогда xlsx не трогаем.
+    """
+    stamp = f"{xlsx_path}.{datetime.now():%Y%m%d_%H%M%S}"
+    backup = stamp + ".corrupt"
+    n = 1
+    while os.path.exists(backup):
+        # второй битый файл в ту же секунду не затирает первую копию
+        n += 1
+        backup = f"{stamp}-{n}.corrupt"
+    os.replace(xlsx_path, backup)
+    return backup
+
+
+def materialize_workbook(records, xlsx_path: str, header: List[str]) -> None:
+    """Пересобрать xlsx из записей журнала и атомарно сохранить."""
+    save_workbook_atomic(build_workbook(records, header), xlsx_path)
+
+
+def import_workbook(xlsx_path: str, journal: ResultJournal, ts: Optional[str] = None) -> int:
+    """
+    Перенести строки существующего xlsx (листы Sheet / PASSED) в журнал —
+    одной записью в шард, с одним fsync (или ничего, если файл не читается).
+    Цвет берётся из шрифта ячейки. Времени строк в xlsx нет: ts по умолчанию —
+    время изменения файла (отчёт не получит пустых дат). Возвращает число строк.
+    """
+    from openpyxl import load_workbook
+
+    if ts is None:
+        ts = datetime.fromtimestamp(os.path.getmtime(xlsx_path)).strftime("%Y-%m-%d %H:%M:%S")
+    # файлом, а не путём: openpyxl проверяет расширение, а повтор идёт из *.corrupt
+    with open(xlsx_path, "rb") as f:
+        wb = load_workbook(f)
+    rows = []
+    for name in SHEETS:
+        if name not in wb.sheetnames:
+            continue
+        ws = wb[name]
+        for row in ws.iter_rows(min_row=2):
+            values = ["" if c.value is None else str(c.value) for c in row]
+            if not any(values):
+                continue
+            colors = []
+            for c in row:
+                rgb = getattr(getattr(c.font, "color", None), "rgb", None)
+                colors.append(rgb[-6:].upper() if isinstance(rgb, str) else "000000")
+            rows.append((name, values, colors))
+    return journal.append_many(rows, ts)
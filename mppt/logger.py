@@ -8,15 +8,98 @@ from __future__ import annotations
 import os
 import re
 import subprocess
+import threading
 import time
 from typing import Callable, Optional, Tuple, List
 
-from openpyxl import Workbook, load_workbook
-from openpyxl.styles import Font
-
-from util.fileutil import get_log_paths, timestamp_str
+from util.fileutil import (
+    JOURNAL_LOG,
+    LOGS_GITATTRIBUTES,
+    LOGS_GITIGNORE,
+    get_id_index_path,
+    get_journal_dir,
+    get_journal_path,
+    get_log_paths,
+    get_txt_dir,
+    timestamp_str,
+)
 from util.ansi import strip_ansi
 from mppt.terminal_pyte import PYTE_FG_TO_HEX
+from mppt.journal import ResultJournal, backup_corrupt_xlsx, import_workbook, shard_name
+from mppt.excel_writer import ExcelWriter
+from mppt.id_index import IdIndex
+from util.git_worker import GitWorker
+from util import perf
+
+PROBE_SAVE = perf.probe("mppt.save")
+
+
+# Шапка Excel-листов (порядок колонок = порядок значений в _parse_frame)
+LOG_HEADER: List[str] = [
+    "ID",
+    "UART",
+    "Voltage",
+    "U_bat",
+    "U_src",
+    "Current",
+    "I_crg",
+    "I_ch1",
+    "I_ch2",
+    "Charger",
+    "M_sens",
+    "L_sens",
+]
+
+# Поля кадра MPPT: (label, column_index, mode)
+#   bracket — значение в [...] ("UART  [++++++]")
+#   number  — число после метки ("U_bat  14002   mV")
+FIELD_RULES: List[Tuple[str, int, str]] = [
+    ("UART", 1, "bracket"),
+    ("Voltage", 2, "bracket"),
+    ("U_bat", 3, "number"),
+    ("U_src", 4, "number"),
+    ("Current", 5, "bracket"),
+    ("I_crg", 6, "number"),
+    ("I_ch1", 7, "number"),
+    ("I_ch2", 8, "number"),
+    ("Charger", 9, "bracket"),
+    ("M_sens", 10, "bracket"),
+    ("L_sens", 11, "bracket"),
+]
+
+
+# Что означает ошибка git push (по stderr): см. _git_error_kind
+GIT_ERR_REJECTED = "rejected"    # на сервере чужие коммиты — нужен rebase
+GIT_ERR_FATAL = "fatal"          # доступ/адрес/настройка — повтор не поможет
+GIT_ERR_TRANSIENT = "transient"  # сеть, таймаут — повторить позже
+
+_GIT_REJECTED_MARKS = ("non-fast-forward", "fetch first", "tip of your current branch is behind")
+_GIT_FATAL_MARKS = (
+    "authentication failed",
+    "permission denied",
+    "repository not found",
+    "does not appear to be a git repository",
+    "could not read username",
+    "src refspec",
+)
+
+
+def _git_error_kind(stderr: str) -> str:
+    err = (stderr or "").lower()
+    if any(mark in err for mark in _GIT_REJECTED_MARKS):
+        return GIT_ERR_REJECTED
+    if any(mark in err for mark in _GIT_FATAL_MARKS):
+        return GIT_ERR_FATAL
+    return GIT_ERR_TRANSIENT
+
+
+def _hex_set(*names: str) -> frozenset:
+    return frozenset(PYTE_FG_TO_HEX.get(n, "").lstrip("#").lower() for n in names)
+
+
+# Множества считаются один раз (раньше — на каждый вызов, т.е. на каждую строку кадра)
+_GREEN_HEX = _hex_set("green", "brightgreen")
+_RED_HEX = _hex_set("red", "brightred")
 
 
 def _excel_color_from_hex(term_hex: str) -> str:
@@ -31,46 +114,90 @@ def _excel_color_from_hex(term_hex: str) -> str:
         return "000000"
     hex_clean = term_hex.lstrip("#").lower()
 
-    green_set = {
-        PYTE_FG_TO_HEX["green"].lstrip("#").lower(),
-        PYTE_FG_TO_HEX.get("brightgreen", "").lstrip("#").lower(),
-    }
-    red_set = {
-        PYTE_FG_TO_HEX["red"].lstrip("#").lower(),
-        PYTE_FG_TO_HEX.get("brightred", "").lstrip("#").lower(),
-    }
-
-    if hex_clean in green_set:
+    if hex_clean in _GREEN_HEX:
         return "00AA00"
-    if hex_clean in red_set:
+    if hex_clean in _RED_HEX:
         return "FF0000"
     return "000000"
 
 
+# ---------- Предкомпилированный разбор кадра (см. MPPTLogger._parse_plain) ----------
+_ID_RE = re.compile(r"ID:([0-9A-Fa-f]{4})")
+_BRACKET_RE = re.compile(r"\[([^\]]*)\]")
+# Предфильтр: есть ли в строке хоть одна метка (одна регулярка на все)
+_LABELS_RE = re.compile("|".join(re.escape(label) for label, _, _ in FIELD_RULES))
+# (label, колонка, regex числа или None для bracket) — в порядке FIELD_RULES
+_COMPILED_RULES = [
+    (label, col_idx, re.compile(rf"{re.escape(label)}\s+(-?\d+)") if mode == "number" else None)
+    for label, col_idx, mode in FIELD_RULES
+]
+
+
 class MPPTLogger:
     """
     Логгер для MPPT:
 
-    - ведёт txt-лог кадра (сырой текст без ANSI)
-    - пишет в Excel:
+    - ведёт txt-лог кадра (сырой текст без ANSI), по файлу на день: txt/YYYY-MM-DD.txt
+    - каждую строку результата дописывает в append-only журнал, по файлу на
+      день: journal/YYYY-MM-DD.jsonl — это и есть то, что коммитится в git
+    - Excel — локальное представление (в .gitignore): его ведёт фоновый
+      ExcelWriter (книга открыта в памяти, сохранение пачкой) или он
+      пересобирается из журнала по запросу rebuild_xlsx():
         * основной лист "Sheet" — все сохранения
         * лист "PASSED"        — кадры, где есть PASSED
     - защита от повторов: в одном сеансе для одного и того же ID автозапись
-      PASSED делается только один раз
-    - Git-интеграция:
+      PASSED делается только один раз (отдельно для каждой станции)
+    - постоянный индекс UID (mppt_uids.tsv): плата, уже бывшая в PASSED в другом
+      сеансе или на другой станции, считается повторным тестом. Ключ — полный
+      UID, а не 16-битный ID: CRC16 совпадает у разных плат уже на сотнях штук
+    - потокобезопасен: один логгер обслуживает несколько станций
+    - Git-интеграция (все команды — в фоновом GitWorker, с таймаутами):
         * git pull при старте (если каталог логов — git-репозиторий)
         * git add/commit по кнопке
         * git push по кнопке
-      Статусы Git выводятся через git_status_callback, остальное — через status_callback.
+        * автосинхронизация: commit после AUTO_SYNC_ROWS новых строк PASSED или
+          через AUTO_SYNC_INTERVAL_S после первой несинхронизированной строки
+          (что раньше), push в фоне с нарастающей паузой при ошибках
+        * в индекс добавляются только файлы логов (не "git add ." по каталогу)
+      Статусы Git выводятся через git_status_callback (из фонового потока!),
+      остальное — через status_callback.
     """
 
+    # Через сколько секунд после первой несохранённой строки сохранять xlsx
+    XLSX_FLUSH_DELAY_S = 5.0
+    # ... или сразу, если несохранённых строк набралось столько
+    XLSX_FLUSH_ROWS = 200
+    # Повторный тест уже известной платы в авто-режиме в PASSED не пишется
+    # (индекс ID всё равно обновляется: last_seen, count)
+    AUTO_SKIP_RETESTS = True
+    # Повтор, если xlsx открыт в Excel (PermissionError)
+    XLSX_RETRY_DELAY_S = 30.0
+    # Рядом с xlsx: путь копии старого xlsx, историю из которого ещё не удалось
+    # перенести в журнал (перенос повторяется при каждом запуске)
+    XLSX_IMPORT_PENDING_EXT = ".import"
+    # Таймаут одной git-команды (fetch/pull/push при недоступном сервере)
+    GIT_TIMEOUT_S = 20.0
+    # origin для нового репозитория логов (_ensure_git_repo)
+    GIT_ORIGIN_URL = "http://dis-electronics:30000/scheck/swmpptv7_10a_rev1_reject.git"
+    # Автосинхронизация: commit после N строк PASSED или T секунд (0 — выключено)
+    AUTO_SYNC_ROWS = 20
+    AUTO_SYNC_INTERVAL_S = 10 * 60.0
+    # Повтор push при ошибке: 30 с, 60 с, 120 с ... но не реже, чем раз в 15 мин
+    PUSH_BACKOFF_S = 30.0
+    PUSH_BACKOFF_MAX_S = 15 * 60.0
+
     def __init__(
         self,
         base_dir: Optional[str] = None,
         status_callback: Optional[Callable[[str, str], None]] = None,
+        git_origin_url: Optional[str] = None,
+        auto_sync_rows: Optional[int] = None,
+        auto_sync_interval_s: Optional[float] = None,
     ):
-        # пути к txt и xlsx логам
+        # пути к txt и xlsx логам (mppt_log.txt — старый единый лог, больше не пишется)
         self.txt_path, self.xlsx_path = get_log_paths(base_dir)
+        # txt-лог по дням
+        self.txt_dir = get_txt_dir(base_dir)
 
         # общий статус (главный status bar приложения)
         self.status_callback: Optional[Callable[[str, str], None]] = status_callback
@@ -79,9 +206,55 @@ class MPPTLogger:
 
         # запоминаем, для какого ID уже автозаписывали PASSED в этом сеансе
         self.last_passed_id: Optional[str] = None
+        # то же по станциям (многостанционный режим: свой COM-порт — своя станция)
+        self._last_passed_by_station: dict[Optional[str], str] = {}
+
+        # один логгер на несколько станций: запись TXT/Excel строго по очереди
+        self._write_lock = threading.RLock()
 
         # каталог, где лежат логи — там же ожидаем git-репозиторий
         self.logs_dir = os.path.dirname(self.txt_path) or os.getcwd()
+        # git выполняется в своём потоке: сеть не блокирует GUI и запись логов
+        self.git = GitWorker(self.logs_dir, status=self._set_git_status, timeout_s=self.GIT_TIMEOUT_S)
+        self.git_origin_url = git_origin_url or self.GIT_ORIGIN_URL
+
+        # автосинхронизация логов с удалённым репозиторием
+        self.auto_sync_rows = self.AUTO_SYNC_ROWS if auto_sync_rows is None else auto_sync_rows
+        self.auto_sync_interval_s = (
+            self.AUTO_SYNC_INTERVAL_S if auto_sync_interval_s is None else auto_sync_interval_s
+        )
+        self._sync_lock = threading.Lock()
+        self._unsynced_rows = 0
+        self._sync_timer: Optional[threading.Timer] = None
+        self._push_failures = 0
+        self._push_timer: Optional[threading.Timer] = None
+
+        # Основное хранилище строк — append-only журнал по дням; xlsx собирается из него
+        self.journal = ResultJournal(get_journal_dir(base_dir))
+        self._migrate_legacy_journal(get_journal_path(base_dir))
+        self._migrate_xlsx_to_journal()
+        self._ensure_logs_gitignore()
+
+        # UID плат, уже попадавших в PASSED (между сеансами и станциями)
+        self.id_index = IdIndex(get_id_index_path(base_dir))
+        if not self.id_index.exists() and self.journal.exists():
+            self.id_index.bootstrap(self.journal.records())
+        elif self.journal.exists():
+            # сбой между записью журнала и индекса: последняя запись — в последнем шарде
+            self.id_index.catch_up(self.journal.last_shard_records())
+
+        self.xlsx_writer = ExcelWriter(
+            self.xlsx_path,
+            LOG_HEADER,
+            self.journal.records,
+            status=self._set_status,
+            flush_delay_s=self.XLSX_FLUSH_DELAY_S,
+            flush_rows=self.XLSX_FLUSH_ROWS,
+            retry_delay_s=self.XLSX_RETRY_DELAY_S,
+        )
+        # Восстановление после сбоя: дописать в xlsx записи журнала, которых в нём нет
+        if self.journal.exists():
+            self.xlsx_writer.recover()
 
     # ----------------------------------------------------------
     # Статусы
@@ -105,74 +278,109 @@ class MPPTLogger:
         self._set_status(msg, color)
 
     # ----------------------------------------------------------
-    # Excel
+    # Excel (производное представление журнала)
     # ----------------------------------------------------------
-    def _ensure_workbook(self) -> Tuple[Workbook, object, object]:
+    def _migrate_legacy_journal(self, legacy_path: str) -> None:
+        """Одноразово: разложить старый единый mppt_log.jsonl по дням."""
+        try:
+            n = self.journal.migrate_legacy(legacy_path)
+        except Exception as e:
+            self._set_status(f"MPPT: не удалось перенести журнал по дням: {e}", "yellow")
+            return
+        if n:
+            self._set_status(f"MPPT: журнал разложен по дням ({n} строк)", "cyan")
+
+    def _ensure_logs_gitignore(self) -> None:
         """
-        Создаёт/открывает Excel-файл.
-        Возвращает три листа:
-            wb, основной ws, PASSED-лист ws_passed
+        xlsx и служебные файлы — локальные, в репозиторий логов не попадают;
+        append-only логи склеиваются при rebase (.gitattributes, merge=union).
         """
-        # если файл есть — пробуем открыть
-        if os.path.exists(self.xlsx_path):
+        for name, text, marker in (
+            (".gitignore", LOGS_GITIGNORE, os.path.basename(self.xlsx_path)),
+            (".gitattributes", LOGS_GITATTRIBUTES, "merge=union"),
+        ):
+            path = os.path.join(self.logs_dir, name)
             try:
-                wb = load_workbook(self.xlsx_path)
-
-                # основной лист
-                ws = wb.active
-                if ws.title != "Sheet" and "Sheet" in wb.sheetnames:
-                    ws = wb["Sheet"]
-
-                # PASSED-лист
-                if "PASSED" in wb.sheetnames:
-                    ws_passed = wb["PASSED"]
-                else:
-                    ws_passed = wb.create_sheet("PASSED")
-                    # создаём шапку, если в основном листе она есть
-                    if ws.max_row >= 1:
-                        header = [cell.value for cell in ws[1]]
-                        ws_passed.append(header)
+                current = ""
+                if os.path.exists(path):
+                    with open(path, "r", encoding="utf-8") as f:
+                        current = f.read()
+                if marker in current.split():
+                    continue
+                with open(path, "a", encoding="utf-8") as f:
+                    if current and not current.endswith("\n"):
+                        f.write("\n")
+                    f.write(text)
+            except OSError as e:
+                self._set_status(f"MPPT: не удалось записать {name} логов: {e}", "yellow")
+
+    def _migrate_xlsx_to_journal(self) -> None:
+        """
+        Одноразово: перенести историю из существующего xlsx в новый журнал.
 
-                return wb, ws, ws_passed
+        Нечитаемый xlsx переименовывается в *.corrupt ДО того, как ExcelWriter
+        соберёт книгу из (пустого) журнала, и путь копии запоминается в
+        <xlsx>.import: перенос из неё повторяется при следующих запусках,
+        пока не удастся, — пустой журнал не считается всей историей.
+        """
+        marker = self.xlsx_path + self.XLSX_IMPORT_PENDING_EXT
+        source = None
+        if os.path.exists(marker):
+            try:
+                with open(marker, "r", encoding="utf-8") as f:
+                    source = f.read().strip() or None
+            except OSError as e:
+                self._set_status(f"MPPT: не удалось прочитать {marker}: {e}", "yellow")
+                return
+        elif not self.journal.exists() and os.path.exists(self.xlsx_path):
+            source = self.xlsx_path
+        if source is None:
+            return
 
-            except Exception as e:
-                # файл битый — переименуем и создадим новый
-                self._set_status(
-                    f"MPPT: повреждён Excel-лог, создаю новый: {e}", "yellow"
-                )
+        try:
+            n = import_workbook(source, self.journal)
+        except Exception as e:
+            if source == self.xlsx_path:
                 try:
-                    backup = self.xlsx_path + ".corrupt"
-                    os.replace(self.xlsx_path, backup)
-                except OSError:
-                    pass
-
-        # если файла нет или он был битый — создаём новый
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Sheet"
-
-        header = [
-            "ID",
-            "UART",
-            "Voltage",
-            "U_bat",
-            "U_src",
-            "Current",
-            "I_crg",
-            "I_ch1",
-            "I_ch2",
-            "Charger",
-            "M_sens",
-            "L_sens",
-        ]
-        ws.append(header)
+                    source = backup_corrupt_xlsx(self.xlsx_path)
+                except OSError as e2:
+                    # не переименовали — ExcelWriter тоже не перезапишет его без копии
+                    self._set_status(f"MPPT: Excel-лог не читается ({e}) и не переименован: {e2}", "red")
+                    return
+                try:
+                    with open(marker, "w", encoding="utf-8") as f:
+                        f.write(source + "\n")
+                except OSError as e2:
+                    self._set_status(f"MPPT: не удалось записать {marker}: {e2}", "yellow")
+            self._set_status(
+                f"MPPT: не удалось перенести Excel-лог в журнал ({e}); копия: {source}, "
+                f"повтор при следующем запуске",
+                "yellow",
+            )
+            return
+
+        if source != self.xlsx_path:
+            try:
+                os.remove(marker)
+            except OSError:
+                pass
+        self._set_status(f"MPPT: история Excel перенесена в журнал ({n} строк)", "cyan")
 
-        ws_passed = wb.create_sheet("PASSED")
-        ws_passed.append(header)
+    def rebuild_xlsx(self) -> bool:
+        """
+        Пересобрать mppt_log.xlsx из журнала целиком (по запросу).
+        Если файл открыт в Excel — ExcelWriter повторит позже, данные не теряются.
+        """
+        return self.xlsx_writer.rebuild()
 
-        os.makedirs(os.path.dirname(self.xlsx_path), exist_ok=True)
-        wb.save(self.xlsx_path)
-        return wb, ws, ws_passed
+    def close(self) -> None:
+        """Дописать несохранённые строки в xlsx (при выходе из приложения)."""
+        with self._sync_lock:
+            for timer in (self._sync_timer, self._push_timer):
+                if timer is not None:
+                    timer.cancel()
+            self._sync_timer = self._push_timer = None
+        self.xlsx_writer.close()
 
     # ----------------------------------------------------------
     # Цвет строки
@@ -220,55 +428,50 @@ class MPPTLogger:
             L_sens          [+]
             [-PASSED-]
         """
-        values = ["" for _ in range(12)]
-        colors = ["000000" for _ in range(12)]
+        return self._parse_plain([strip_ansi(l) for l in lines], color_matrix)
 
-        plain_lines = [strip_ansi(l) for l in lines]
-
-        # ---------- ID ----------
-        id_pattern = re.compile(r"ID:([0-9A-Fa-f]{4})")
-        for row_idx, ln in enumerate(plain_lines):
-            m = id_pattern.search(ln)
-            if m:
-                values[0] = m.group(1).upper()
-                term_hex = self._row_hex_color(color_matrix, row_idx)
-                colors[0] = _excel_color_from_hex(term_hex)
-                break
-
-        # ---------- Остальные поля ----------
-        # (label, column_index, mode)
-        rules = [
-            ("UART", 1, "bracket"),
-            ("Voltage", 2, "bracket"),
-            ("U_bat", 3, "number"),
-            ("U_src", 4, "number"),
-            ("Current", 5, "bracket"),
-            ("I_crg", 6, "number"),
-            ("I_ch1", 7, "number"),
-            ("I_ch2", 8, "number"),
-            ("Charger", 9, "bracket"),
-            ("M_sens", 10, "bracket"),
-            ("L_sens", 11, "bracket"),
-        ]
+    def _parse_plain(
+        self, plain_lines: List[str], color_matrix
+    ) -> Tuple[List[str], List[str]]:
+        """
+        То же, что _parse_frame(), но строки уже без ANSI.
+        Один проход по строкам: ID (первое вхождение) и все метки FIELD_RULES
+        ищутся предкомпилированными регулярками, цвет строки считается один раз.
+        Результат совпадает с прежним разбором (проверка: python -m mppt.bench_parse).
+        """
+        values = [""] * len(LOG_HEADER)
+        colors = ["000000"] * len(LOG_HEADER)
 
+        id_found = False
         for row_idx, ln in enumerate(plain_lines):
-            if not ln.strip():
+            if not id_found:
+                m = _ID_RE.search(ln)
+                if m:
+                    id_found = True
+                    values[0] = m.group(1).upper()
+                    colors[0] = _excel_color_from_hex(self._row_hex_color(color_matrix, row_idx))
+
+            if _LABELS_RE.search(ln) is None:
                 continue
 
-            for label, col_idx, mode in rules:
+            color = None
+            bracket = None
+
+            # все метки строки в порядке FIELD_RULES (как в исходном переборе правил)
+            for label, col_idx, number_re in _COMPILED_RULES:
                 if label not in ln:
                     continue
-
-                term_hex = self._row_hex_color(color_matrix, row_idx)
-                colors[col_idx] = _excel_color_from_hex(term_hex)
-
-                if mode == "bracket":
-                    m = re.search(r"\[([^\]]*)\]", ln)
-                    if m:
-                        values[col_idx] = m.group(1).strip()
-
-                elif mode == "number":
-                    m = re.search(rf"{re.escape(label)}\s+(-?\d+)", ln)
+                if color is None:
+                    color = _excel_color_from_hex(self._row_hex_color(color_matrix, row_idx))
+                colors[col_idx] = color
+
+                if number_re is None:
+                    if bracket is None:
+                        bracket = _BRACKET_RE.search(ln) or False
+                    if bracket:
+                        values[col_idx] = bracket.group(1).strip()
+                else:
+                    m = number_re.search(ln)
                     if m:
                         values[col_idx] = m.group(1).strip()
 
@@ -283,6 +486,8 @@ class MPPTLogger:
         color_matrix=None,
         short_id: Optional[str] = None,
         auto: bool = False,
+        station: Optional[str] = None,
+        uid: Optional[str] = None,
     ) -> None:
         """
         Сохраняем блок:
@@ -290,6 +495,8 @@ class MPPTLogger:
         - color_matrix — матрица цветов CanvasTerminal.last_colors
         - short_id     — ID устройства (CRC16 UID), если есть
         - auto         — True, если автосохранение по PASSED
+        - station      — имя станции (COM-порт) в многостанционном режиме
+        - uid          — полный UID платы (ключ индекса повторных тестов)
 
         Логика:
 
@@ -297,7 +504,8 @@ class MPPTLogger:
         * В auto-режиме:
             - если PASSED нет — вообще ничего не пишем;
             - если PASSED есть, но ID пустой — ничего не пишем;
-            - если PASSED есть и этот ID уже был — ничего не пишем;
+            - если PASSED есть и этот ID уже был (на этой станции) — ничего не пишем;
+            - если UID уже есть в индексе — повторный тест, в PASSED не пишем;
             - если PASSED есть и ID новый — пишем TXT + лист PASSED.
         * В ручном режиме (auto=False):
             - если в кадре есть PASSED — пишем TXT + PASSED;
@@ -307,14 +515,55 @@ class MPPTLogger:
             self._set_status("MPPT: нет блока для сохранения", "red")
             return
 
-        ts = timestamp_str()
         plain = [strip_ansi(l) for l in lines]
 
         # ---------- Проверка PASSED по ВСЕМ строкам ----------
         is_passed = any("PASSED" in l.upper() for l in plain)
 
-        # парсим кадр
-        values, colors = self._parse_frame(lines, color_matrix)
+        # парсим кадр (строки уже без ANSI — второй strip_ansi не нужен)
+        values, colors = self._parse_plain(plain, color_matrix)
+
+        self.save_parsed(plain, values, colors, is_passed, short_id, auto=auto, station=station, uid=uid)
+
+    def save_parsed(
+        self,
+        plain: List[str],
+        values: List[str],
+        colors: List[str],
+        is_passed: bool,
+        short_id: Optional[str] = None,
+        auto: bool = False,
+        station: Optional[str] = None,
+        uid: Optional[str] = None,
+    ) -> None:
+        """
+        Сохранение уже разобранного кадра (общая часть save_block и fast-path
+        шаблона кадра mppt.frame_template):
+        - plain  — строки кадра без ANSI (для TXT-лога)
+        - values — значения колонок LOG_HEADER
+        - colors — Excel-цвета колонок ("RRGGBB")
+        Правила auto/ручного режима — как в save_block.
+        Потокобезопасно: станции пишут через общий логгер по очереди.
+        """
+        t0 = PROBE_SAVE.start()
+        with self._write_lock:
+            self._save_parsed_locked(plain, values, colors, is_passed, short_id, auto, station, uid)
+        PROBE_SAVE.stop(t0)
+
+    def _save_parsed_locked(
+        self,
+        plain: List[str],
+        values: List[str],
+        colors: List[str],
+        is_passed: bool,
+        short_id: Optional[str],
+        auto: bool,
+        station: Optional[str],
+        uid: Optional[str],
+    ) -> None:
+        ts = timestamp_str()
+        values = list(values)
+        colors = list(colors)
 
         # short_id приоритетнее ID из кадра
         if short_id:
@@ -335,47 +584,57 @@ class MPPTLogger:
                 #)
                 return
 
-            if self.last_passed_id == cur_id:
+            if self._last_passed_by_station.get(station) == cur_id:
                 # дубль — тихо пропускаем
                 return
 
+            self._last_passed_by_station[station] = cur_id
             self.last_passed_id = cur_id
             target_sheet_name = "PASSED"
+
+            # повтор определяется только по полному UID: без него (или по одному
+            # 16-битному ID) новую плату не отличить от уже проверенной
+            prev = self.id_index.lookup(uid) if uid else None
+            if prev is not None and self.AUTO_SKIP_RETESTS:
+                entry = self.id_index.record(uid, ts)
+                self._set_status(
+                    f"MPPT: ID {cur_id} уже в PASSED (повторный тест №{entry.count - 1}, "
+                    f"впервые {entry.first}) — не дублируем",
+                    "yellow",
+                )
+                return
         else:
             # ручной режим
             target_sheet_name = "PASSED" if is_passed else "Sheet"
 
+        # ---------- Журнал = write-ahead: запись + fsync ДО txt/xlsx ----------
+        row_idx = self.journal.append(target_sheet_name, values, colors, ts, uid=uid)
+
         # ---------- TXT LOG (пишем только если решили сохранять) ----------
-        os.makedirs(os.path.dirname(self.txt_path), exist_ok=True)
-        with open(self.txt_path, "a", encoding="utf-8") as f:
+        os.makedirs(self.txt_dir, exist_ok=True)
+        with open(os.path.join(self.txt_dir, shard_name(ts) + ".txt"), "a", encoding="utf-8") as f:
             f.write("\n" + "-" * 50 + "\n")
             f.write(f"[{ts}]\n")
             for l in plain:
                 f.write(l.rstrip() + "\n")
             f.write("-" * 50 + "\n")
 
-        # ---------- Excel ----------
-        wb, ws, ws_passed = self._ensure_workbook()
-        target_ws = ws_passed if target_sheet_name == "PASSED" else ws
+        retest = False
+        if target_sheet_name == "PASSED" and uid:
+            retest = self.id_index.record(uid, ts).is_retest
 
-        row_idx = target_ws.max_row + 1
-        for i, (val, col) in enumerate(zip(values, colors), start=1):
-            cell = target_ws.cell(row=row_idx, column=i, value=val)
-            cell.font = Font(color=col)
+        # ---------- Excel — производное представление, пишется пачками в фоне ----------
+        self.xlsx_writer.enqueue(target_sheet_name, values, colors, self.journal.last_key)
 
-        try:
-            wb.save(self.xlsx_path)
-        except PermissionError:
-            self._set_status(
-                f"MPPT: не удалось сохранить Excel (файл открыт?): {self.xlsx_path}",
-                "red",
-            )
-            return
+        # ---------- Автосинхронизация git (по числу строк PASSED / по времени) ----------
+        if target_sheet_name == "PASSED":
+            self._note_unsynced_row()
 
         # финальные статусы
         if target_sheet_name == "PASSED":
+            note = " — повторный тест" if retest else ""
             self._set_status(
-                f"MPPT: сохранено в лист PASSED (строка {row_idx})", "green"
+                f"MPPT: сохранено в лист PASSED (строка {row_idx}){note}", "green"
             )
         else:
             self._set_status(f"MPPT: блок сохранён (строка {row_idx})", "green")
@@ -389,14 +648,8 @@ class MPPTLogger:
 
 
     def _run_git(self, *args) -> subprocess.CompletedProcess:
-        """Запуск git-команды в logs_dir с захватом вывода."""
-        proc = subprocess.run(
-            args,
-            cwd=self.logs_dir,
-            capture_output=True,
-            text=True,
-        )
-        return proc
+        """Запуск git-команды в logs_dir с захватом вывода (и таймаутом GitWorker)."""
+        return self.git.run(*args)
 
 
     def _ensure_git_repo(self) -> None:
@@ -409,8 +662,6 @@ class MPPTLogger:
         - git pull --ff-only (+retry)
         """
 
-        ORIGIN_URL = "http://dis-electronics:30000/scheck/swmpptv7_10a_rev1_reject.git"
-
         # ----------------------------
         # 1) Если .git нет → git init
         # ----------------------------
@@ -431,7 +682,7 @@ class MPPTLogger:
 
         if not has_origin:
             self._set_git_status("Git: добавление origin…", "#85c1ff")
-            proc = self._run_git("git", "remote", "add", "origin", ORIGIN_URL)
+            proc = self._run_git("git", "remote", "add", "origin", self.git_origin_url)
             if proc.returncode != 0:
                 self._set_git_status(f"Git: ошибка добавления origin: {proc.stderr}", "red")
                 return
@@ -571,16 +822,23 @@ class MPPTLogger:
 
 
     def _git_pull_on_start_ui(self) -> None:
-        """UI-обёртка вокруг git pull."""
+        """Задание pull для GitWorker (ошибки — в Git-статус, не наружу)."""
         try:
             self._git_pull_on_start()
         except Exception as e:
             self._set_git_status(f"Git: ошибка pull: {e}", "red")
 
+    def git_pull_async(self) -> None:
+        """Поставить fetch + pull в очередь GitWorker (не блокирует)."""
+        if not self._is_git_repo():
+            return
+        self._set_git_status("Git: pull…", "#85c1ff")
+        self.git.submit("pull", self._git_pull_on_start_ui)
 
     def git_commit_logs(self) -> None:
         """
-        Добавить изменения в git и сделать commit.
+        Добавить изменения в git и сделать commit (в фоне).
+        Повторные нажатия, пока commit ждёт очереди, склеиваются в один.
         """
         if not self._is_git_repo():
             self._set_git_status(
@@ -588,24 +846,12 @@ class MPPTLogger:
             )
             return
 
-        try:
-            self._set_git_status("Git: commit…", "#85c1ff")
-            self._run_git("git", "add", ".")
-            msg = f"Auto log commit {timestamp_str()}"
-            self._run_git("git", "commit", "-m", msg)
-            self._set_git_status("Git: commit завершён", "green")
-        except RuntimeError as e:
-            text = str(e)
-            if "nothing to commit" in text:
-                self._set_git_status("Git: нечего коммитить", "yellow")
-            else:
-                self._set_git_status(f"Git: ошибка commit: {text}", "red")
-        except Exception as e:
-            self._set_git_status(f"Git: общая ошибка commit: {e}", "red")
+        if self.git.submit("commit", self._git_commit_job):
+            self._set_git_status("Git: commit в очереди…", "#85c1ff")
 
     def git_push(self) -> None:
         """
-        Выполнить git push.
+        Выполнить git push (в фоне). Повторные нажатия склеиваются в один push.
         """
         if not self._is_git_repo():
             self._set_git_status(
@@ -613,9 +859,169 @@ class MPPTLogger:
             )
             return
 
-        try:
-            self._set_git_status("Git: push…", "#85c1ff")
-            self._run_git("git", "push")
+        if self.git.submit("push", self._git_push_job):
+            self._set_git_status("Git: push в очереди…", "#85c1ff")
+
+    def _log_files(self) -> List[str]:
+        """Что коммитится (пути относительно logs_dir): шарды по дням, индекс UID, .git*."""
+        paths = [
+            self.journal.dir,
+            self.txt_dir,
+            self.id_index.path,
+            os.path.join(self.logs_dir, ".gitignore"),
+            os.path.join(self.logs_dir, ".gitattributes"),
+        ]
+        return [
+            os.path.relpath(p, self.logs_dir)
+            for p in paths
+            if os.path.exists(p)
+        ]
+
+    def _untrack_local_files(self) -> None:
+        """
+        xlsx (zip: каждый коммит — новый полный blob) и старый единый журнал
+        убираются из индекса; xlsx остаётся на диске как локальное представление.
+        """
+        names = [os.path.basename(self.xlsx_path), JOURNAL_LOG]
+        self._run_git("git", "rm", "--cached", "-q", "--ignore-unmatch", "--", *names)
+
+    def _git_commit_job(self, msg: Optional[str] = None) -> bool:
+        """
+        Commit только файлов логов. Возвращает True, если коммит создан.
+        """
+        self._set_git_status("Git: commit…", "#85c1ff")
+        self._untrack_local_files()
+
+        files = self._log_files()
+        if files:
+            proc = self._run_git("git", "add", "-A", "--", *files)
+            if proc.returncode != 0:
+                self._set_git_status(f"Git: ошибка add: {proc.stderr.strip()}", "red")
+                return False
+
+        # в индексе нет изменений — коммитить нечего
+        if self._run_git("git", "diff", "--cached", "--quiet").returncode == 0:
+            self._set_git_status("Git: нечего коммитить", "yellow")
+            return False
+
+        msg = msg or f"Auto log commit {timestamp_str()}"
+        proc = self._run_git("git", "commit", "-m", msg)
+        if proc.returncode == 0:
+            self._set_git_status("Git: commit завершён", "green")
+            return True
+        self._set_git_status(f"Git: ошибка commit: {(proc.stderr or proc.stdout).strip()}", "red")
+        return False
+
+    def _git_push_job(self) -> bool:
+        """
+        Push текущей ветки в origin (с установкой upstream при первом push).
+        - отклонён (на сервере коммиты другой станции) — fetch + rebase своих
+          коммитов поверх origin и сразу повторный push;
+        - ошибка доступа/адреса или конфликт rebase — повтор не поможет: статус
+          и стоп (следующий push — по кнопке или при следующей синхронизации);
+        - прочие ошибки (сеть, таймаут) — повтор в фоне с нарастающей паузой.
+        """
+        self._set_git_status("Git: push…", "#85c1ff")
+        proc = self._run_git("git", "push", "-u", "origin", "HEAD")
+        if proc.returncode != 0 and _git_error_kind(proc.stderr) == GIT_ERR_REJECTED:
+            rebased = self._git_rebase_onto_origin()
+            if rebased is None:
+                self._push_failures = 0
+                return False
+            if rebased:
+                proc = self._run_git("git", "push", "-u", "origin", "HEAD")
+        if proc.returncode == 0:
+            self._push_failures = 0
             self._set_git_status("Git: push завершён", "green")
-        except Exception as e:
-            self._set_git_status(f"Git: ошибка push: {e}", "red")
+            return True
+
+        if _git_error_kind(proc.stderr) == GIT_ERR_FATAL:
+            self._push_failures = 0
+            self._set_git_status(f"Git: push невозможен (повтор не поможет): {proc.stderr.strip()}", "red")
+            return False
+
+        self._push_failures += 1
+        delay = min(
+            self.PUSH_BACKOFF_S * (2 ** (self._push_failures - 1)),
+            self.PUSH_BACKOFF_MAX_S,
+        )
+        self._set_git_status(
+            f"Git: ошибка push ({self._push_failures}), повтор через {delay:.0f} с: "
+            f"{proc.stderr.strip()}",
+            "red",
+        )
+        with self._sync_lock:
+            if self._push_timer is not None:
+                self._push_timer.cancel()
+            self._push_timer = threading.Timer(
+                delay, lambda: self.git.submit("push", self._git_push_job)
+            )
+            self._push_timer.daemon = True
+            self._push_timer.start()
+        return False
+
+    def _git_rebase_onto_origin(self) -> Optional[bool]:
+        """
+        fetch + rebase текущей ветки поверх origin/<ветка>.
+        Журналы и индекс UID склеиваются драйвером merge=union (.gitattributes).
+        Сам rebase — под _write_lock: пока git переписывает файлы, логгер в них
+        не пишет (несохранённые в коммите строки переживают rebase в autostash).
+        True — rebase выполнен, False — fetch не удался (повтор позже),
+        None — конфликт: rebase отменён, повтор не поможет.
+        """
+        self._set_git_status("Git: push отклонён — fetch + rebase…", "#85c1ff")
+        branch = self._run_git("git", "rev-parse", "--abbrev-ref", "HEAD").stdout.strip()
+        proc = self._run_git("git", "fetch", "origin")
+        if proc.returncode != 0:
+            return False
+
+        with self._write_lock:
+            proc = self._run_git("git", "rebase", "--autostash", f"origin/{branch}")
+            if proc.returncode != 0:
+                self._run_git("git", "rebase", "--abort")
+                self._set_git_status(
+                    f"Git: rebase на origin/{branch} не удался, push остановлен: "
+                    f"{(proc.stderr or proc.stdout).strip()}",
+                    "red",
+                )
+                return None
+            # в журнал и индекс UID вошли строки других станций
+            self.id_index = IdIndex(self.id_index.path)
+        self.xlsx_writer.schedule_rebuild()
+        return True
+
+    # ----------------------------------------------------------
+    # Автосинхронизация
+    # ----------------------------------------------------------
+    def _note_unsynced_row(self) -> None:
+        """Новая строка PASSED: commit+push по порогу строк или по таймеру."""
+        if not self.auto_sync_rows and not self.auto_sync_interval_s:
+            return
+        with self._sync_lock:
+            self._unsynced_rows += 1
+            if self.auto_sync_rows and self._unsynced_rows >= self.auto_sync_rows:
+                due_now = True
+            else:
+                due_now = False
+                if self._sync_timer is None and self.auto_sync_interval_s:
+                    self._sync_timer = threading.Timer(self.auto_sync_interval_s, self.request_sync)
+                    self._sync_timer.daemon = True
+                    self._sync_timer.start()
+        if due_now:
+            self.request_sync()
+
+    def request_sync(self) -> None:
+        """Поставить commit+push несинхронизированных строк в очередь GitWorker."""
+        with self._sync_lock:
+            if self._sync_timer is not None:
+                self._sync_timer.cancel()
+                self._sync_timer = None
+        if self._is_git_repo():
+            self.git.submit("sync", self._git_sync_job)
+
+    def _git_sync_job(self) -> None:
+        with self._sync_lock:
+            rows = self._unsynced_rows
+            self._unsynced_rows = 0
+        if self._git_commit_job(f"Auto log sync {timestamp_str()} (+{rows} PASSED)"):
+            self._git_push_job()
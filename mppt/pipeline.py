@@ -0,0 +1,340 @@
+# mppt/pipeline.py
+# --------------------------------------------------
+# Конвейер обработки потока MPPT без Tk:
+#   байты из COM → нарезка по кадрам (ESC[2J) → маскировка UID → ID:XXXX
+#   → быстрый шаблон (FrameTemplate) или pyte → авто-PASSED в MPPTLogger
+#
+# Используется MPPTTerminalPanel (reader-поток), реплеером записей
+# (mppt.capture) и бенчмарком — поэтому здесь нет ни одного виджета.
+# --------------------------------------------------
+
+from __future__ import annotations
+
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from mppt.terminal_pyte import PyteTerminal, PYTE_FG_TO_HEX
+from mppt.frame_template import FrameTemplate, FrameRecord
+from util import perf
+
+# Пробы (util.perf): нарезка потока на кадры — без обработки кадров; обработка кадра
+PROBE_SPLIT = perf.probe("mppt.split")
+PROBE_FRAME = perf.probe("mppt.frame")
+
+
+class FramePipeline:
+    """
+    Обработка сырого потока MPPT-терминала.
+
+    term     — PyteTerminal (экран для отрисовки и fallback-разбора)
+    logger   — MPPTLogger (или None — тогда авто-PASSED не пишется)
+    on_frame — вызывается после каждого завершённого кадра (например,
+               запрос перерисовки); вызывается из потока, который кормит конвейер
+    station  — имя станции (COM-порт) для общего логгера в многостанционном режиме
+    telemetry — util.telemetry.TelemetryHub (или None): числовые поля каждого
+               разобранного быстрым путём кадра пишутся в телеметрию
+    """
+
+    # UID: строго 4 группы, разделённые "-", группы — любые символы кроме пробела, CR, LF и "-"
+    UID_REGEX = re.compile(r"\x1b\[0m\s*([^- \r\n]+-[^- \r\n]+-[^- \r\n]+-[^- \r\n]+)")
+    ESC_CLEAR = "\x1b[2J"
+    # Предфильтр PASSED по сырому ANSI-потоку (без копирования/upper())
+    PASSED_REGEX = re.compile(r"PASSED", re.IGNORECASE)
+    # SGR кадра, который pyte так и не увидит (его вытеснил следующий)
+    SGR_REGEX = re.compile(r"\x1b\[[0-9;]*m")
+    # Сколько UID → short ID помнить (LRU): на станции обычно одна-две платы подряд
+    UID_CACHE_SIZE = 64
+
+    def __init__(
+        self,
+        term: PyteTerminal,
+        logger=None,
+        cols: int = 64,
+        rows: int = 18,
+        on_frame: Optional[Callable[[], None]] = None,
+        station: Optional[str] = None,
+        telemetry=None,
+    ):
+        self.term = term
+        self.logger = logger
+        self.on_frame = on_frame
+        self.station = station
+        self.telemetry = telemetry
+
+        # Результат быстрого разбора последнего кадра (None — кадр ушёл в pyte)
+        self.last_record: Optional[FrameRecord] = None
+
+        # Короткий ID для текущего кадра (CRC16 от UID-строки) и сам UID:
+        # 16-битный ID — только для экрана, плату однозначно определяет UID
+        self.device_short_id: Optional[str] = None
+        self.device_uid: Optional[str] = None
+
+        # Маскировка UID: LRU UID → short ID и область UID прошлого кадра.
+        # Одна плата шлёт один и тот же UID сотни кадров подряд — если начало
+        # кадра до UID включительно не изменилось, regex и CRC не нужны.
+        self._uid_cache: "OrderedDict[str, str]" = OrderedDict()
+        self._uid_prefix: Optional[str] = None   # кадр до конца UID (+1 символ)
+        self._uid_masked: str = ""               # то же, но с ID:XXXX вместо UID
+        self._uid_end = 0
+        self._uid_short: Optional[str] = None
+        self._uid_full: Optional[str] = None
+
+        # Буфер текущего кадра (между ESC[2J])
+        self._frame_buf: str = ""
+
+        # Шаблон стандартного тестового экрана: кадры известной раскладки
+        # разбираются за один проход без pyte (см. mppt.frame_template)
+        self.frame_template = FrameTemplate(cols=cols, rows=rows)
+        # Кадр быстрого пути, которым pyte ещё не накормлен (кормится при рендере)
+        self._pending_frame: Optional[str] = None
+        # pyte кормится и из reader-потока, и из main-thread (рендер)
+        self.term_lock = threading.Lock()
+
+        # счётчики
+        self.frames = 0
+        self.bytes_in = 0
+        self.mask_reused = 0    # область UID совпала с прошлым кадром — без regex
+        self.mask_scans = 0     # UID_REGEX.search по кадру
+        self.mask_crc = 0       # crc32 посчитан (промах LRU)
+        self.mask_no_uid = 0    # в кадре нет UID
+        self.frame_errors = 0   # кадры, разбор которых упал (пропущены)
+        self.last_frame_error: Optional[str] = None
+        self.telemetry_errors = 0  # кадры, не попавшие в телеметрию (результат сохранён)
+        self.last_telemetry_error: Optional[str] = None
+
+    # ----------------------------------------------------------
+    # Вход: байты / текст
+    # ----------------------------------------------------------
+    def feed_bytes(self, data: bytes) -> None:
+        """Кусок сырых байт из COM (как вернул ser.read_all())."""
+        if not data:
+            return
+        self.bytes_in += len(data)
+        chunk = data.decode(errors="ignore").replace("\x00", "")
+        if chunk:
+            self.feed_text(chunk)
+
+    def feed_text(self, chunk: str) -> None:
+        """Нарезка потока на кадры относительно ESC[2J]."""
+        esc = self.ESC_CLEAR
+        buf = chunk
+        t0 = PROBE_SPLIT.start()
+        in_frames = 0.0
+
+        while True:
+            idx = buf.find(esc)
+            if idx == -1:
+                # в этом куске больше нет ESC[2J] — просто добавляем остаток в текущий кадр
+                self._frame_buf += buf
+                break
+
+            # всё до ESC[2J] — хвост предыдущего кадра
+            prefix = buf[:idx]
+            if prefix:
+                self._frame_buf += prefix
+
+            # если в буфере уже что-то есть — это завершённый кадр;
+            # новый кадр (ESC[2J]) начинаем ДО разбора, чтобы сбойный кадр
+            # не остался в буфере и не ломал все последующие
+            frame, self._frame_buf = self._frame_buf, esc
+            if frame:
+                t1 = PROBE_FRAME.start()
+                self._process_frame_safe(frame)
+                if t1:
+                    dt = time.perf_counter() - t1
+                    PROBE_FRAME.record(dt)
+                    in_frames += dt
+
+            # обрезаем обработанную часть + ESC[2J]
+            buf = buf[idx + len(esc):]
+
+        if t0:
+            PROBE_SPLIT.record(time.perf_counter() - t0 - in_frames)
+
+    # ----------------------------------------------------------
+    # Обработка завершённого кадра
+    # ----------------------------------------------------------
+    def _process_frame_safe(self, frame_text: str) -> None:
+        """process_frame, но ошибка в одном кадре не останавливает поток."""
+        try:
+            self.process_frame(frame_text)
+        except Exception as e:
+            self.frame_errors += 1
+            msg = f"{type(e).__name__}: {e}"
+            if msg != self.last_frame_error:
+                print(f"[pipeline] кадр пропущен: {msg}")
+            self.last_frame_error = msg
+
+    def process_frame(self, frame_text: str) -> None:
+        """
+        На вход приходит ПОЛНЫЙ кадр, начинающийся с ESC[2J] и заканчивающийся
+        перед следующим ESC[2J].
+        """
+        self.frames += 1
+
+        # --- 1. UID → short ID ---
+        frame_text = self._mask_uid(frame_text)
+
+        # --- 2. Быстрый путь: известная раскладка разбирается без pyte ---
+        record = self.frame_template.parse(frame_text)
+        self.last_record = record
+
+        if record is not None:
+            # pyte кормим лениво — только тем кадром, который реально будет
+            # нарисован (кадр начинается с ESC[2J, предыдущие можно выбросить)
+            with self.term_lock:
+                self._drop_pending_locked()
+                self._pending_frame = frame_text
+
+            if record.is_passed and self.logger is not None:
+                self.logger.save_parsed(
+                    record.lines,
+                    record.values,
+                    record.colors,
+                    record.is_passed,
+                    self.device_short_id,
+                    auto=True,
+                    station=self.station,
+                    uid=self.device_uid,
+                )
+
+            # телеметрия — после журнала: её сбой не должен стоить результата
+            if self.telemetry is not None:
+                self._record_telemetry(record.values)
+        else:
+            # --- 2b. Кормим pyte целым кадром ---
+            with self.term_lock:
+                self._drop_pending_locked()
+                self.term.feed(frame_text)
+                fg = self.term.current_fg()
+            # цвет, с которым pyte войдёт в следующий кадр, — для быстрого пути
+            self.frame_template.fg = fg if fg in PYTE_FG_TO_HEX else None
+
+            # --- 3. Авто-PASSED-сохранение ---
+            # Дешёвый предфильтр по сырому кадру: без "PASSED" в потоке экран не
+            # снимается вовсе. Окончательно проверяем по экрану pyte (снимок
+            # строится один раз на поколение и переиспользуется логгером).
+            if (
+                self.logger is not None
+                and self.PASSED_REGEX.search(frame_text)
+                and self.term.has_text("PASSED")
+            ):
+                self.logger.save_block(
+                    self.term.get_lines(),
+                    self.term.color_matrix(),
+                    self.device_short_id,
+                    auto=True,
+                    station=self.station,
+                    uid=self.device_uid,
+                )
+
+        # --- 4. Уведомляем (обычно — запрос перерисовки) ---
+        if self.on_frame is not None:
+            self.on_frame()
+
+    def _record_telemetry(self, values) -> None:
+        try:
+            self.telemetry.record_mppt(values, station=self.station)
+        except Exception as e:
+            self.telemetry_errors += 1
+            msg = f"{type(e).__name__}: {e}"
+            if msg != self.last_telemetry_error:
+                print(f"[pipeline] телеметрия кадра не записана: {msg}")
+            self.last_telemetry_error = msg
+
+    def _mask_uid(self, frame_text: str) -> str:
+        """Заменить UID на "ID:XXXX" (CRC16), выставить device_short_id."""
+        prefix = self._uid_prefix
+        if prefix is not None and frame_text.startswith(prefix):
+            # начало кадра до UID (и символ после него) то же — UID тот же
+            self.mask_reused += 1
+            self.device_short_id = self._uid_short
+            self.device_uid = self._uid_full
+            return self._uid_masked + frame_text[self._uid_end:]
+
+        self.mask_scans += 1
+        m = self.UID_REGEX.search(frame_text)
+
+        if not m:
+            # В этом кадре UID нет — ID для этого кадра отсутствует
+            self.mask_no_uid += 1
+            self.device_short_id = None
+            self.device_uid = None
+            self._uid_prefix = None
+            return frame_text
+
+        full_uid = m.group(1)  # например "7-c-32305311-20383346" или любой другой вариант
+
+        short = self._uid_cache.get(full_uid)
+        if short is None:
+            # CRC считаем по UID как по строке (ASCII)
+            self.mask_crc += 1
+            uid_bytes = full_uid.encode("ascii", errors="ignore")
+            crc = zlib.crc32(uid_bytes) & 0xFFFF
+            short = f"{crc:04X}"
+            self._uid_cache[full_uid] = short
+            if len(self._uid_cache) > self.UID_CACHE_SIZE:
+                self._uid_cache.popitem(last=False)
+        else:
+            self._uid_cache.move_to_end(full_uid)
+
+        self.device_short_id = short
+        self.device_uid = full_uid
+        start, end = m.span()
+        masked = f"ID:{short}".ljust(end - start)
+
+        # символ после UID тоже в префиксе: иначе жадная группа могла бы
+        # захватить продолжение и UID был бы другим
+        self._uid_prefix = frame_text[:end + 1] if end < len(frame_text) else None
+        self._uid_end = end
+        self._uid_masked = frame_text[:start] + masked
+        self._uid_short = short
+        self._uid_full = full_uid
+        return self._uid_masked + frame_text[end:]
+
+    # ----------------------------------------------------------
+    # Синхронизация pyte с быстрым путём
+    # ----------------------------------------------------------
+    def sync_term(self) -> None:
+        """Докормить pyte отложенным кадром быстрого пути (если он есть)."""
+        with self.term_lock:
+            self.sync_term_locked()
+
+    def _drop_pending_locked(self) -> None:
+        """
+        Выбросить отложенный кадр, не рисуя его. Экран он всё равно не
+        переживёт (следующий кадр начинается с ESC[2J), но SGR-состояние
+        (цвет, bold, фон) pyte переносит через очистку — его докармливаем.
+        """
+        frame = self._pending_frame
+        self._pending_frame = None
+        if frame is not None:
+            sgr = "".join(self.SGR_REGEX.findall(frame))
+            if sgr:
+                self.term.feed(sgr)
+
+    def sync_term_locked(self) -> None:
+        """То же, что sync_term(), но term_lock уже захвачен вызывающим."""
+        frame = self._pending_frame
+        self._pending_frame = None
+        if frame is not None:
+            self.term.feed(frame)
+
+    # ----------------------------------------------------------
+    def stats(self) -> dict:
+        return {
+            "frames": self.frames,
+            "bytes": self.bytes_in,
+            "fast_frames": self.frame_template.matched,
+            "pyte_frames": self.frame_template.fallback,
+            "mask_reused": self.mask_reused,
+            "mask_scans": self.mask_scans,
+            "mask_crc": self.mask_crc,
+            "mask_no_uid": self.mask_no_uid,
+            "frame_errors": self.frame_errors,
+            "telemetry_errors": self.telemetry_errors,
+        }
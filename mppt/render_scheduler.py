@@ -0,0 +1,152 @@
+# mppt/render_scheduler.py
+# --------------------------------------------------
+# Планировщик перерисовки терминала с ограничением FPS.
+# - request() можно вызывать из любого потока: он только ставит флаг "грязно"
+# - сама отрисовка идёт в main-thread по таймеру Tk, не чаще max_fps
+# - промежуточные кадры не рисуются: рисуется только последнее состояние pyte
+# - ведётся статистика: запрошено / отрисовано / пропущено, время рендера
+# - исключение в render_func считается и печатается, но таймер не гаснет
+# --------------------------------------------------
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from typing import Callable, Optional
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    """Перцентиль (0..100) по уже отсортированному списку, без numpy."""
+    if not sorted_values:
+        return 0.0
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    pos = (len(sorted_values) - 1) * (q / 100.0)
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    frac = pos - lo
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * frac
+
+
+class RenderScheduler:
+    """
+    Склейка запросов на перерисовку (coalescing) + ограничение частоты кадров.
+
+    widget      — любой Tk-виджет (нужен только для after/after_cancel)
+    render_func — функция отрисовки, вызывается ТОЛЬКО из main-thread
+    max_fps     — максимальная частота перерисовки
+    history     — сколько последних замеров времени рендера хранить
+    """
+
+    def __init__(
+        self,
+        widget,
+        render_func: Callable[[], None],
+        max_fps: float = 30.0,
+        history: int = 512,
+    ):
+        self.widget = widget
+        self.render_func = render_func
+        self.max_fps = max(1.0, float(max_fps))
+
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._job: Optional[str] = None
+
+        # счётчики
+        self.requested = 0
+        self.rendered = 0
+        self.skipped = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+        # последние длительности рендера, мс
+        self._render_ms: deque[float] = deque(maxlen=history)
+
+    # ----------------------------------------------------------
+    # Управление таймером
+    # ----------------------------------------------------------
+    @property
+    def interval_ms(self) -> int:
+        return max(1, int(round(1000.0 / self.max_fps)))
+
+    def set_max_fps(self, fps: float) -> None:
+        self.max_fps = max(1.0, float(fps))
+
+    def start(self) -> None:
+        if self._job is None:
+            self._job = self.widget.after(self.interval_ms, self._tick)
+
+    def stop(self) -> None:
+        if self._job is not None:
+            try:
+                self.widget.after_cancel(self._job)
+            except Exception:
+                pass
+            self._job = None
+
+    # ----------------------------------------------------------
+    # Запрос на перерисовку (из любого потока)
+    # ----------------------------------------------------------
+    def request(self) -> None:
+        with self._lock:
+            self.requested += 1
+            if self._dirty:
+                # предыдущий кадр так и не был показан — он будет перекрыт новым
+                self.skipped += 1
+            self._dirty = True
+
+    # ----------------------------------------------------------
+    # Тик таймера (main-thread)
+    # ----------------------------------------------------------
+    def _tick(self) -> None:
+        self._job = None
+
+        with self._lock:
+            dirty = self._dirty
+            self._dirty = False
+
+        try:
+            if dirty:
+                t0 = time.perf_counter()
+                try:
+                    self.render_func()
+                except Exception as e:
+                    # одна ошибка отрисовки не должна навсегда остановить терминал
+                    self.errors += 1
+                    msg = f"{type(e).__name__}: {e}"
+                    if msg != self.last_error:
+                        print(f"[render] ошибка отрисовки: {msg}")
+                    self.last_error = msg
+                finally:
+                    self._render_ms.append((time.perf_counter() - t0) * 1000.0)
+                    self.rendered += 1
+        finally:
+            self._job = self.widget.after(self.interval_ms, self._tick)
+
+    # ----------------------------------------------------------
+    # Статистика
+    # ----------------------------------------------------------
+    def stats(self) -> dict:
+        """Снимок статистики: счётчики кадров и перцентили времени рендера (мс)."""
+        samples = sorted(self._render_ms)
+        return {
+            "max_fps": self.max_fps,
+            "requested": self.requested,
+            "rendered": self.rendered,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "render_ms_p50": percentile(samples, 50),
+            "render_ms_p90": percentile(samples, 90),
+            "render_ms_p99": percentile(samples, 99),
+            "render_ms_max": samples[-1] if samples else 0.0,
+        }
+
+    def format_stats(self) -> str:
+        s = self.stats()
+        return (
+            f"render ≤{s['max_fps']:.0f} fps | "
+            f"drawn {s['rendered']} | skipped {s['skipped']} | "
+            f"p50 {s['render_ms_p50']:.1f} ms | p99 {s['render_ms_p99']:.1f} ms"
+        )
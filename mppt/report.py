@@ -0,0 +1,368 @@
+# mppt/report.py
+"""
+Отчёт по производству MPPT из журнала результатов (journal/YYYY-MM-DD.jsonl).
+
+Журнал загружается в столбцы NumPy (время, лист, плата, числовые поля,
+результаты проверок), дальше всё считается векторно — сотни тысяч строк
+обрабатываются за секунды:
+
+- выход годных по дням или сменам: строк, PASSED, уникальных ID, yield
+- доля повторных тестов (плата уже встречалась раньше)
+- по числовым полям (U_bat, U_src, I_crg, I_ch1, I_ch2): перцентили и гистограммы
+- по проверкам (UART, Voltage, Current, Charger, M_sens, L_sens): pass/fail по цвету
+- выход за допуски: --spec U_bat=13500:14500 (и красные проверки)
+
+    python -m mppt.report [--log-dir DIR] [--by day|shift] [--shifts 08:00,20:00]
+                          [--from 2025-01-01] [--to 2025-01-31] [--bins 20]
+                          [--spec FIELD=LO:HI ...] [--out report.txt] [--json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from util.fileutil import DEFAULT_LOG_DIR, get_journal_dir
+from mppt.journal import ResultJournal
+from mppt.logger import FIELD_RULES, LOG_HEADER
+
+
+NUMBER_FIELDS = [label for label, _, mode in FIELD_RULES if mode == "number"]
+CHECK_FIELDS = [label for label, _, mode in FIELD_RULES if mode == "bracket"]
+PERCENTILES = (1, 5, 50, 95, 99)
+
+# Цвета ячеек журнала (см. _excel_color_from_hex): зелёный — норма, красный — отказ
+_GREEN = "00AA00"
+_RED = "FF0000"
+
+
+# ----------------------------------------------------------------------
+# Загрузка в столбцы
+# ----------------------------------------------------------------------
+
+def _to_float(s: str) -> float:
+    try:
+        return float(s)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def load_columns(records: Iterable[dict]) -> Dict[str, np.ndarray]:
+    """
+    Записи журнала → столбцы:
+      ts (datetime64[s]), passed (bool),
+      id (str: полный UID платы; короткий ID — только у старых/перенесённых
+          строк без "uid": 16-битный CRC совпадает у разных плат уже на сотнях),
+      <числовое поле> (float64, NaN — нет значения),
+      <проверка> (int8: 1 — норма, -1 — отказ, 0 — неизвестно)
+    """
+    width = len(LOG_HEADER)
+    num_idx = [LOG_HEADER.index(f) for f in NUMBER_FIELDS]
+    chk_idx = [LOG_HEADER.index(f) for f in CHECK_FIELDS]
+
+    ts: List[str] = []
+    passed: List[bool] = []
+    ids: List[str] = []
+    nums: List[List[str]] = [[] for _ in num_idx]
+    checks: List[List[int]] = [[] for _ in chk_idx]
+
+    for rec in records:
+        values = rec.get("values") or []
+        colors = rec.get("colors") or []
+        if len(values) < width or len(colors) < width:
+            values = list(values) + [""] * (width - len(values))
+            colors = list(colors) + ["000000"] * (width - len(colors))
+
+        t = rec.get("ts") or ""
+        ts.append(t.replace(" ", "T") if t else "NaT")
+        passed.append(rec.get("sheet") == "PASSED")
+        uid = rec.get("uid")
+        ids.append(str(uid).strip() if uid else str(values[0]).strip().upper())
+        for out, i in zip(nums, num_idx):
+            out.append(values[i])
+        for out, i in zip(checks, chk_idx):
+            c = colors[i]
+            out.append(1 if c == _GREEN else (-1 if c == _RED else 0))
+
+    cols: Dict[str, np.ndarray] = {
+        "ts": np.array(ts, dtype="datetime64[s]"),
+        "passed": np.array(passed, dtype=bool),
+        "id": np.array(ids, dtype=str),
+    }
+    for name, raw in zip(NUMBER_FIELDS, nums):
+        cols[name] = np.fromiter((_to_float(v) for v in raw), dtype=np.float64, count=len(raw))
+    for name, raw in zip(CHECK_FIELDS, checks):
+        cols[name] = np.array(raw, dtype=np.int8)
+    return cols
+
+
+def select(cols: Dict[str, np.ndarray], mask: np.ndarray) -> Dict[str, np.ndarray]:
+    return {k: v[mask] for k, v in cols.items()}
+
+
+# ----------------------------------------------------------------------
+# Группировка: день / смена
+# ----------------------------------------------------------------------
+
+def parse_shifts(text: str) -> np.ndarray:
+    """ "08:00,20:00" → минуты начала смен [480, 1200] (по возрастанию)."""
+    mins = []
+    for part in text.split(","):
+        h, _, m = part.strip().partition(":")
+        mins.append(int(h) * 60 + int(m or 0))
+    return np.array(sorted(mins), dtype=np.int64)
+
+
+def group_keys(ts: np.ndarray, shifts: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Ключ группы для каждой строки: "YYYY-MM-DD" или "YYYY-MM-DD #N" (смена N с 1).
+    Ночная смена, перешедшая через полночь, относится к дню своего начала.
+    """
+    day = ts.astype("datetime64[D]")
+    if shifts is None or not len(shifts):
+        return day.astype(str)
+
+    minutes = (ts - day).astype("timedelta64[m]").astype(np.int64)
+    idx = np.searchsorted(shifts, minutes, side="right") - 1
+    before_first = idx < 0
+    idx[before_first] = len(shifts) - 1
+    day = day - before_first.astype("timedelta64[D]")
+    return np.char.add(np.char.add(day.astype(str), " #"), (idx + 1).astype(str))
+
+
+def retest_mask(ids: np.ndarray, ts: np.ndarray) -> np.ndarray:
+    """True для строк, чья плата (id) уже встречалась раньше (по времени)."""
+    order = np.argsort(ts, kind="stable")
+    ids_sorted = ids[order]
+    _, first = np.unique(ids_sorted, return_index=True)
+    is_first = np.zeros(len(ids), dtype=bool)
+    is_first[first] = True
+    out = np.empty(len(ids), dtype=bool)
+    out[order] = ~is_first
+    out[ids == ""] = False
+    return out
+
+
+# ----------------------------------------------------------------------
+# Отчёт
+# ----------------------------------------------------------------------
+
+def build_report(
+    cols: Dict[str, np.ndarray],
+    shifts: Optional[np.ndarray] = None,
+    bins: int = 20,
+    spec: Optional[Dict[str, Tuple[float, float]]] = None,
+) -> dict:
+    n = len(cols["passed"])
+    spec = spec or {}
+    passed = cols["passed"]
+    retest = retest_mask(cols["id"], cols["ts"])
+
+    # ---------- по группам ----------
+    keys = group_keys(cols["ts"], shifts)
+    groups, inv = np.unique(keys, return_inverse=True)
+    rows = np.bincount(inv, minlength=len(groups))
+    n_passed = np.bincount(inv, weights=passed, minlength=len(groups)).astype(int)
+    n_retest = np.bincount(inv, weights=retest, minlength=len(groups)).astype(int)
+    # уникальные платы в группе: уникальные пары (группа, код id) одним int64
+    has_id = cols["id"] != ""
+    uniq_ids, id_code = np.unique(cols["id"][has_id], return_inverse=True)
+    pair = inv[has_id].astype(np.int64) * max(len(uniq_ids), 1) + id_code
+    n_ids = np.bincount(np.unique(pair) // max(len(uniq_ids), 1), minlength=len(groups))
+
+    per_group = []
+    for g, key in enumerate(groups):
+        per_group.append({
+            "group": str(key),
+            "rows": int(rows[g]),
+            "passed": int(n_passed[g]),
+            "unique_ids": int(n_ids[g]),
+            "yield": float(n_passed[g] / rows[g]) if rows[g] else 0.0,
+            "retest_rate": float(n_retest[g] / rows[g]) if rows[g] else 0.0,
+        })
+
+    # ---------- числовые поля ----------
+    fields = {}
+    for name in NUMBER_FIELDS:
+        v = cols[name]
+        ok = ~np.isnan(v)
+        data = v[ok]
+        entry = {"count": int(ok.sum())}
+        if data.size:
+            entry["mean"] = float(data.mean())
+            entry["std"] = float(data.std())
+            entry["min"] = float(data.min())
+            entry["max"] = float(data.max())
+            pct = np.percentile(data, PERCENTILES)
+            entry["percentiles"] = {f"p{p}": float(x) for p, x in zip(PERCENTILES, pct)}
+            # постоянное значение — одна корзина вместо bins одинаковых
+            counts, edges = np.histogram(data, bins=bins if entry["max"] > entry["min"] else 1)
+            entry["histogram"] = {"counts": counts.tolist(), "edges": edges.tolist()}
+        if name in spec:
+            lo, hi = spec[name]
+            entry["spec"] = [lo, hi]
+            entry["out_of_spec"] = int(((data < lo) | (data > hi)).sum())
+        fields[name] = entry
+
+    # ---------- проверки ----------
+    checks = {}
+    for name in CHECK_FIELDS:
+        v = cols[name]
+        checks[name] = {
+            "pass": int((v == 1).sum()),
+            "fail": int((v == -1).sum()),
+            "unknown": int((v == 0).sum()),
+        }
+
+    # строка вне допуска: хоть одна красная проверка или число вне spec
+    bad = np.zeros(n, dtype=bool)
+    for name in CHECK_FIELDS:
+        bad |= cols[name] == -1
+    for name, (lo, hi) in spec.items():
+        if name in cols:
+            v = cols[name]
+            bad |= (v < lo) | (v > hi)
+
+    ts_ok = cols["ts"][~np.isnat(cols["ts"])]
+    return {
+        "rows": n,
+        "passed": int(passed.sum()),
+        "unique_ids": int(len(uniq_ids)),
+        "retest_rows": int(retest.sum()),
+        "retest_rate": float(retest.mean()) if n else 0.0,
+        "out_of_spec_rows": int(bad.sum()),
+        "from": str(ts_ok.min()) if ts_ok.size else None,
+        "to": str(ts_ok.max()) if ts_ok.size else None,
+        "groups": per_group,
+        "fields": fields,
+        "checks": checks,
+    }
+
+
+def format_report(rep: dict, by: str) -> str:
+    out = []
+    out.append("Отчёт MPPT")
+    out.append(f"период: {rep['from']} … {rep['to']}")
+    y = rep["passed"] / rep["rows"] if rep["rows"] else 0.0
+    out.append(
+        f"строк: {rep['rows']} | PASSED: {rep['passed']} ({y:.1%}) | "
+        f"уникальных ID: {rep['unique_ids']} | повторные тесты: {rep['retest_rows']} "
+        f"({rep['retest_rate']:.1%}) | вне допуска: {rep['out_of_spec_rows']}"
+    )
+    out.append("")
+
+    title = "смена" if by == "shift" else "день"
+    out.append(f"{title:<16} {'строк':>7} {'PASSED':>7} {'ID':>7} {'yield':>7} {'retest':>7}")
+    for g in rep["groups"]:
+        out.append(
+            f"{g['group']:<16} {g['rows']:>7} {g['passed']:>7} {g['unique_ids']:>7} "
+            f"{g['yield']:>7.1%} {g['retest_rate']:>7.1%}"
+        )
+    out.append("")
+
+    out.append(f"{'поле':<8} {'n':>7} {'mean':>9} {'p1':>8} {'p5':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'вне':>6}")
+    for name, f in rep["fields"].items():
+        if "percentiles" not in f:
+            out.append(f"{name:<8} {f['count']:>7}")
+            continue
+        p = f["percentiles"]
+        oos = f.get("out_of_spec", "")
+        out.append(
+            f"{name:<8} {f['count']:>7} {f['mean']:>9.1f} {p['p1']:>8.0f} {p['p5']:>8.0f} "
+            f"{p['p50']:>8.0f} {p['p95']:>8.0f} {p['p99']:>8.0f} {oos:>6}"
+        )
+    out.append("")
+
+    out.append(f"{'проверка':<8} {'pass':>7} {'fail':>7} {'?':>7}")
+    for name, c in rep["checks"].items():
+        out.append(f"{name:<8} {c['pass']:>7} {c['fail']:>7} {c['unknown']:>7}")
+    out.append("")
+
+    out.append("гистограммы")
+    for name, f in rep["fields"].items():
+        h = f.get("histogram")
+        if not h:
+            continue
+        peak = max(h["counts"]) or 1
+        out.append(f"  {name}")
+        for c, lo, hi in zip(h["counts"], h["edges"][:-1], h["edges"][1:]):
+            bar = "#" * int(round(30 * c / peak))
+            out.append(f"    {lo:>9.0f} … {hi:<9.0f} {c:>7} {bar}")
+    return "\n".join(out) + "\n"
+
+
+# ----------------------------------------------------------------------
+# CLI
+# ----------------------------------------------------------------------
+
+def _parse_spec(items: List[str]) -> Dict[str, Tuple[float, float]]:
+    spec = {}
+    for item in items:
+        name, _, rng = item.partition("=")
+        lo, _, hi = rng.partition(":")
+        if name not in NUMBER_FIELDS:
+            raise SystemExit(f"неизвестное поле в --spec: {name} (есть: {', '.join(NUMBER_FIELDS)})")
+        spec[name] = (float(lo) if lo else -np.inf, float(hi) if hi else np.inf)
+    return spec
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="отчёт по производству MPPT из журнала")
+    ap.add_argument("--log-dir", default=DEFAULT_LOG_DIR, help="каталог логов (с journal/)")
+    ap.add_argument("--by", choices=("day", "shift"), default="day")
+    ap.add_argument("--shifts", default="08:00,20:00", help="начала смен для --by shift")
+    ap.add_argument("--from", dest="date_from", default=None, help="YYYY-MM-DD включительно")
+    ap.add_argument("--to", dest="date_to", default=None, help="YYYY-MM-DD включительно")
+    ap.add_argument("--bins", type=int, default=20)
+    ap.add_argument("--spec", action="append", default=[], help="допуск поля: U_bat=13500:14500")
+    ap.add_argument("--out", default=None, help="файл отчёта (по умолчанию <log-dir>/reports/...)")
+    ap.add_argument("--json", action="store_true", help="рядом с отчётом записать .json")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    journal = ResultJournal(get_journal_dir(args.log_dir))
+    cols = load_columns(journal.records())
+    t_load = time.perf_counter() - t0
+
+    day = cols["ts"].astype("datetime64[D]")
+    mask = np.ones(len(day), dtype=bool)
+    if args.date_from:
+        mask &= day >= np.datetime64(args.date_from)
+    if args.date_to:
+        mask &= day <= np.datetime64(args.date_to)
+    if not mask.all():
+        cols = select(cols, mask)
+
+    if not len(cols["passed"]):
+        print("в журнале нет строк за выбранный период")
+        return 1
+
+    shifts = parse_shifts(args.shifts) if args.by == "shift" else None
+    rep = build_report(cols, shifts=shifts, bins=args.bins, spec=_parse_spec(args.spec))
+    t_all = time.perf_counter() - t0
+
+    out = args.out
+    if out is None:
+        rep_dir = os.path.join(args.log_dir, "reports")
+        os.makedirs(rep_dir, exist_ok=True)
+        out = os.path.join(rep_dir, time.strftime("mppt_report_%Y%m%d_%H%M%S.txt"))
+    text = format_report(rep, args.by)
+    with open(out, "w", encoding="utf-8") as f:
+        f.write(text)
+    if args.json:
+        with open(os.path.splitext(out)[0] + ".json", "w", encoding="utf-8") as f:
+            json.dump(rep, f, ensure_ascii=False, indent=1)
+
+    print(text)
+    print(f"{rep['rows']} строк: загрузка {t_load:.2f} с, всего {t_all:.2f} с → {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
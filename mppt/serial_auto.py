@@ -7,15 +7,17 @@
   чтобы их было легко менять под другое устройство.
 - Есть:
     * list_ports()          — вернуть список подходящих портов для GUI
+                              (снимок util.port_registry, без опроса ОС)
     * connect(port_name)    — открыть заданный порт или автоподбор, если None
     * ensure(port_name)     — гарантировать открытое соединение
     * close()               — закрыть порт
 """
 
 import serial
-from serial.tools import list_ports
 from typing import List, Optional
 
+from util.port_registry import get_registry
+
 # Порты, которые мы явно хотим игнорировать (клоны UART-адаптеров и т.п.)
 IGNORED_DESCRIPTIONS: list[str] = [
     "CH340",
@@ -30,8 +32,14 @@ PREFERRED_DESCRIPTIONS: list[str] = [
 
 
 class SerialAuto:
-    def __init__(self, baudrate: int):
+    """
+    ports_wait_s — сколько ждать первого снимка реестра портов в list_ports()
+                   (0 — для вызовов из Tk-потока: до первого снимка портов нет)
+    """
+
+    def __init__(self, baudrate: int, ports_wait_s: float = 2.0):
         self.baudrate = baudrate
+        self.ports_wait_s = ports_wait_s
         self.ser: Optional[serial.Serial] = None
         self.current_port: Optional[str] = None
 
@@ -49,8 +57,13 @@ class SerialAuto:
         """
         Вернуть список портов, которые не попали под IGNORED_DESCRIPTIONS.
         Используется GUI (ComboBox) для выбора порта вручную.
+        Список берётся из общего реестра портов — автоконнект может
+        звать ensure() хоть каждые 500 мс, ОС при этом не опрашивается.
         """
-        ports = list(list_ports.comports())
+        return self.filter_ports(get_registry().ports(wait_s=self.ports_wait_s))
+
+    def filter_ports(self, ports) -> list:
+        """Отбросить порты из IGNORED_DESCRIPTIONS (для снимков реестра)."""
         return [p for p in ports if not self._is_ignored(p)]
 
     def _pick_port(self):
@@ -0,0 +1,255 @@
+# mppt/stations.py
+"""
+Многостанционный режим MPPT: N COM-портов → N независимых конвейеров в одном процессе.
+
+- Station         — одна плата: свой SerialAuto, свой reader-поток, свой
+                    PyteTerminal + FramePipeline; в GUI-поток ничего не шлёт,
+                    только обновляет своё состояние (version++).
+- StationManager  — находит порты по PREFERRED_DESCRIPTIONS, поднимает и
+                    переподключает станции в фоновом потоке. Все станции пишут
+                    через ОДИН MPPTLogger (он сериализует запись TXT/Excel),
+                    поэтому отдельные экземпляры приложения больше не дерутся
+                    за один xlsx.
+
+GUI (mppt.stations_gui.StationGridPanel) опрашивает станции по таймеру и
+перерисовывает только изменившиеся плитки — Tk-поток не зависит от частоты кадров.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from mppt.serial_auto import SerialAuto, PREFERRED_DESCRIPTIONS
+from mppt.terminal_pyte import PyteTerminal
+from mppt.pipeline import FramePipeline
+from util.port_registry import get_registry
+from util.telemetry import get_telemetry
+
+
+class Station:
+    """Одна станция (плата) на своём COM-порту."""
+
+    JOIN_TIMEOUT_S = 2.0  # сколько stop()/start() ждут выхода прошлого reader-потока
+
+    def __init__(self, port: str, logger, baudrate: int = 115200, cols: int = 64, rows: int = 18):
+        self.port = port
+        self.serial = SerialAuto(baudrate=baudrate)
+        self.term = PyteTerminal(cols=cols, rows=rows)
+        self.pipeline = FramePipeline(
+            self.term,
+            logger,
+            cols=cols,
+            rows=rows,
+            on_frame=self._on_frame,
+            station=port,
+            telemetry=get_telemetry(),
+        )
+
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+        # поколение reader-потока: после stop()/start() старый поток не трогает
+        # ни порт, ни состояние (даже если ещё не успел выйти)
+        self._gen = 0
+        # start()/stop() зовутся из scan-потока и из Tk-потока — по очереди
+        self._ctl_lock = threading.Lock()
+
+        # Состояние для GUI (читается из main-thread, пишется reader-потоком)
+        self.version = 0           # увеличивается на каждом кадре/смене состояния
+        self.connected = False
+        self.error: str = ""
+        self.last_frame_t = 0.0
+        self.passed_ids: int = 0   # сколько разных ID прошли PASSED на этой станции
+        self._last_passed: Optional[str] = None
+
+        # частота кадров (считается раз в секунду)
+        self.fps = 0.0
+        self._fps_t0 = time.monotonic()
+        self._fps_frames = 0
+
+    # ----------------------------------------------------------
+    def start(self) -> bool:
+        """Открыть порт и запустить reader-поток."""
+        with self._ctl_lock:
+            return self._start_locked()
+
+    def _start_locked(self) -> bool:
+        if self.running:
+            return True
+        self._join_reader()
+        if not self.serial.connect(self.port):
+            self.error = "не удалось открыть порт"
+            self.version += 1
+            return False
+
+        self._gen += 1
+        self.running = True
+        self.connected = True
+        self.error = ""
+        self.version += 1
+        self.thread = threading.Thread(target=self._reader_loop, args=(self._gen, self.serial.ser), daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self) -> None:
+        with self._ctl_lock:
+            self._gen += 1
+            self.running = False
+            try:
+                self.serial.close()
+            except Exception:
+                pass
+            self.connected = False
+            self.version += 1
+            self._join_reader()
+
+    def _join_reader(self) -> None:
+        """Дождаться выхода прошлого reader-потока (не из него самого)."""
+        th = self.thread
+        if th is not None and th is not threading.current_thread():
+            th.join(self.JOIN_TIMEOUT_S)
+
+    # ----------------------------------------------------------
+    def _reader_loop(self, gen: int, ser) -> None:
+        while self._gen == gen and ser is not None:
+            try:
+                data = ser.read_all()
+            except Exception:
+                if self._gen == gen:
+                    self.error = "порт недоступен (плата отключена?)"
+                break
+
+            if not data:
+                time.sleep(0.01)
+                continue
+
+            self.pipeline.feed_bytes(data)
+
+        # блокировка занята — идёт stop()/start(): порт и состояние уже не наши
+        if not self._ctl_lock.acquire(blocking=False):
+            return
+        try:
+            if self._gen != gen:
+                return
+            self.running = False
+            self.connected = False
+            try:
+                self.serial.close()
+            except Exception:
+                pass
+            self.version += 1
+        finally:
+            self._ctl_lock.release()
+
+    def _on_frame(self) -> None:
+        now = time.monotonic()
+        self.last_frame_t = now
+
+        rec = self.pipeline.last_record
+        if rec is not None and rec.is_passed:
+            sid = self.pipeline.device_short_id
+            if sid and sid != self._last_passed:
+                self._last_passed = sid
+                self.passed_ids += 1
+
+        self._fps_frames += 1
+        dt = now - self._fps_t0
+        if dt >= 1.0:
+            self.fps = self._fps_frames / dt
+            self._fps_frames = 0
+            self._fps_t0 = now
+
+        self.version += 1
+
+
+class StationManager:
+    """
+    Набор станций: по одной на каждый найденный ST-Link VCP.
+
+    logger          — общий MPPTLogger для всех станций
+    scan_interval_s — как часто перепроверять станции (новый порт из реестра
+                      портов будит поток сразу, не дожидаясь интервала)
+    descriptions    — какие порты считаем станциями (по умолчанию PREFERRED_DESCRIPTIONS)
+    """
+
+    def __init__(
+        self,
+        logger,
+        scan_interval_s: float = 2.0,
+        descriptions: Optional[List[str]] = None,
+        on_change: Optional[Callable[[], None]] = None,
+    ):
+        self.logger = logger
+        self.scan_interval_s = scan_interval_s
+        self.descriptions = list(descriptions or PREFERRED_DESCRIPTIONS)
+        self.on_change = on_change
+
+        self.stations: Dict[str, Station] = {}
+        self._lock = threading.Lock()
+        self._running = False
+        self._gen = 0  # поколение scan-потока: после stop()/start() старый поток выходит
+        self._thread: Optional[threading.Thread] = None
+        self._lister = SerialAuto(baudrate=115200)
+        self._wake = threading.Event()
+
+    # ----------------------------------------------------------
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._gen += 1
+        self._thread = threading.Thread(target=self._scan_loop, args=(self._gen,), daemon=True)
+        self._thread.start()
+        get_registry().subscribe(self._on_ports_changed)
+
+    def stop(self) -> None:
+        self._running = False
+        get_registry().unsubscribe(self._on_ports_changed)
+        self._wake.set()
+        with self._lock:
+            stations = list(self.stations.values())
+        for st in stations:
+            st.stop()
+
+    def snapshot(self) -> List[Station]:
+        """Список станций в стабильном порядке (по имени порта)."""
+        with self._lock:
+            return [self.stations[k] for k in sorted(self.stations)]
+
+    # ----------------------------------------------------------
+    def _on_ports_changed(self, ports, added, removed) -> None:
+        if added:
+            self._wake.set()
+
+    def _station_ports(self) -> List[str]:
+        ports = []
+        for p in self._lister.list_ports():
+            desc = (p.description or "").strip()
+            if any(mark in desc for mark in self.descriptions):
+                ports.append(p.device)
+        return ports
+
+    def _scan_loop(self, gen: int) -> None:
+        while self._running and gen == self._gen:
+            try:
+                ports = self._station_ports()
+            except Exception:
+                ports = []
+
+            changed = False
+            for port in ports:
+                with self._lock:
+                    st = self.stations.get(port)
+                    if st is None:
+                        st = Station(port, self.logger)
+                        self.stations[port] = st
+                        changed = True
+                if not st.running and self._running:
+                    st.start()
+
+            if changed and self.on_change is not None:
+                self.on_change()
+
+            self._wake.wait(self.scan_interval_s)
+            self._wake.clear()
@@ -0,0 +1,160 @@
+# mppt/stations_gui.py
+"""
+Компактная сетка станций для многостанционного режима MPPT.
+
+Каждая плата — плитка: порт, ID, состояние (PASSED / идёт тест / нет связи),
+частота кадров и значения полей кадра с цветами (как в Excel-логе).
+Данные берутся из mppt.stations.Station по таймеру; плитка перерисовывается
+только если у станции сменился version, так что при 8+ платах Tk-поток
+делает десятки config() в секунду, а не по кадру на каждую плату.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List
+
+from tkinter import Frame, Label, Button, TOP, LEFT, X, BOTH
+
+from mppt.logger import LOG_HEADER
+from mppt.stations import Station, StationManager
+
+
+# Цвета Excel ("RRGGBB") → цвета тёмной темы
+_EXCEL_TO_UI = {
+    "00AA00": "#50fa7b",
+    "FF0000": "#ff5555",
+}
+
+
+class _StationTile(Frame):
+    """Плитка одной станции."""
+
+    def __init__(self, master, station: Station, bg: str, fg: str):
+        super().__init__(master, bg="#2a2b2e", highlightthickness=1, highlightbackground="#3c4043")
+        self.station = station
+        self.fg = fg
+        self.drawn_version = -1
+
+        self.header = Label(self, text=station.port, bg="#2a2b2e", fg=fg, anchor="w",
+                            font=("Consolas", 10, "bold"))
+        self.header.pack(side=TOP, fill=X, padx=4, pady=(2, 0))
+
+        self.state = Label(self, text="", bg="#2a2b2e", fg="#80868b", anchor="w",
+                           font=("Consolas", 9))
+        self.state.pack(side=TOP, fill=X, padx=4)
+
+        fields = Frame(self, bg="#2a2b2e")
+        fields.pack(side=TOP, fill=X, padx=4, pady=(0, 2))
+
+        # ID показывается в заголовке — поля начиная с UART
+        self.field_labels: List[Label] = []
+        for i, name in enumerate(LOG_HEADER[1:]):
+            lbl = Label(fields, text=f"{name}: —", bg="#2a2b2e", fg="#80868b",
+                        anchor="w", font=("Consolas", 8))
+            lbl.grid(row=i // 3, column=i % 3, sticky="w", padx=(0, 6))
+            self.field_labels.append(lbl)
+
+    def refresh(self) -> None:
+        st = self.station
+        if st.version == self.drawn_version:
+            return
+        self.drawn_version = st.version
+
+        rec = st.pipeline.last_record
+        sid = st.pipeline.device_short_id or "----"
+
+        if not st.connected:
+            state_text = f"нет связи {st.error}".strip()
+            state_color = "#ff5555"
+        elif rec is not None and rec.is_passed:
+            state_text = "PASSED"
+            state_color = "#50fa7b"
+        elif rec is None and st.last_frame_t:
+            state_text = "нестандартный экран"
+            state_color = "#f1fa8c"
+        else:
+            state_text = "тест…"
+            state_color = "#8be9fd"
+
+        self.header.config(text=f"{st.port}  ID:{sid}  {st.fps:4.1f} fps  ✔{st.passed_ids}")
+        self.state.config(text=state_text, fg=state_color)
+
+        if rec is not None:
+            for lbl, name, val, col in zip(self.field_labels, LOG_HEADER[1:], rec.values[1:], rec.colors[1:]):
+                lbl.config(text=f"{name}: {val or '—'}", fg=_EXCEL_TO_UI.get(col, self.fg))
+
+
+class StationGridPanel(Frame):
+    """Сетка плиток станций + кнопки управления."""
+
+    REFRESH_MS = 250
+    COLUMNS = 2
+
+    def __init__(self, master, logger, bg: str = "#202124", fg: str = "#e8eaed", **kwargs):
+        super().__init__(master, bg=bg, **kwargs)
+        self.bg = bg
+        self.fg = fg
+
+        self.manager = StationManager(logger)
+        self._tiles: Dict[str, _StationTile] = {}
+        self._job = None
+
+        top = Frame(self, bg=bg)
+        top.pack(side=TOP, fill=X)
+
+        Label(top, text="Станции MPPT (ST-Link VCP)", bg=bg, fg=fg).pack(side=LEFT, padx=4)
+
+        Button(
+            top,
+            text="Переподключить все",
+            command=self._reconnect_all,
+            bg="#303134",
+            fg=fg,
+            activebackground="#3c4043",
+            activeforeground=fg,
+        ).pack(side=LEFT, padx=4, pady=2)
+
+        self.summary = Label(top, text="", bg=bg, fg="#80868b")
+        self.summary.pack(side=LEFT, padx=8)
+
+        self.grid_frame = Frame(self, bg=bg)
+        self.grid_frame.pack(side=TOP, fill=BOTH, expand=True, padx=4, pady=4)
+        for c in range(self.COLUMNS):
+            self.grid_frame.columnconfigure(c, weight=1)
+
+    # ----------------------------------------------------------
+    def start(self) -> None:
+        self.manager.start()
+        if self._job is None:
+            self._job = self.after(self.REFRESH_MS, self._refresh)
+
+    def stop(self) -> None:
+        if self._job is not None:
+            self.after_cancel(self._job)
+            self._job = None
+        self.manager.stop()
+
+    def _reconnect_all(self) -> None:
+        for st in self.manager.snapshot():
+            st.stop()
+        # менеджер поднимет их заново на следующем скане
+
+    # ----------------------------------------------------------
+    def _refresh(self) -> None:
+        stations = self.manager.snapshot()
+
+        for st in stations:
+            tile = self._tiles.get(st.port)
+            if tile is None:
+                idx = len(self._tiles)
+                tile = _StationTile(self.grid_frame, st, self.bg, self.fg)
+                tile.grid(row=idx // self.COLUMNS, column=idx % self.COLUMNS,
+                          sticky="nsew", padx=2, pady=2)
+                self._tiles[st.port] = tile
+            tile.refresh()
+
+        online = sum(1 for st in stations if st.connected)
+        passed = sum(st.passed_ids for st in stations)
+        self.summary.config(text=f"онлайн {online}/{len(stations)} | PASSED {passed}")
+
+        self._job = self.after(self.REFRESH_MS, self._refresh)
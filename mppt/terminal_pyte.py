@@ -8,6 +8,10 @@
 
 import pyte
 
+from util import perf
+
+PROBE_FEED = perf.probe("mppt.pyte_feed")
+
 
 # Простая карта цветов pyte -> Tkinter
 PYTE_FG_TO_HEX = {
@@ -45,20 +49,84 @@ class PyteTerminal:
         self.screen = pyte.Screen(cols, rows)
         self.stream = pyte.Stream(self.screen)
 
-        # последний "снимок" экрана в виде списка строк (для логгера)
-        self.last_block: list[str] = []
+        # Поколение экрана: увеличивается при каждом feed().
+        # Снимки строк считаются лениво и кешируются на одно поколение.
+        self.generation: int = 0
+        self._lines_cache: list[str] = []
+        self._lines_gen: int = -1
+        # кеш запросов has_text() для текущего поколения
+        self._text_queries: dict[tuple[str, bool], bool] = {}
+        # кеш матрицы цветов (rows x cols, "#RRGGBB") для текущего поколения
+        self._colors_cache: list[list[str]] = []
+        self._colors_gen: int = -1
 
     # -------------------- API для чтения из COM ------------------------
     def feed(self, text: str):
-        """Кормим сырой ANSI-поток (как есть из COM)."""
+        """Кормим сырой ANSI-поток (как есть из COM). Снимок экрана НЕ строится."""
+        t0 = PROBE_FEED.start()
         self.stream.feed(text)
-        # обновляем кеш строк
-        self.last_block = list(self.screen.display)
+        self.generation += 1
+        PROBE_FEED.stop(t0)
+
+    def current_fg(self) -> str:
+        """Текущий цвет текста курсора (имя pyte или hex для 256/truecolor)."""
+        return self.screen.cursor.attrs.fg
 
     # -------------------- API для GUI/логгера --------------------------
+    def _snapshot(self) -> list[str]:
+        """Строки экрана текущего поколения (считаются не чаще раза за поколение)."""
+        if self._lines_gen != self.generation:
+            self._lines_cache = list(self.screen.display)
+            self._lines_gen = self.generation
+            self._text_queries = {}
+        return self._lines_cache
+
+    @property
+    def last_block(self) -> list[str]:
+        """Последний "снимок" экрана в виде списка строк (для логгера)."""
+        return list(self._snapshot())
+
     def get_lines(self) -> list[str]:
         """Вернуть текущий экран как список строк (без цветов)."""
-        return list(self.screen.display)
+        return list(self._snapshot())
+
+    def has_text(self, needle: str, ignore_case: bool = True) -> bool:
+        """
+        Есть ли текст needle на текущем экране (например, "PASSED").
+        Результат кешируется до следующего feed().
+        """
+        lines = self._snapshot()
+        key = (needle, ignore_case)
+        found = self._text_queries.get(key)
+        if found is None:
+            if ignore_case:
+                n = needle.upper()
+                found = any(n in ln.upper() for ln in lines)
+            else:
+                found = any(needle in ln for ln in lines)
+            self._text_queries[key] = found
+        return found
+
+    def color_matrix(self) -> list[list[str]]:
+        """
+        Матрица цветов текущего экрана (rows x cols, "#RRGGBB"),
+        в том же формате, что CanvasTerminal.last_colors. Кешируется на поколение.
+        """
+        if self._colors_gen != self.generation:
+            default_hex = PYTE_FG_TO_HEX["default"]
+            buf = self.screen.buffer
+            matrix = []
+            for row in range(self.screen.lines):
+                rowbuf = buf.get(row, {})
+                row_colors = []
+                for col in range(self.screen.columns):
+                    cell = rowbuf.get(col)
+                    fg_name = (cell.fg or "default") if cell is not None else "default"
+                    row_colors.append(PYTE_FG_TO_HEX.get(fg_name, default_hex))
+                matrix.append(row_colors)
+            self._colors_cache = matrix
+            self._colors_gen = self.generation
+        return self._colors_cache
 
     def iter_colored_lines(self):
         """
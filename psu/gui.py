@@ -32,9 +32,12 @@ from tkinter import font as tkfont
 import os
 import json
 
-from serial.tools import list_ports
-
 from psu.owon import OwonPSU
+from gui.ui_queue import UiQueue
+from gui.ui_bus import UiBus
+from util.port_registry import get_registry
+from util.poll_scheduler import get_scheduler
+from util.telemetry import get_telemetry, PSU_SOURCE
 import re
 
 # Файл пресетов: ~\Documents\v7\psu_presets.json
@@ -61,11 +64,25 @@ def extract_com_number(text: str) -> str:
 class PSUControlPanel(Frame):
     """Главная панель управления ЛБП в правой части окна."""
     POLL_INTERVAL_MS = 200
-
-    def __init__(self, master, bg="#202124", fg="#e8eaed", **kwargs):
+    # имя задания опроса в util.poll_scheduler
+    POLL_JOB = "psu"
+
+    def __init__(
+        self,
+        master,
+        bg="#202124",
+        fg="#e8eaed",
+        ui: UiQueue | None = None,
+        bus: UiBus | None = None,
+        **kwargs,
+    ):
         super().__init__(master, bg=bg, **kwargs)
         self.bg = bg
         self.fg = fg
+        # фоновые шаги (пресеты, список портов) → результат в Tk-поток
+        self.ui = ui or UiQueue(self)
+        # измерения и статус → виджеты только через шину (можно из любого потока)
+        self.bus = bus or UiBus(self)
 
         # Объект ЛБП
         self.psu: OwonPSU | None = None
@@ -97,18 +114,21 @@ class PSUControlPanel(Frame):
         self.font_big = tkfont.Font(size=28, weight="bold")
         self.font_small = tkfont.Font(size=11)
 
-        # ID задачи опроса
-        self._measure_job = None
-
         # Построение интерфейса
         self._build_ui()
 
-        # Загрузим пресеты
-        self._load_presets()
-        self._refresh_presets_ui()
+        self.bus.bind("psu.meas", self._apply_measure)
+        self.bus.bind("psu.status", self._apply_status)
 
-        # Первичный рескан портов
-        self.rescan_ports()
+        # Пресеты и порты — в фоне, панель уже нарисована с заглушками
+        self.ui.submit(
+            self._read_presets,
+            on_done=self._on_presets_loaded,
+            on_error=self._on_presets_error,
+            name="psu-presets",
+        )
+        self._set_status("ЛБП: поиск портов…", "#80868b")
+        get_registry().subscribe(self._on_ports_changed)
 
     # ------------------------------------------------------------------
     # Связь с общим статусбаром
@@ -120,6 +140,11 @@ class PSUControlPanel(Frame):
         self._global_status_cb = cb
 
     def _set_status(self, text: str, color: str = "white"):
+        """Из любого потока: статус идёт через шину."""
+        self.bus.set("psu.status", (text, color))
+
+    def _apply_status(self, status):
+        text, color = status
         # локальный статус (над "Измерено")
         self.status_label.config(text=text, fg=color)
         # общий статусбар внизу
@@ -328,7 +353,9 @@ class PSUControlPanel(Frame):
 
         Label(top_presets, text="Пресеты", bg=self.bg, fg=self.fg).pack(side=LEFT)
 
-        btn_edit = Button(
+        # редактор недоступен, пока пресеты читаются в фоне: иначе его
+        # сохранение затёрло бы файл ещё не загруженных пресетов
+        self.btn_edit_presets = Button(
             top_presets,
             text="Редактировать",
             command=self._open_presets_editor,
@@ -336,8 +363,9 @@ class PSUControlPanel(Frame):
             fg=self.fg,
             activebackground="#3c4043",
             activeforeground=self.fg,
+            state="disabled",
         )
-        btn_edit.pack(side=RIGHT)
+        self.btn_edit_presets.pack(side=RIGHT)
 
         self.presets_container = Frame(presets_frame, bg=self.bg)
         self.presets_container.pack(side=TOP, fill=BOTH, expand=True)
@@ -346,8 +374,15 @@ class PSUControlPanel(Frame):
     # Работа с COM-портами
     # ------------------------------------------------------------------
     def rescan_ports(self):
-        """Обновление COM-портов ЛБП — с именами устройств."""
-        ports = list(list_ports.comports())
+        """Обновление COM-портов ЛБП (опрос — в util.port_registry, результат — в _apply_ports)."""
+        get_registry().rescan()
+
+    def _on_ports_changed(self, ports, added, removed):
+        """Поток реестра портов: перенести снимок в Tk-поток."""
+        self.ui.post(self._apply_ports, ports, added, removed)
+
+    def _apply_ports(self, ports, added=(), removed=()):
+        """Tk-поток: заполнить Combobox портами с именами устройств."""
         labels = []
 
         for p in ports:
@@ -367,7 +402,11 @@ class PSUControlPanel(Frame):
             # при старте ставим первый
             if not cur or cur not in labels:
                 self.port_var.set(labels[0])
-            self._set_status("Порты ЛБП обновлены", "cyan")
+            if added or removed:
+                parts = [f"+{d}" for d in added] + [f"−{d}" for d in removed]
+                self._set_status(f"Порты ЛБП: {' '.join(parts)}", "cyan")
+            else:
+                self._set_status("Порты ЛБП обновлены", "cyan")
         else:
             self.port_var.set("")
             self.combo_port["values"] = []
@@ -385,9 +424,7 @@ class PSUControlPanel(Frame):
         """Подключить / отключить ЛБП."""
         # --- Отключение ---
         if self.connected and self.psu:
-            if self._measure_job:
-                self.after_cancel(self._measure_job)
-                self._measure_job = None
+            self._stop_measure()
 
             try:
                 self.psu.close()
@@ -455,7 +492,7 @@ class PSUControlPanel(Frame):
             self.btn_connect.config(text="Отключить")
 
             # Запускаем опрос
-            self._schedule_measure()
+            self._start_measure()
 
         except Exception as e:
             self.psu = None
@@ -473,9 +510,7 @@ class PSUControlPanel(Frame):
             self._set_status("Reset COM: порт не выбран", "red")
             return
 
-        if self._measure_job:
-            self.after_cancel(self._measure_job)
-            self._measure_job = None
+        self._stop_measure()
 
         try:
             self.psu.close()
@@ -489,7 +524,7 @@ class PSUControlPanel(Frame):
             self.connected = True
 
             self._set_status(f"Reset COM успешен ({port})", "green")
-            self._schedule_measure()
+            self._start_measure()
         except Exception as e:
             self.psu = None
             self.connected = False
@@ -498,20 +533,35 @@ class PSUControlPanel(Frame):
     # ------------------------------------------------------------------
     # Опрос измерений
     # ------------------------------------------------------------------
-    def _schedule_measure(self):
+    def _start_measure(self):
+        """Опрос U/I в потоке планировщика; результат — через шину."""
         if not self.connected or not self.psu:
             return
+        get_scheduler().add(
+            self.POLL_JOB,
+            self.psu.measure,
+            self.POLL_INTERVAL_MS / 1000.0,
+            on_result=self._on_measure,
+            on_error=lambda e: self._set_status(f"Ошибка измерения ЛБП: {e}", "red"),
+        )
 
-        try:
-            u = self.psu.measure_voltage()
-            i = self.psu.measure_current()
-            self.u_meas_var.set(f"{u:.3f} V")
-            self.i_meas_var.set(f"{i:.3f} A")
-            self._update_current_color()
-        except Exception as e:
-            self._set_status(f"Ошибка измерения ЛБП: {e}", "red")
+    def _stop_measure(self):
+        get_scheduler().remove(self.POLL_JOB)
 
-        self._measure_job = self.after(self.POLL_INTERVAL_MS, self._schedule_measure)
+    def _on_measure(self, meas):
+        """Поток планировщика: U/I → телеметрия и шина."""
+        get_telemetry().record(PSU_SOURCE, meas)
+        self.bus.set("psu.meas", meas)
+
+    def _apply_measure(self, meas):
+        """Tk-поток: показать измеренные U/I и подсветить ток."""
+        if not self.connected:
+            # пришло уже после отключения — оставляем заглушки
+            return
+        u, i = meas
+        self.u_meas_var.set(f"{u:.3f} V")
+        self.i_meas_var.set(f"{i:.3f} A")
+        self._update_current_color()
 
     # ------------------------------------------------------------------
     # Уставки и выход
@@ -566,29 +616,42 @@ class PSUControlPanel(Frame):
     # ------------------------------------------------------------------
     # Пресеты
     # ------------------------------------------------------------------
-    def _load_presets(self):
+    def _read_presets(self) -> dict:
+        """Прочитать пресеты из файла (можно из фонового потока — Tk не трогает)."""
         os.makedirs(os.path.dirname(self.presets_path), exist_ok=True)
 
         if not os.path.exists(self.presets_path):
-            self.presets = DEFAULT_PRESETS.copy()
-            self._save_presets()
-            return
+            presets = DEFAULT_PRESETS.copy()
+            self._write_presets(presets)
+            return presets
 
         try:
             with open(self.presets_path, "r", encoding="utf-8") as f:
                 data = json.load(f)
                 if isinstance(data, dict):
-                    self.presets = data
-                else:
-                    self.presets = DEFAULT_PRESETS.copy()
+                    return data
+                return DEFAULT_PRESETS.copy()
         except Exception:
-            self.presets = DEFAULT_PRESETS.copy()
-            self._save_presets()
+            presets = DEFAULT_PRESETS.copy()
+            self._write_presets(presets)
+            return presets
+
+    def _on_presets_loaded(self, presets: dict):
+        self.presets = presets
+        self._refresh_presets_ui()
+        self.btn_edit_presets.config(state="normal")
+
+    def _on_presets_error(self, e: Exception):
+        # файл не прочитан — редактор (и перезапись файла) остаётся выключенным
+        self._set_status(f"Не удалось загрузить пресеты: {e}", "red")
 
     def _save_presets(self):
+        self._write_presets(self.presets)
+
+    def _write_presets(self, presets: dict):
         try:
             with open(self.presets_path, "w", encoding="utf-8") as f:
-                json.dump(self.presets, f, indent=2, ensure_ascii=False)
+                json.dump(presets, f, indent=2, ensure_ascii=False)
         except Exception as e:
             print("Ошибка сохранения пресетов ЛБП:", e)
 
@@ -22,7 +22,16 @@
 
 from __future__ import annotations
 
-from owon_psu import OwonPSU as _LibOwonPSU
+import threading
+from typing import TYPE_CHECKING
+
+from util import perf
+
+if TYPE_CHECKING:
+    from owon_psu import OwonPSU as _LibOwonPSU
+
+
+PROBE_MEASURE = perf.probe("psu.measure")
 
 
 class OwonPSU:
@@ -32,6 +41,9 @@ class OwonPSU:
         self._port = port
         self._dev: _LibOwonPSU | None = None
         self._opened = False
+        # Опрос измерений идёт из потока планировщика (util.poll_scheduler),
+        # уставки — из GUI: обмен по COM-порту не должен перемежаться
+        self._lock = threading.RLock()
 
     # ---------------- Базовые операции подключения ----------------
     @property
@@ -43,6 +55,9 @@ class OwonPSU:
         if self._opened and self._dev is not None:
             return
 
+        # owon_psu импортируется при первом подключении, а не при старте GUI
+        from owon_psu import OwonPSU as _LibOwonPSU
+
         dev = _LibOwonPSU(self._port)
         dev.open()
 
@@ -69,60 +84,78 @@ class OwonPSU:
 
     def close(self):
         """Закрыть соединение."""
-        if self._dev is not None:
-            try:
-                self._dev.close()
-            except Exception:
-                pass
-        self._dev = None
-        self._opened = False
+        with self._lock:
+            if self._dev is not None:
+                try:
+                    self._dev.close()
+                except Exception:
+                    pass
+            self._dev = None
+            self._opened = False
 
     def is_open(self) -> bool:
         return self._opened and self._dev is not None
 
     # ---------------- Методы, повторяющие API библиотеки ----------------
     def read_identity(self) -> str:
-        if not self.is_open():
-            raise RuntimeError("PSU not open")
-        return self._dev.read_identity()
+        with self._lock:
+            if not self.is_open():
+                raise RuntimeError("PSU not open")
+            return self._dev.read_identity()
 
     def measure_voltage(self) -> float:
-        if not self.is_open():
-            raise RuntimeError("PSU not open")
-        return self._dev.measure_voltage()
+        with self._lock:
+            if not self.is_open():
+                raise RuntimeError("PSU not open")
+            return self._dev.measure_voltage()
 
     def measure_current(self) -> float:
-        if not self.is_open():
-            raise RuntimeError("PSU not open")
-        return self._dev.measure_current()
+        with self._lock:
+            if not self.is_open():
+                raise RuntimeError("PSU not open")
+            return self._dev.measure_current()
+
+    def measure(self) -> tuple[float, float]:
+        """(U, I) одним обменом — без уставки из GUI между двумя запросами."""
+        t0 = PROBE_MEASURE.start()
+        with self._lock:
+            meas = self.measure_voltage(), self.measure_current()
+        PROBE_MEASURE.stop(t0)
+        return meas
 
     def get_voltage(self) -> float:
-        if not self.is_open():
-            raise RuntimeError("PSU not open")
-        return self._dev.get_voltage()
+        with self._lock:
+            if not self.is_open():
+                raise RuntimeError("PSU not open")
+            return self._dev.get_voltage()
 
     def get_current(self) -> float:
-        if not self.is_open():
-            raise RuntimeError("PSU not open")
-        return self._dev.get_current()
+        with self._lock:
+            if not self.is_open():
+                raise RuntimeError("PSU not open")
+            return self._dev.get_current()
 
     def set_voltage(self, value: float):
-        if not self.is_open():
-            raise RuntimeError("PSU not open")
-        self._dev.set_voltage(value)
+        with self._lock:
+            if not self.is_open():
+                raise RuntimeError("PSU not open")
+            self._dev.set_voltage(value)
 
     def set_current(self, value: float):
-        if not self.is_open():
-            raise RuntimeError("PSU not open")
-        self._dev.set_current(value)
+        with self._lock:
+            if not self.is_open():
+                raise RuntimeError("PSU not open")
+            self._dev.set_current(value)
 
     def set_output(self, state: bool):
         """Включить/выключить выход."""
-        if not self.is_open():
-            raise RuntimeError("PSU not open")
-        self._dev.set_output(bool(state))
+        with self._lock:
+            if not self.is_open():
+                raise RuntimeError("PSU not open")
+            self._dev.set_output(bool(state))
 
     def get_output(self) -> bool:
-        if not self.is_open():
-            raise RuntimeError("PSU not open")
-        return bool(self._dev.get_output())
+        with self._lock:
+            if not self.is_open():
+                raise RuntimeError("PSU not open")
+            return bool(self._dev.get_output())
@@ -8,7 +8,7 @@
 Поддерживаемые функции:
 - open / close
 - read_identity()
-- measure_voltage(), measure_current()
+- measure_voltage(), measure_current(), measure()
 - set_current(), get_current()
 - set_output(True/False), get_output()
 
@@ -24,9 +24,23 @@ from __future__ import annotations
 
 import threading
 from dataclasses import dataclass
-from typing import Optional, List
+from typing import TYPE_CHECKING, Optional, List
 
-import pyvisa
+from util import perf
+
+if TYPE_CHECKING:
+    import pyvisa
+
+
+def _pyvisa():
+    """pyvisa импортируется при первом обращении к нагрузке (долгий импорт VISA)."""
+    import pyvisa
+
+    return pyvisa
+
+
+PROBE_QUERY = perf.probe("visa.query")
+PROBE_WRITE = perf.probe("visa.write")
 
 
 @dataclass
@@ -70,7 +84,7 @@ class RigolDL3000:
     def open(self) -> None:
         if self.is_open():
             return
-        self._rm = pyvisa.ResourceManager()
+        self._rm = _pyvisa().ResourceManager()
         inst = self._rm.open_resource(self.resource_name)
         inst.timeout = self.timeout_ms
         # Переводим в CC по току и ставим 0 A
@@ -105,14 +119,19 @@ class RigolDL3000:
     def _write(self, cmd: str) -> None:
         if not self.is_open():
             raise RuntimeError("Rigol DL3000 not open")
+        t0 = PROBE_WRITE.start()
         with self._lock:
             self._inst.write(cmd)
+        PROBE_WRITE.stop(t0)
 
     def _query(self, cmd: str) -> str:
         if not self.is_open():
             raise RuntimeError("Rigol DL3000 not open")
+        t0 = PROBE_QUERY.start()
         with self._lock:
-            return self._inst.query(cmd).strip()
+            resp = self._inst.query(cmd).strip()
+        PROBE_QUERY.stop(t0)
+        return resp
 
     # ---------------- API высокого уровня ------------
 
@@ -129,6 +148,10 @@ class RigolDL3000:
         resp = self._query(":MEAS:CURR?")
         return float(resp)
 
+    def measure(self) -> tuple[float, float]:
+        """(V, A) — общий интерфейс нагрузок (у AtorchDL24 это один запрос)."""
+        return self.measure_voltage(), self.measure_current()
+
     # Настройка тока / диапазона
 
     def set_current(self, value: float) -> None:
@@ -166,7 +189,7 @@ class RigolDL3000:
         """
         Вернуть список VISA-ресурсов, похожих на DL3000 (USB устройства).
         """
-        rm = pyvisa.ResourceManager()
+        rm = _pyvisa().ResourceManager()
         resources = rm.list_resources()
         candidates: List[str] = []
         for r in resources:
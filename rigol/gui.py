@@ -53,8 +53,12 @@ from tkinter import (
     BOTH,
 )
 
-from serial.tools import list_ports  # для списка COM-портов Atorch
 from rigol.device import RigolDL3000, RigolPreset
+from gui.ui_queue import UiQueue
+from gui.ui_bus import UiBus
+from util.port_registry import get_registry
+from util.poll_scheduler import get_scheduler
+from util.telemetry import get_telemetry, LOAD_SOURCE
 from atorch.device import AtorchDL24  # класс-обёртка для DL24
 
 
@@ -73,16 +77,30 @@ class RigolControlPanel(Frame):
     так и с Atorch DL24 (через COM-порт).
     """
 
-    def __init__(self, master, bg="#202124", fg="#e8eaed", **kwargs):
+    # опрос V/I (задание "load" в util.poll_scheduler)
+    POLL_JOB = "load"
+    POLL_INTERVAL_S = 0.5
+
+    def __init__(
+        self,
+        master,
+        bg="#202124",
+        fg="#e8eaed",
+        ui: Optional[UiQueue] = None,
+        bus: Optional[UiBus] = None,
+        **kwargs,
+    ):
         super().__init__(master, bg=bg, **kwargs)
         self.bg = bg
         self.fg = fg
+        # фоновые шаги (пресеты, VISA/COM) → результат в Tk-поток
+        self.ui = ui or UiQueue(self)
+        # потоки опроса и ramp'а не трогают Tk: публикуют значения в шину
+        self.bus = bus or UiBus(self)
 
         # ---------------- Состояние ----------------
         # Универсальный объект нагрузки: RigolDL3000 или AtorchDL24
         self._device: Optional[object] = None
-        self._polling = False
-        self._poll_thread: Optional[threading.Thread] = None
 
         self._ramp_thread: Optional[threading.Thread] = None
         self._ramp_stop_flag = False
@@ -90,6 +108,11 @@ class RigolControlPanel(Frame):
         # Сопоставление "строка в OptionMenu" -> информация о ресурсе
         # { label: {"kind": "rigol", "resource": "..."} } или {"kind": "atorch", "port": "COM5"}
         self._resource_map: Dict[str, Dict[str, str]] = {}
+        # последние списки: VISA (сканируется по кнопке) и COM (из реестра портов)
+        self._visa_resources: List[str] = []
+        self._visa_error: Optional[Exception] = None
+        self._visa_pending = False
+        self._com_ports: list = []
 
         # ---------------- Переменные Tk ----------------
         self.status_var = StringVar(value="Нагрузка: не подключена")
@@ -103,9 +126,8 @@ class RigolControlPanel(Frame):
         self.v_meas_var = DoubleVar(value=0.0)
         self.i_meas_var = DoubleVar(value=0.0)
 
-        # Пресеты
+        # Пресеты (читаются в фоне, до этого меню — "<none>")
         self.presets: Dict[str, RigolPreset] = {}
-        self._load_presets()
 
         self.preset_names_var = StringVar(value="")
         self.selected_preset_name = StringVar(value="")
@@ -119,8 +141,21 @@ class RigolControlPanel(Frame):
         # ---------------- Сборка интерфейса ----------------
         self._build_ui()
 
-        # Первый рескан ресурсов (VISA + COM)
-        self._rescan_resources()
+        self.bus.bind("load.v_meas", self.v_meas_var.set)
+        self.bus.bind("load.i_meas", self.i_meas_var.set)
+        self.bus.bind("load.i_set", self.i_set_var.set)
+        self.bus.bind("load.status", self._apply_status)
+
+        # Пресеты и первый рескан ресурсов (VISA + COM) — в фоне:
+        # создание VISA ResourceManager занимает заметное время
+        self.ui.submit(
+            self._read_presets,
+            on_done=self._on_presets_loaded,
+            on_error=self._on_presets_error,
+            name="rigol-presets",
+        )
+        self._rescan_visa()
+        get_registry().subscribe(self._on_ports_changed)
 
     # =====================================================
     # UI
@@ -339,6 +374,8 @@ class RigolControlPanel(Frame):
             width=12
         ).pack(side=LEFT, padx=4)
 
+        # Rename / Save preset недоступны, пока пресеты читаются в фоне:
+        # иначе запись файла затёрла бы ещё не загруженные пресеты
         Button(
             name_row,
             text="Rename",
@@ -347,7 +384,9 @@ class RigolControlPanel(Frame):
             fg=self.fg,
             activebackground="#3c4043",
             activeforeground=self.fg,
+            state="disabled",
         ).pack(side=LEFT, padx=4)
+        self.btn_rename_preset = _last_button(name_row)
 
         Button(
             edit,
@@ -357,7 +396,9 @@ class RigolControlPanel(Frame):
             fg=self.fg,
             activebackground="#3c4043",
             activeforeground=self.fg,
+            state="disabled",
         ).pack(side=BOTTOM, anchor="e", padx=2, pady=4)
+        self.btn_save_preset = _last_button(edit)
 
         # инициализируем список пресетов в UI
         self._refresh_presets_menu()
@@ -366,7 +407,8 @@ class RigolControlPanel(Frame):
     # Работа с пресетами
     # =====================================================
 
-    def _load_presets(self):
+    def _read_presets(self) -> Dict[str, RigolPreset]:
+        """Прочитать пресеты из файла (можно из фонового потока — Tk не трогает)."""
         if PRESETS_FILE.is_file():
             try:
                 data = json.loads(PRESETS_FILE.read_text(encoding="utf-8"))
@@ -389,9 +431,9 @@ class RigolControlPanel(Frame):
                 },
             }
 
-        self.presets.clear()
+        presets: Dict[str, RigolPreset] = {}
         for name, p in data.items():
-            self.presets[name] = RigolPreset(
+            presets[name] = RigolPreset(
                 name=name,
                 i_start=float(p.get("i_start", 0.0)),
                 i_end=float(p.get("i_end", 1.0)),
@@ -399,15 +441,26 @@ class RigolControlPanel(Frame):
                 delay_s=float(p.get("delay_s", 0.1)),
             )
 
-        if not self.presets:
+        if not presets:
             # гарантируем хотя бы один
-            self.presets["Default"] = RigolPreset(
+            presets["Default"] = RigolPreset(
                 name="Default",
                 i_start=0.0,
                 i_end=1.0,
                 step=0.1,
                 delay_s=0.1,
             )
+        return presets
+
+    def _on_presets_loaded(self, presets: Dict[str, RigolPreset]):
+        self.presets = presets
+        self._refresh_presets_menu()
+        self.btn_rename_preset.config(state="normal")
+        self.btn_save_preset.config(state="normal")
+
+    def _on_presets_error(self, e: Exception):
+        # файл не прочитан — сохранять поверх него нельзя, кнопки остаются выключенными
+        self._set_status(f"Не удалось загрузить пресеты: {e}", "red")
 
     def _save_presets_file(self):
         data = {}
@@ -467,31 +520,51 @@ class RigolControlPanel(Frame):
     def _rescan_resources(self):
         """
         Обновление списка ресурсов:
-        - VISA-ресурсы (Rigol DL3000)
-        - COM-порты (как в PSU-панели), помеченные как [Atorch]
+        - VISA-ресурсы (Rigol DL3000) — сканирование в фоне (_scan_visa)
+        - COM-порты (Atorch) — из общего реестра портов (util.port_registry)
         """
-        self._resource_map.clear()
-        labels: List[str] = []
+        self._rescan_visa()
+        get_registry().rescan()
 
-        # --- VISA (Rigol) ---
+    def _rescan_visa(self):
+        self._set_status("Поиск ресурсов (Rigol/Atorch)…", "#80868b")
+        self._visa_pending = True
+        self.ui.submit(self._scan_visa, on_done=self._on_visa_scanned, name="rigol-visa")
+
+    @staticmethod
+    def _scan_visa():
+        """Фоновый поток, Tk не трогает. Возвращает (visa_resources, visa_error)."""
         try:
-            rigol_resources = RigolDL3000.discover_usb_resources()
+            return RigolDL3000.discover_usb_resources(), None
         except Exception as e:
-            rigol_resources = []
-            self._set_status(f"Ошибка сканирования VISA: {e}", "red")
-        else:
-            for r in rigol_resources:
-                label = f"{r} [Rigol]"
-                self._resource_map[label] = {"kind": "rigol", "resource": r}
-                labels.append(label)
+            return [], e
 
-        # --- COM-порты (Atorch) ---
-        try:
-            ports = list(list_ports.comports())
-        except Exception:
-            ports = []
+    def _on_visa_scanned(self, result):
+        self._visa_resources, self._visa_error = result
+        self._visa_pending = False
+        self._apply_resources()
+
+    def _on_ports_changed(self, ports, added, removed):
+        """Поток реестра портов: перенести снимок в Tk-поток (VISA не пересканируем)."""
+        self.ui.post(self._on_com_ports, ports)
 
-        for p in ports:
+    def _on_com_ports(self, ports):
+        self._com_ports = ports
+        self._apply_resources()
+
+    def _apply_resources(self):
+        """Tk-поток: собрать OptionMenu из последних VISA- и COM-списков."""
+        resource_map: Dict[str, Dict[str, str]] = {}
+        labels: List[str] = []
+
+        # --- VISA (Rigol) ---
+        for r in self._visa_resources:
+            label = f"{r} [Rigol]"
+            resource_map[label] = {"kind": "rigol", "resource": r}
+            labels.append(label)
+
+        # --- COM-порты (Atorch) ---
+        for p in self._com_ports:
             desc = p.description or p.hwid or "Неизвестное устройство"
 
             # как в psu/gui.py — убираем (COMxx) из description, если Windows уже добавил
@@ -500,9 +573,11 @@ class RigolControlPanel(Frame):
 
             pretty = f"{desc} ({p.device})"
             label = f"{pretty}"
-            self._resource_map[label] = {"kind": "atorch", "port": p.device}
+            resource_map[label] = {"kind": "atorch", "port": p.device}
             labels.append(label)
 
+        self._resource_map = resource_map
+
         # Обновим OptionMenu
         menu = self.resource_menu["menu"]
         menu.delete(0, "end")
@@ -516,11 +591,24 @@ class RigolControlPanel(Frame):
                 )
             if current_value not in labels:
                 self.resource_var.set(labels[0])
-            self._set_status("Сканирование ресурсов (Rigol/Atorch) завершено", "cyan")
         else:
             self.resource_var.set("")
+
+        if self._visa_pending:
+            # COM-порты уже есть, VISA ещё сканируется — статус «поиск…» не трогаем
+            return
+        if self._visa_error is not None:
+            self._set_status(f"Ошибка сканирования VISA: {self._visa_error}", "red")
+        elif labels:
+            self._set_status("Сканирование ресурсов (Rigol/Atorch) завершено", "cyan")
+        else:
             self._set_status("Нет доступных ресурсов Rigol/Atorch", "yellow")
 
+    @property
+    def device(self):
+        """Подключённая нагрузка (RigolDL3000 / AtorchDL24) или None — для прогона КПД."""
+        return self._device
+
     def _toggle_connect(self):
         if self._device is None:
             self._connect()
@@ -605,28 +693,30 @@ class RigolControlPanel(Frame):
     # Опрос V/I в фоне
 
     def _start_polling(self):
-        if self._polling:
+        dev = self._device
+        if dev is None:
             return
-        self._polling = True
-        self._poll_thread = threading.Thread(target=self._poll_loop, daemon=True)
-        self._poll_thread.start()
+
+        def poll():
+            return dev.measure()
+
+        # ошибки опроса не показываем: при сбоях планировщик сам реже опрашивает
+        get_scheduler().add(
+            self.POLL_JOB,
+            poll,
+            self.POLL_INTERVAL_S,
+            on_result=self._publish_measure,
+        )
 
     def _stop_polling(self):
-        self._polling = False
-        if self._poll_thread is not None:
-            self._poll_thread = None
+        get_scheduler().remove(self.POLL_JOB)
 
-    def _poll_loop(self):
-        while self._polling and self._device is not None:
-            try:
-                v = self._device.measure_voltage()
-                i = self._device.measure_current()
-                self.v_meas_var.set(round(v, 4))
-                self.i_meas_var.set(round(i, 4))
-            except Exception:
-                # не заваливаем поток
-                pass
-            time.sleep(0.5)
+    def _publish_measure(self, meas):
+        """Поток планировщика: измерения → телеметрия и шина."""
+        v, i = meas
+        get_telemetry().record(LOAD_SOURCE, (v, i))
+        self.bus.set("load.v_meas", round(v, 4))
+        self.bus.set("load.i_meas", round(i, 4))
 
     def _rename_preset(self):
         old = self.selected_preset_name.get()
@@ -736,7 +826,7 @@ class RigolControlPanel(Frame):
 
             current = i_start
             self._device.set_current(current)
-            self.i_set_var.set(current)
+            self.bus.set("load.i_set", current)
 
             for _ in range(steps):
                 if self._ramp_stop_flag or self._device is None:
@@ -751,7 +841,7 @@ class RigolControlPanel(Frame):
                     current = high
 
                 self._device.set_current(current)
-                self.i_set_var.set(current)
+                self.bus.set("load.i_set", current)
                 time.sleep(delay)
 
                 if (step_sign > 0 and current >= i_end) or (step_sign < 0 and current <= i_end):
@@ -766,6 +856,11 @@ class RigolControlPanel(Frame):
     # =====================================================
 
     def _set_status(self, msg: str, color: str = "white"):
+        """Из любого потока (ramp, опрос): статус идёт через шину."""
+        self.bus.set("load.status", (msg, color))
+
+    def _apply_status(self, status):
+        msg, color = status
         self.status_var.set(msg)
         self.status_label.config(fg=color)
 
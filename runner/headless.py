@@ -0,0 +1,97 @@
+# runner/headless.py
+"""
+Запуск тестовой последовательности без GUI (сервер стенда, автоматизация):
+
+    python -m runner.headless seq.yaml
+    python -m runner.headless seq.json --stations COM5,COM6 --out result.json
+    python -m runner.headless seq.yaml --view        # то же + окно-просмотрщик
+
+Ход выполнения печатается в консоль, итог — JSON-файл (по умолчанию
+<runs>/<name>_YYYYmmdd_HHMMSS.json). Код возврата: 0 — все шаги ok,
+1 — есть fail/error, 2 — ошибка в описании последовательности.
+Формат последовательности — в runner.sequence.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import threading
+from typing import Optional
+
+from util import perf
+from util.fileutil import get_run_result_path
+from runner.sequence import (
+    SequenceError,
+    SequenceRunner,
+    load_sequence,
+    save_result,
+    STEP_RUN,
+)
+
+
+def print_event(station: Optional[str], index: int, kind: str, status: str, detail: str) -> None:
+    where = station or "стенд"
+    if status == STEP_RUN:
+        print(f"[{where}] #{index} {kind} …")
+    else:
+        print(f"[{where}] #{index} {kind}: {status}" + (f" — {detail}" if detail else ""))
+
+
+def run_interruptible(runner: SequenceRunner) -> dict:
+    """Прогон в потоке; Ctrl+C останавливает шаги, teardown всё равно выполняется."""
+    box = {}
+    th = threading.Thread(target=lambda: box.update(result=runner.run()), name="sequence", daemon=True)
+    th.start()
+    while th.is_alive():
+        try:
+            th.join(0.2)
+        except KeyboardInterrupt:
+            print("Остановка: выполняется teardown…")
+            runner.stop()
+    return box.get("result", {"sequence": runner.seq.get("name"), "ok": False, "error": "прогон не завершился"})
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="headless-прогон тестовой последовательности MPPT")
+    ap.add_argument("sequence", help="файл последовательности (.yaml/.yml/.json)")
+    ap.add_argument("--stations", default=None, help="порты станций через запятую (вместо stations из файла)")
+    ap.add_argument("--out", default=None, help="файл результата (по умолчанию <runs>/<name>_<время>.json)")
+    ap.add_argument("--no-log", action="store_true", help="не писать PASSED в журнал MPPTLogger")
+    ap.add_argument("--view", action="store_true", help="показать окно хода прогона (нужен дисплей)")
+    ap.add_argument("--perf", action="store_true", help="включить пробы util.perf и сохранить снимок рядом с результатом")
+    args = ap.parse_args(argv)
+
+    try:
+        seq = load_sequence(args.sequence)
+    except (OSError, ValueError, SequenceError) as e:
+        print(f"Последовательность: {e}")
+        return 2
+
+    if args.perf:
+        perf.enable(True)
+
+    stations = [p.strip() for p in args.stations.split(",") if p.strip()] if args.stations else None
+    runner = SequenceRunner(seq, stations=stations, use_log=False if args.no_log else None, on_event=print_event)
+    out = args.out or get_run_result_path(seq["name"])
+    print(f"{seq['name']}: станции {', '.join(runner.ports) or '—'}")
+
+    if args.view:
+        from runner.viewer import run_with_viewer
+
+        result = run_with_viewer(runner)
+    else:
+        result = run_interruptible(runner)
+
+    save_result(result, out)
+    if args.perf:
+        # задания опроса к этому моменту сняты — берём снимок, сделанный до Bench.close()
+        perf.gauge("poll", lambda: result.get("poll", {}))
+        print(f"Пробы: {perf.dump(os.path.splitext(out)[0] + '.perf.json', extra={'result': out})}")
+    print(f"{'OK' if result.get('ok') else 'FAIL'} за {result.get('elapsed_s', 0):.1f} с → {out}")
+    return 0 if result.get("ok") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,629 @@
+# runner/sequence.py
+"""
+Тестовые последовательности без GUI: описание в YAML/JSON, выполнение на
+классах приборов напрямую (OwonPSU, RigolDL3000 / AtorchDL24, станции MPPT
+mppt.stations.Station = SerialAuto + PyteTerminal + FramePipeline, общий
+MPPTLogger).
+
+Формат (YAML; JSON — то же самое):
+
+    name: mppt_basic
+    instruments:
+      psu:  {port: COM3}
+      load: {type: rigol, resource: "USB0::0x1AB1::0x0E11::DL3A...::INSTR"}
+      #     {type: atorch, port: COM7}
+    stations: auto            # ST-Link VCP по описанию порта, или [COM5, COM6], или []
+    log: true                 # PASSED-кадры — в журнал MPPTLogger (как в GUI)
+    poll_s: 0.2               # период опроса ЛБП/нагрузки в телеметрию
+    setup:                    # один раз до станций (общий стенд)
+      - psu: {voltage: 24, current: 3, output: true}
+    steps:                    # на каждой станции, станции параллельно
+      - wait_passed: {timeout: 60}
+      - load: {current: 1.5, output: true}
+      - settle: {timeout: 10}
+      - measure: {name: "1.5A", duration: 2, expect: {eff: [85, 100], U_bat: [12, 14.6]}}
+      - log: {}
+    teardown:                 # один раз после станций (выполняется всегда)
+      - load: {output: false}
+      - psu: {output: false}
+
+Шаги: psu, load, wait, wait_frame, wait_passed, settle, measure, log, sweep.
+Шаги общего стенда (BENCH_STEPS) станции выполняют по очереди — под
+Bench.lock, чтобы параллельные станции не перебивали уставки друг друга
+и не запускали два прогона КПД на одних приборах. Подряд идущие шаги стенда
+(в т.ч. через wait) — одна серия под одним захватом: load → settle → measure
+станции не разорвёт чужой load. Шаги станции (wait_passed, log, ...) серию
+заканчивают — приборы переходят к следующей станции.
+Шаг с неуспехом (таймаут, expect вне допуска, исключение) останавливает
+свою станцию (остальные шаги — skip), если у него нет continue_on_fail: true.
+
+Результат — JSON: по станциям список шагов со статусом, временем и данными
+(runner.headless пишет его в <runs>/<name>_YYYYmmdd_HHMMSS.json).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from util.poll_scheduler import get_scheduler
+from util.telemetry import get_telemetry, mppt_fields, PSU_SOURCE, LOAD_SOURCE, MPPT_SOURCE
+
+STEP_OK = "ok"
+STEP_FAIL = "fail"
+STEP_ERROR = "error"
+STEP_SKIP = "skip"
+STEP_RUN = "run"
+
+# имена заданий опроса — как у панелей (SweepEngine их только ускоряет)
+PSU_JOB = "psu"
+LOAD_JOB = "load"
+
+# шаги, которые управляют общими приборами стенда или читают их телеметрию
+BENCH_STEPS = frozenset({"psu", "load", "settle", "measure", "sweep"})
+# шаги, которые не прерывают серию шагов стенда (приборы остаются за станцией)
+BENCH_HOLD_STEPS = BENCH_STEPS | {"wait"}
+
+# callback событий: (станция или None для setup/teardown, № шага, тип шага, статус, подробности)
+EventCallback = Callable[[Optional[str], int, str, str, str], None]
+
+
+class SequenceError(Exception):
+    """Ошибка в описании последовательности (до запуска)."""
+
+
+class StepFailed(Exception):
+    """Шаг выполнен, но результат вне требований (таймаут, expect)."""
+
+
+def load_sequence(path: str) -> dict:
+    """Прочитать последовательность из .yaml/.yml (нужен PyYAML) или .json."""
+    with open(path, "r", encoding="utf-8") as f:
+        text = f.read()
+    if os.path.splitext(path)[1].lower() in (".yaml", ".yml"):
+        try:
+            import yaml
+        except ImportError:
+            raise SequenceError("для YAML нужен PyYAML (pip install pyyaml) — или используйте JSON")
+        seq = yaml.safe_load(text)
+    else:
+        seq = json.loads(text)
+    validate_sequence(seq)
+    seq.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    return seq
+
+
+def validate_sequence(seq: Any) -> None:
+    if not isinstance(seq, dict):
+        raise SequenceError("последовательность — словарь с ключами instruments/stations/setup/steps/teardown")
+    for section in ("setup", "steps", "teardown"):
+        steps = seq.get(section, [])
+        if not isinstance(steps, list):
+            raise SequenceError(f"{section}: ожидается список шагов")
+        for n, step in enumerate(steps):
+            kind, _args = _split_step(step, f"{section}[{n}]")
+            if kind not in STEPS:
+                raise SequenceError(f"{section}[{n}]: неизвестный шаг '{kind}' (есть: {', '.join(STEPS)})")
+    stations = seq.get("stations", [])
+    if stations != "auto" and not isinstance(stations, list):
+        raise SequenceError("stations: 'auto' или список портов")
+
+
+def _split_step(step: Any, where: str = "") -> tuple:
+    """{"load": {...}} → ("load", {...}); {"wait": 2} → ("wait", {"seconds": 2})."""
+    if not isinstance(step, dict) or len(step) != 1:
+        raise SequenceError(f"{where}: шаг — словарь из одного ключа (тип шага)")
+    kind, args = next(iter(step.items()))
+    if args is None:
+        args = {}
+    elif not isinstance(args, dict):
+        args = {"seconds" if kind == "wait" else "value": args}
+    return kind, args
+
+
+# ----------------------------------------------------------
+# Стенд: приборы и станции
+# ----------------------------------------------------------
+class Bench:
+    """Открытые приборы стенда + общий опрос их в телеметрию."""
+
+    def __init__(self, instruments: dict, poll_s: float = 0.2):
+        self.psu = None
+        self.load = None
+        self.poll_s = poll_s
+        self.hub = get_telemetry()
+        # серии шагов BENCH_STEPS станций — по одной (приборы на всех одни)
+        self.lock = threading.Lock()
+        self._cfg = instruments or {}
+
+    def open(self) -> None:
+        cfg = self._cfg
+        sched = get_scheduler()
+        hub = self.hub
+        if "psu" in cfg:
+            from psu.owon import OwonPSU
+
+            psu = OwonPSU(cfg["psu"]["port"])
+            psu.open()
+            self.psu = psu
+
+            def poll_psu():
+                meas = psu.measure()
+                hub.record(PSU_SOURCE, meas)
+                return meas
+
+            sched.add(PSU_JOB, poll_psu, self.poll_s)
+        if "load" in cfg:
+            load_cfg = cfg["load"]
+            kind = load_cfg.get("type", "rigol")
+            if kind == "rigol":
+                from rigol.device import RigolDL3000
+
+                load = RigolDL3000(load_cfg["resource"])
+            elif kind == "atorch":
+                from atorch.device import AtorchDL24
+
+                load = AtorchDL24(load_cfg["port"])
+            else:
+                raise SequenceError(f"instruments.load.type: rigol или atorch, а не '{kind}'")
+            load.open()
+            self.load = load
+
+            def poll_load():
+                meas = load.measure()
+                hub.record(LOAD_SOURCE, meas)
+                return meas
+
+            sched.add(LOAD_JOB, poll_load, self.poll_s)
+
+    def close(self) -> None:
+        sched = get_scheduler()
+        sched.remove(PSU_JOB)
+        sched.remove(LOAD_JOB)
+        for dev in (self.load, self.psu):
+            if dev is not None:
+                try:
+                    dev.close()
+                except Exception as e:
+                    print(f"Стенд: ошибка закрытия прибора: {e}")
+
+
+def find_station_ports() -> List[str]:
+    """Порты станций MPPT (ST-Link VCP по PREFERRED_DESCRIPTIONS)."""
+    from mppt.serial_auto import SerialAuto, PREFERRED_DESCRIPTIONS
+
+    ports = []
+    for p in SerialAuto(baudrate=115200).list_ports():
+        desc = (p.description or "").strip()
+        if any(mark in desc for mark in PREFERRED_DESCRIPTIONS):
+            ports.append(p.device)
+    return sorted(ports)
+
+
+# ----------------------------------------------------------
+# Выполнение
+# ----------------------------------------------------------
+class StepContext:
+    """Что доступно шагу: стенд, станция (или None), логгер, флаг остановки."""
+
+    def __init__(self, runner: "SequenceRunner", station=None):
+        self.runner = runner
+        self.bench: Bench = runner.bench
+        self.station = station
+        self.logger = runner.logger
+
+    @property
+    def port(self) -> Optional[str]:
+        return self.station.port if self.station is not None else None
+
+    def need_psu(self):
+        if self.bench.psu is None:
+            raise SequenceError("шаг требует instruments.psu")
+        return self.bench.psu
+
+    def need_load(self):
+        if self.bench.load is None:
+            raise SequenceError("шаг требует instruments.load")
+        return self.bench.load
+
+    def need_station(self):
+        if self.station is None:
+            raise SequenceError("шаг станции MPPT — только в steps (не в setup/teardown)")
+        return self.station
+
+    def sleep(self, seconds: float) -> None:
+        if self.runner.stop_event.wait(seconds):
+            raise StepFailed("прогон остановлен")
+
+    def wait_until(self, cond: Callable[[], bool], timeout: float, what: str, period: float = 0.05) -> float:
+        """Ждать cond() не дольше timeout; возвращает, сколько ждали."""
+        t0 = time.monotonic()
+        while not cond():
+            if time.monotonic() - t0 >= timeout:
+                raise StepFailed(f"таймаут {timeout:g} с: {what}")
+            self.sleep(period)
+        return time.monotonic() - t0
+
+
+def _step_psu(ctx: StepContext, args: dict) -> dict:
+    psu = ctx.need_psu()
+    if "current" in args:
+        psu.set_current(float(args["current"]))
+    if "voltage" in args:
+        psu.set_voltage(float(args["voltage"]))
+    if "output" in args:
+        psu.set_output(bool(args["output"]))
+    return {k: args[k] for k in ("voltage", "current", "output") if k in args}
+
+
+def _step_load(ctx: StepContext, args: dict) -> dict:
+    load = ctx.need_load()
+    if "current" in args:
+        load.set_current(float(args["current"]))
+    if "output" in args:
+        load.set_output(bool(args["output"]))
+    return {k: args[k] for k in ("current", "output") if k in args}
+
+
+def _step_wait(ctx: StepContext, args: dict) -> dict:
+    ctx.sleep(float(args.get("seconds", 1.0)))
+    return {}
+
+
+def _step_wait_frame(ctx: StepContext, args: dict) -> dict:
+    """Плата шлёт кадры (новый кадр после начала шага)."""
+    st = ctx.need_station()
+    t0 = time.monotonic()
+    waited = ctx.wait_until(lambda: st.last_frame_t > t0, float(args.get("timeout", 10.0)), "нет кадров от платы")
+    return {"waited_s": round(waited, 3)}
+
+
+def _step_wait_passed(ctx: StepContext, args: dict) -> dict:
+    """
+    Кадр с PASSED. new: true (по умолчанию) — новая плата (ID) после начала
+    шага; false — достаточно PASSED на текущем кадре.
+    """
+    st = ctx.need_station()
+    start_ids = st.passed_ids
+    if args.get("new", True):
+        cond = lambda: st.passed_ids > start_ids
+    else:
+        cond = lambda: st.pipeline.last_record is not None and st.pipeline.last_record.is_passed
+    waited = ctx.wait_until(cond, float(args.get("timeout", 60.0)), "нет PASSED")
+    data: Dict[str, Any] = {"waited_s": round(waited, 3), "device_id": st.pipeline.device_short_id}
+    rec = st.pipeline.last_record
+    if rec is not None:
+        from mppt.logger import LOG_HEADER
+
+        data["values"] = dict(zip(LOG_HEADER, rec.values))
+    return data
+
+
+def _step_settle(ctx: StepContext, args: dict) -> dict:
+    """Установление U/I ЛБП и нагрузки по телеметрии (как в прогоне КПД)."""
+    from sweep.engine import is_settled
+
+    window = float(args.get("window", 1.0))
+    rel_tol = float(args.get("rel_tol", 0.005))
+    abs_v = float(args.get("abs_v", 0.01))
+    abs_i = float(args.get("abs_i", 0.005))
+    min_samples = int(args.get("min_samples", 4))
+    sources = [s for s, dev in ((PSU_SOURCE, ctx.bench.psu), (LOAD_SOURCE, ctx.bench.load)) if dev is not None]
+    if not sources:
+        raise SequenceError("settle: нет приборов стенда")
+    t_set = time.monotonic()
+    hub = ctx.bench.hub
+
+    def cond():
+        now = time.monotonic()
+        if now - t_set < window:
+            return False
+        return is_settled(hub, max(t_set, now - window), rel_tol, abs_v, abs_i, min_samples, sources)
+
+    waited = ctx.wait_until(cond, float(args.get("timeout", 15.0)), "U/I не установились", period=0.1)
+    return {"settle_s": round(waited, 3)}
+
+
+def _mean(hub, source: str, t_from: float) -> Optional[np.ndarray]:
+    t, v = hub.since(source, t_from)
+    if not len(t):
+        return None
+    with np.errstate(all="ignore"):
+        return np.nanmean(v, axis=0)
+
+
+def _step_measure(ctx: StepContext, args: dict) -> dict:
+    """
+    Средние за duration секунд: u_in, i_in, p_in (ЛБП), v_out, i_out, p_out
+    (нагрузка), eff, числовые поля кадров станции. expect: {поле: [min, max]}.
+    """
+    hub = ctx.bench.hub
+    t0 = time.monotonic()
+    ctx.sleep(float(args.get("duration", 1.0)))
+
+    data: Dict[str, Any] = {}
+    if args.get("name"):
+        data["name"] = args["name"]
+    psu = _mean(hub, PSU_SOURCE, t0) if ctx.bench.psu is not None else None
+    load = _mean(hub, LOAD_SOURCE, t0) if ctx.bench.load is not None else None
+    if psu is not None:
+        data.update(u_in=float(psu[0]), i_in=float(psu[1]), p_in=float(psu[0] * psu[1]))
+    if load is not None:
+        data.update(v_out=float(load[0]), i_out=float(load[1]), p_out=float(load[0] * load[1]))
+    if psu is not None and load is not None and data["p_in"] > 0:
+        data["eff"] = 100.0 * data["p_out"] / data["p_in"]
+    if ctx.station is not None:
+        frames = _mean(hub, f"{MPPT_SOURCE}.{ctx.port}", t0)
+        if frames is not None:
+            data.update({name: float(x) for name, x in zip(mppt_fields(), frames)})
+
+    problems = []
+    for field, bounds in (args.get("expect") or {}).items():
+        lo, hi = bounds
+        value = data.get(field)
+        if value is None or not np.isfinite(value):
+            problems.append(f"{field}: нет данных")
+        elif not (lo <= value <= hi):
+            problems.append(f"{field}={value:.4g} вне [{lo}, {hi}]")
+    for k, v in list(data.items()):
+        if isinstance(v, float):
+            data[k] = round(v, 6) if np.isfinite(v) else None
+    if problems:
+        raise StepFailed("; ".join(problems), data)
+    return data
+
+
+def _step_log(ctx: StepContext, args: dict) -> dict:
+    """Сохранить текущий экран станции в журнал (как кнопка «Сохранить» в GUI)."""
+    st = ctx.need_station()
+    if ctx.logger is None:
+        raise SequenceError("log: журнал выключен (log: false / --no-log)")
+    st.pipeline.sync_term()
+    ctx.logger.save_block(
+        st.term.get_lines(),
+        st.term.color_matrix(),
+        st.pipeline.device_short_id,
+        station=st.port,
+        uid=st.pipeline.device_uid,
+    )
+    return {"device_id": st.pipeline.device_short_id}
+
+
+def _step_sweep(ctx: StepContext, args: dict) -> dict:
+    """Прогон КПД (sweep.engine): voltages/currents — списки или строки "start:stop:step"."""
+    from sweep.engine import SweepConfig, SweepEngine, parse_grid
+
+    def grid(value):
+        return parse_grid(value) if isinstance(value, str) else [float(x) for x in value]
+
+    params = {k: v for k, v in args.items() if k not in ("voltages", "currents", "continue_on_fail")}
+    cfg = SweepConfig(voltages=grid(args["voltages"]), currents=grid(args["currents"]), **params)
+    engine = SweepEngine(ctx.need_psu(), ctx.need_load(), cfg, psu_job=PSU_JOB, load_job=LOAD_JOB)
+    done = threading.Event()
+
+    def stop_on_request():
+        # живёт только пока идёт этот прогон
+        while not done.is_set():
+            if ctx.runner.stop_event.wait(0.2):
+                engine.stop()
+                return
+
+    stopper = threading.Thread(target=stop_on_request, name="sweep-stop", daemon=True)
+    stopper.start()
+    try:
+        result = engine.run()
+    finally:
+        done.set()
+        stopper.join()
+    path = result.save()
+    data = {"path": path, "points": len(result.points), "elapsed_s": round(result.elapsed_s, 1)}
+    if result.aborted:
+        raise StepFailed(result.error or "прогон остановлен", data)
+    return data
+
+
+STEPS: Dict[str, Callable[[StepContext, dict], dict]] = {
+    "psu": _step_psu,
+    "load": _step_load,
+    "wait": _step_wait,
+    "wait_frame": _step_wait_frame,
+    "wait_passed": _step_wait_passed,
+    "settle": _step_settle,
+    "measure": _step_measure,
+    "log": _step_log,
+    "sweep": _step_sweep,
+}
+
+
+class SequenceRunner:
+    """
+    seq       — словарь последовательности (load_sequence)
+    stations  — порты станций (перекрывает seq["stations"])
+    use_log   — False: без MPPTLogger (авто-PASSED и шаг log не пишут журнал)
+    on_event  — события шагов (из потоков станций) — для просмотрщика/консоли
+    """
+
+    def __init__(
+        self,
+        seq: dict,
+        stations: Optional[List[str]] = None,
+        use_log: Optional[bool] = None,
+        on_event: Optional[EventCallback] = None,
+    ):
+        self.seq = seq
+        self.on_event = on_event
+        self.stop_event = threading.Event()
+        self.bench = Bench(seq.get("instruments", {}), float(seq.get("poll_s", 0.2)))
+        self.logger = None
+        self._use_log = seq.get("log", True) if use_log is None else use_log
+
+        if stations is None:
+            stations = seq.get("stations", [])
+            if stations == "auto":
+                stations = find_station_ports()
+        self.ports: List[str] = list(stations)
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def run(self) -> dict:
+        """Выполнить setup → steps (станции параллельно) → teardown. Возвращает результат."""
+        from mppt.stations import Station
+
+        seq = self.seq
+        t0 = time.monotonic()
+        result: Dict[str, Any] = {
+            "sequence": seq.get("name", "run"),
+            "started": datetime.now().isoformat(timespec="seconds"),
+            "stations": {},
+        }
+        stations: List[Station] = []
+        try:
+            if self._use_log and self.ports:
+                from mppt.logger import MPPTLogger
+
+                self.logger = MPPTLogger(status_callback=lambda msg, color: print(msg))
+            self.bench.open()
+
+            result["setup"] = self._run_steps(StepContext(self), seq.get("setup", []))
+            if _ok(result["setup"]):
+                for port in self.ports:
+                    st = Station(port, self.logger)
+                    if not st.start():
+                        result["stations"][port] = {"ok": False, "error": st.error, "steps": []}
+                        self._event(port, -1, "open", STEP_ERROR, st.error)
+                        continue
+                    stations.append(st)
+                threads = []
+                for st in stations:
+                    th = threading.Thread(
+                        target=self._run_station, args=(st, result), name=f"seq-{st.port}", daemon=True
+                    )
+                    th.start()
+                    threads.append(th)
+                for th in threads:
+                    th.join()
+                if not self.ports and seq.get("steps"):
+                    # без станций шаги выполняются один раз на стенде
+                    steps = self._run_steps(StepContext(self), seq.get("steps", []))
+                    result["stations"]["bench"] = {"ok": _ok(steps), "steps": steps}
+        except Exception as e:
+            result["error"] = str(e)
+        finally:
+            for st in stations:
+                st.stop()
+            # teardown — всегда (выключить питание), даже после остановки
+            self.stop_event.clear()
+            try:
+                result["teardown"] = self._run_steps(StepContext(self), seq.get("teardown", []), keep_going=True)
+            except Exception as e:
+                result["teardown_error"] = str(e)
+            # снимок опроса — пока задания psu/load ещё не сняты bench.close()
+            result["poll"] = get_scheduler().stats()
+            self.bench.close()
+            if self.logger is not None:
+                self.logger.close()
+
+        result["elapsed_s"] = round(time.monotonic() - t0, 3)
+        result["ok"] = (
+            "error" not in result
+            and _ok(result.get("setup", []))
+            and all(s["ok"] for s in result["stations"].values())
+        )
+        return result
+
+    def _run_station(self, st, result: dict) -> None:
+        steps = self._run_steps(StepContext(self, st), self.seq.get("steps", []))
+        result["stations"][st.port] = {"ok": _ok(steps), "device_id": st.pipeline.device_short_id, "steps": steps}
+
+    def _run_steps(self, ctx: StepContext, steps: list, keep_going: bool = False) -> List[dict]:
+        """
+        Шаги по очереди. Подряд идущие шаги стенда (load → settle → measure,
+        между ними могут быть wait) выполняются под одним захватом Bench.lock:
+        другая станция не сменит уставку между «load» и «measure» этой.
+        """
+        out = []
+        failed = False
+        holding = False
+        try:
+            for n, step in enumerate(steps):
+                kind, args = _split_step(step)
+                entry: Dict[str, Any] = {"index": n, "type": kind}
+                stopped = self.stop_event.is_set() and not keep_going
+                if holding and (failed or stopped or kind not in BENCH_HOLD_STEPS):
+                    # серия шагов стенда кончилась — приборы свободны для других станций
+                    self.bench.lock.release()
+                    holding = False
+                if failed or stopped:
+                    entry["status"] = STEP_SKIP
+                    out.append(entry)
+                    self._event(ctx.port, n, kind, STEP_SKIP, "")
+                    continue
+
+                self._event(ctx.port, n, kind, STEP_RUN, "")
+                t0 = time.monotonic()
+                try:
+                    if kind in BENCH_STEPS and not holding:
+                        self.bench.lock.acquire()
+                        holding = True
+                        if self.stop_event.is_set() and not keep_going:
+                            raise StepFailed("прогон остановлен")
+                    entry["data"] = STEPS[kind](ctx, args)
+                    entry["status"] = STEP_OK
+                except StepFailed as e:
+                    entry["status"] = STEP_FAIL
+                    entry["error"] = str(e.args[0])
+                    if len(e.args) > 1:
+                        entry["data"] = e.args[1]
+                except Exception as e:
+                    entry["status"] = STEP_ERROR
+                    entry["error"] = f"{type(e).__name__}: {e}"
+                entry["elapsed_s"] = round(time.monotonic() - t0, 3)
+                out.append(entry)
+                self._event(ctx.port, n, kind, entry["status"], entry.get("error", _brief(entry.get("data"))))
+
+                if entry["status"] != STEP_OK and not args.get("continue_on_fail") and not keep_going:
+                    failed = True
+        finally:
+            if holding:
+                self.bench.lock.release()
+        return out
+
+    def _event(self, station: Optional[str], index: int, kind: str, status: str, detail: str) -> None:
+        if self.on_event is not None:
+            try:
+                self.on_event(station, index, kind, status, detail)
+            except Exception as e:
+                print(f"SequenceRunner: ошибка обработчика событий: {e}")
+
+
+def _ok(steps: List[dict]) -> bool:
+    return all(s["status"] == STEP_OK for s in steps)
+
+
+def _brief(data: Optional[dict]) -> str:
+    """Короткая строка данных шага для консоли/просмотрщика."""
+    if not data:
+        return ""
+    parts = []
+    for k, v in data.items():
+        if isinstance(v, float):
+            parts.append(f"{k}={v:.4g}")
+        elif isinstance(v, (str, int, bool)) or v is None:
+            parts.append(f"{k}={v}")
+    return " ".join(parts)
+
+
+def save_result(result: dict, path: str) -> str:
+    """Записать результат (атомарно: .tmp → replace)."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,111 @@
+# runner/viewer.py
+"""
+Необязательный просмотрщик headless-прогона: таблица «станция → текущий шаг,
+статус, подробности». Прогон идёт в своём потоке (SequenceRunner.run),
+события переносятся в Tk через UiQueue — окно только смотрит, на ход
+прогона не влияет; закрытие окна останавливает шаги (teardown выполнится).
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Dict, Optional
+
+from tkinter import Tk, Frame, Label, StringVar, BOTH, X, TOP
+from tkinter import ttk
+
+from gui.ui_queue import UiQueue
+from runner.sequence import SequenceRunner, STEP_OK, STEP_FAIL, STEP_ERROR, STEP_SKIP, STEP_RUN
+
+STATUS_COLORS = {
+    STEP_RUN: "#8ab4f8",
+    STEP_OK: "#81c995",
+    STEP_FAIL: "#f28b82",
+    STEP_ERROR: "#f28b82",
+    STEP_SKIP: "#80868b",
+}
+
+
+class SequenceViewer(Frame):
+    def __init__(self, master, runner: SequenceRunner, bg="#202124", fg="#e8eaed", **kwargs):
+        super().__init__(master, bg=bg, **kwargs)
+        self.runner = runner
+        self.ui = UiQueue(self)
+        self.bg = bg
+        self.fg = fg
+        self._rows: Dict[str, str] = {}
+        self._total = len(runner.seq.get("steps", []))
+
+        self.title_var = StringVar(value=f"{runner.seq.get('name', 'run')}: выполняется")
+        Label(self, textvariable=self.title_var, bg=bg, fg=fg, anchor="w").pack(side=TOP, fill=X, padx=6, pady=4)
+
+        style = ttk.Style(self)
+        style.configure("Seq.Treeview", background="#303134", fieldbackground="#303134", foreground=fg)
+        self.tree = ttk.Treeview(
+            self, columns=("step", "status", "detail"), show="tree headings", style="Seq.Treeview", height=12
+        )
+        self.tree.heading("#0", text="Станция")
+        self.tree.heading("step", text="Шаг")
+        self.tree.heading("status", text="Статус")
+        self.tree.heading("detail", text="Подробности")
+        self.tree.column("#0", width=110)
+        self.tree.column("step", width=140)
+        self.tree.column("status", width=70)
+        self.tree.column("detail", width=420)
+        for status, color in STATUS_COLORS.items():
+            self.tree.tag_configure(status, foreground=color)
+        self.tree.pack(side=TOP, fill=BOTH, expand=True, padx=6, pady=(0, 6))
+
+        for name in ["стенд"] + list(runner.ports):
+            self._rows[name] = self.tree.insert("", "end", text=name, values=("", "", ""))
+
+    def on_event(self, station: Optional[str], index: int, kind: str, status: str, detail: str) -> None:
+        """Из потоков прогона: перенести событие в Tk-поток."""
+        self.ui.post(self._apply_event, station or "стенд", index, kind, status, detail)
+
+    def _apply_event(self, name: str, index: int, kind: str, status: str, detail: str) -> None:
+        row = self._rows.get(name)
+        if row is None:
+            row = self._rows[name] = self.tree.insert("", "end", text=name, values=("", "", ""))
+        step = f"{index + 1}/{self._total} {kind}" if name != "стенд" and index >= 0 else kind
+        self.tree.item(row, values=(step, status, detail), tags=(status,))
+
+    def finished(self, result: dict) -> None:
+        state = "OK" if result.get("ok") else "FAIL"
+        self.title_var.set(f"{result.get('sequence', 'run')}: {state} за {result.get('elapsed_s', 0):.1f} с")
+
+
+def run_with_viewer(runner: SequenceRunner) -> dict:
+    """Прогон в фоне + окно просмотра; возвращает результат, когда прогон закончен и окно закрыто."""
+    root = Tk()
+    root.title("v7 Terminal — прогон последовательности")
+    root.configure(bg="#202124")
+    viewer = SequenceViewer(root, runner)
+    viewer.pack(fill=BOTH, expand=True)
+
+    prev = runner.on_event
+
+    def on_event(*event):
+        if prev is not None:
+            prev(*event)
+        viewer.on_event(*event)
+
+    runner.on_event = on_event
+    box = {}
+
+    def work():
+        box["result"] = runner.run()
+        viewer.ui.post(viewer.finished, box["result"])
+
+    th = threading.Thread(target=work, name="sequence", daemon=True)
+    th.start()
+
+    def on_close():
+        # окно закрыто посреди прогона — остановить шаги, дождаться teardown
+        runner.stop()
+        root.destroy()
+
+    root.protocol("WM_DELETE_WINDOW", on_close)
+    root.mainloop()
+    th.join()
+    return box["result"]
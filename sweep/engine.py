@@ -0,0 +1,447 @@
+# sweep/engine.py
+"""
+Автоматический прогон КПД MPPT: сетка «напряжение ЛБП × ток нагрузки».
+
+Для каждой точки:
+    1. уставки ЛБП (U) и нагрузки (I) отправляются параллельно — два прибора
+       на разных портах не ждут друг друга;
+    2. установление определяется по потоку измерений телеметрии
+       (util.telemetry), а не фиксированной паузой: точка считается
+       установившейся, когда за последние settle_window_s все каналы
+       (U/I ЛБП, V/I нагрузки) «гуляют» не больше допуска;
+    3. захват — средние за окно установления (+ capture_s) по ЛБП, нагрузке
+       и числовым полям кадров MPPT; все три источника пишутся в телеметрию
+       параллельно своими заданиями планировщика опроса;
+    4. КПД = P_нагрузки / P_ЛБП.
+
+На время прогона опрос приборов ускоряется до fast_poll_s (задания панелей
+"psu"/"load" — через set_interval; если панелей нет, как в headless-режиме,
+движок заводит свои задания). Ток перебирается «змейкой» (туда-обратно
+по строкам напряжения) — меньше скачков, быстрее установление.
+
+    engine = SweepEngine(psu, load, SweepConfig(voltages=[12, 18, 24],
+                                                currents=parse_grid("0.5:3:0.5")))
+    result = engine.run()          # блокирует — вызывать из фонового потока
+    result.save()                  # <sweeps>/YYYYmmdd_HHMMSS/
+"""
+
+from __future__ import annotations
+
+import csv
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, asdict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from util.fileutil import get_sweep_dir
+from util.poll_scheduler import PollScheduler, get_scheduler
+from util.telemetry import (
+    TelemetryHub,
+    get_telemetry,
+    mppt_fields,
+    PSU_SOURCE,
+    LOAD_SOURCE,
+    MPPT_SOURCE,
+)
+
+
+def parse_grid(text: str) -> List[float]:
+    """
+    "12, 15, 18:24:2" → [12, 15, 18, 20, 22, 24]. Диапазон start:stop:step
+    включает stop (с допуском на округление).
+    """
+    values: List[float] = []
+    for part in text.replace(";", ",").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if ":" in part:
+            items = [float(x) for x in part.split(":")]
+            if len(items) != 3 or items[2] <= 0:
+                raise ValueError(f"диапазон должен быть start:stop:step (step > 0): {part}")
+            start, stop, step = items
+            n = int(np.floor((stop - start) / step + 1e-9)) + 1
+            values.extend(round(start + k * step, 6) for k in range(max(0, n)))
+        else:
+            values.append(float(part))
+    if not values:
+        raise ValueError("пустой список значений")
+    return values
+
+
+@dataclass
+class SweepConfig:
+    voltages: List[float]
+    currents: List[float]
+    # ограничение тока ЛБП на время прогона (None — не трогать)
+    psu_current_limit: Optional[float] = None
+    # установление: окно и допуски размаха (max - min) в окне
+    settle_window_s: float = 1.0
+    settle_rel_tol: float = 0.005
+    settle_abs_v: float = 0.01
+    settle_abs_i: float = 0.005
+    settle_min_samples: int = 4
+    settle_timeout_s: float = 15.0
+    # сколько ещё снимать после установления (0 — только окно установления)
+    capture_s: float = 0.5
+    # период опроса приборов на время прогона
+    fast_poll_s: float = 0.1
+    serpentine: bool = True
+    # по окончании: нагрузка 0 A / вход выкл., выход ЛБП выкл.
+    outputs_off_at_end: bool = True
+
+
+@dataclass
+class SweepPoint:
+    u_set: float
+    i_set: float
+    u_in: float = float("nan")
+    i_in: float = float("nan")
+    v_out: float = float("nan")
+    i_out: float = float("nan")
+    settled: bool = False
+    settle_s: float = float("nan")
+    samples: int = 0
+    mppt: Dict[str, float] = field(default_factory=dict)
+
+    @property
+    def p_in(self) -> float:
+        return self.u_in * self.i_in
+
+    @property
+    def p_out(self) -> float:
+        return self.v_out * self.i_out
+
+    @property
+    def eff(self) -> float:
+        p_in = self.p_in
+        return 100.0 * self.p_out / p_in if p_in > 0 else float("nan")
+
+
+POINT_COLUMNS = [
+    "u_set", "i_set", "u_in", "i_in", "p_in", "v_out", "i_out", "p_out",
+    "eff", "settled", "settle_s", "samples",
+]
+
+
+@dataclass
+class SweepResult:
+    config: SweepConfig
+    points: List[SweepPoint]
+    started: str
+    elapsed_s: float = 0.0
+    aborted: bool = False
+    # прогон прерван ошибкой прибора (текст); снятые до неё точки сохраняются
+    error: Optional[str] = None
+
+    def matrix(self, attr: str = "eff") -> np.ndarray:
+        """Матрица len(voltages) × len(currents) (NaN — точка не снята)."""
+        cfg = self.config
+        m = np.full((len(cfg.voltages), len(cfg.currents)), np.nan)
+        vi = {v: k for k, v in enumerate(cfg.voltages)}
+        ii = {c: k for k, c in enumerate(cfg.currents)}
+        for p in self.points:
+            m[vi[p.u_set], ii[p.i_set]] = getattr(p, attr)
+        return m
+
+    def save(self, path: Optional[str] = None) -> str:
+        """
+        Каталог результата:
+            points.csv      — таблица точек (+ средние полей MPPT)
+            efficiency.csv  — матрица КПД: строки U, столбцы I
+            efficiency.npz  — u_set, i_set, eff, p_in, p_out (данные тепловой карты)
+            sweep.json      — параметры прогона и сводка
+        """
+        path = path or get_sweep_dir()
+        os.makedirs(path, exist_ok=True)
+        cfg = self.config
+        mppt_names = list(mppt_fields())
+
+        with open(os.path.join(path, "points.csv"), "w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(POINT_COLUMNS + [f"mppt_{n}" for n in mppt_names])
+            for p in self.points:
+                row = [getattr(p, c) for c in POINT_COLUMNS]
+                row += [p.mppt.get(n, float("nan")) for n in mppt_names]
+                w.writerow(_fmt(x) for x in row)
+
+        eff = self.matrix("eff")
+        with open(os.path.join(path, "efficiency.csv"), "w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["U\\I"] + [_fmt(c) for c in cfg.currents])
+            for v, row in zip(cfg.voltages, eff):
+                w.writerow([_fmt(v)] + [_fmt(x) for x in row])
+
+        np.savez(
+            os.path.join(path, "efficiency.npz"),
+            u_set=np.asarray(cfg.voltages, dtype=np.float64),
+            i_set=np.asarray(cfg.currents, dtype=np.float64),
+            eff=eff,
+            p_in=self.matrix("p_in"),
+            p_out=self.matrix("p_out"),
+        )
+
+        with open(os.path.join(path, "sweep.json"), "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "started": self.started,
+                    "elapsed_s": round(self.elapsed_s, 3),
+                    "aborted": self.aborted,
+                    "error": self.error,
+                    "points": len(self.points),
+                    "unsettled": sum(1 for p in self.points if not p.settled),
+                    "config": asdict(cfg),
+                },
+                f,
+                ensure_ascii=False,
+                indent=2,
+            )
+        return path
+
+
+def _fmt(x) -> str:
+    if isinstance(x, bool):
+        return "1" if x else "0"
+    if isinstance(x, float):
+        return "" if np.isnan(x) else f"{x:.6g}"
+    return str(x)
+
+
+def is_settled(
+    hub: TelemetryHub,
+    t_from: float,
+    rel_tol: float,
+    abs_v: float,
+    abs_i: float,
+    min_samples: int,
+    sources=(PSU_SOURCE, LOAD_SOURCE),
+) -> bool:
+    """
+    Установление по телеметрии: у каждого источника (напряжение, ток) с t_from
+    не меньше min_samples отсчётов и размах (max - min) каждого канала не больше
+    max(абсолютный допуск, rel_tol × |среднее|).
+    """
+    for source in sources:
+        t, v = hub.since(source, t_from)
+        if len(t) < min_samples:
+            return False
+        for k, abs_tol in ((0, abs_v), (1, abs_i)):
+            col = v[:, k]
+            if np.isnan(col).any():
+                return False
+            span = float(col.max() - col.min())
+            if span > max(abs_tol, rel_tol * abs(float(col.mean()))):
+                return False
+    return True
+
+
+class SweepAborted(Exception):
+    """Прогон остановлен кнопкой Stop / stop()."""
+
+
+class SweepEngine:
+    """
+    psu   — OwonPSU (открытый)
+    load  — RigolDL3000 / AtorchDL24 (открытый)
+    on_point(point, index, total) — после каждой точки (из потока прогона)
+    on_status(text)               — ход прогона (из потока прогона)
+    psu_job / load_job            — имена заданий опроса панелей (ускоряются
+                                    на время прогона); если таких нет —
+                                    движок опрашивает приборы сам
+    """
+
+    def __init__(
+        self,
+        psu,
+        load,
+        config: SweepConfig,
+        hub: Optional[TelemetryHub] = None,
+        scheduler: Optional[PollScheduler] = None,
+        on_point: Optional[Callable[[SweepPoint, int, int], None]] = None,
+        on_status: Optional[Callable[[str], None]] = None,
+        psu_job: str = "psu",
+        load_job: str = "load",
+    ):
+        self.psu = psu
+        self.load = load
+        self.config = config
+        self.hub = hub or get_telemetry()
+        self.scheduler = scheduler or get_scheduler()
+        self.on_point = on_point
+        self.on_status = on_status
+        self.psu_job = psu_job
+        self.load_job = load_job
+
+        self._stop = threading.Event()
+        # восстановление опроса после прогона: (имя задания, прежний интервал или None — снять)
+        self._restore: List[Tuple[str, Optional[float]]] = []
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    # ----------------------------------------------------------
+    # Прогон
+    # ----------------------------------------------------------
+    def plan(self) -> List[Tuple[float, float]]:
+        """Порядок точек: по напряжениям, ток — «змейкой»."""
+        cfg = self.config
+        order = []
+        for k, v in enumerate(cfg.voltages):
+            currents = cfg.currents
+            if cfg.serpentine and k % 2:
+                currents = list(reversed(currents))
+            order.extend((v, c) for c in currents)
+        return order
+
+    def run(self) -> SweepResult:
+        cfg = self.config
+        plan = self.plan()
+        result = SweepResult(cfg, [], time.strftime("%Y-%m-%d %H:%M:%S"))
+        t0 = time.monotonic()
+
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sweep")
+        self._fast_polling()
+        try:
+            self._status("Включение приборов")
+            if cfg.psu_current_limit is not None:
+                self.psu.set_current(cfg.psu_current_limit)
+            self._apply(pool, plan[0][0], 0.0)
+            self.psu.set_output(True)
+            self.load.set_output(True)
+
+            last_v = None
+            for n, (v, c) in enumerate(plan):
+                if self._stop.is_set():
+                    raise SweepAborted()
+                self._status(f"Точка {n + 1}/{len(plan)}: {v:g} В × {c:g} А")
+                self._apply(pool, v if v != last_v else None, c)
+                last_v = v
+                point = self._measure_point(v, c)
+                result.points.append(point)
+                if self.on_point is not None:
+                    self.on_point(point, n, len(plan))
+        except SweepAborted:
+            result.aborted = True
+            self._status("Прогон остановлен")
+        except Exception as e:
+            # таймаут VISA, сбой dl24.py и т.п.: снятые точки не теряем
+            result.aborted = True
+            result.error = f"{type(e).__name__}: {e}"
+            self._status(f"Прогон прерван ошибкой: {result.error}")
+        finally:
+            result.elapsed_s = time.monotonic() - t0
+            try:
+                if cfg.outputs_off_at_end:
+                    self.load.set_current(0.0)
+                    self.load.set_output(False)
+                    self.psu.set_output(False)
+            except Exception as e:
+                self._status(f"Не удалось выключить приборы: {e}")
+            self._restore_polling()
+            pool.shutdown(wait=False)
+        return result
+
+    def _apply(self, pool: ThreadPoolExecutor, voltage: Optional[float], current: float) -> None:
+        """Уставки ЛБП и нагрузки — параллельно."""
+        futures = [pool.submit(self.load.set_current, current)]
+        if voltage is not None:
+            futures.append(pool.submit(self.psu.set_voltage, voltage))
+        for f in futures:
+            f.result()
+
+    def _measure_point(self, v: float, c: float) -> SweepPoint:
+        cfg = self.config
+        point = SweepPoint(v, c)
+        t_set = time.monotonic()
+
+        # ждём установления по потоку измерений
+        deadline = t_set + cfg.settle_timeout_s
+        while True:
+            if self._stop.is_set():
+                raise SweepAborted()
+            now = time.monotonic()
+            if now - t_set >= cfg.settle_window_s and self._is_settled(t_set, now):
+                point.settled = True
+                break
+            if now >= deadline:
+                break
+            time.sleep(cfg.fast_poll_s)
+        t_settled = time.monotonic()
+        point.settle_s = t_settled - t_set
+
+        if cfg.capture_s > 0:
+            self._stop.wait(cfg.capture_s)
+        t_from = max(t_set, t_settled - cfg.settle_window_s)
+
+        psu_t, psu_v = self.hub.since(PSU_SOURCE, t_from)
+        load_t, load_v = self.hub.since(LOAD_SOURCE, t_from)
+        if len(psu_t):
+            point.u_in, point.i_in = (float(x) for x in np.nanmean(psu_v, axis=0))
+        if len(load_t):
+            point.v_out, point.i_out = (float(x) for x in np.nanmean(load_v, axis=0))
+        point.samples = min(len(psu_t), len(load_t))
+
+        mppt_t, mppt_v = self.hub.since(MPPT_SOURCE, t_from)
+        if len(mppt_t):
+            with np.errstate(all="ignore"):
+                means = np.nanmean(mppt_v, axis=0)
+            point.mppt = {name: float(x) for name, x in zip(mppt_fields(), means)}
+        return point
+
+    def _is_settled(self, t_set: float, now: float) -> bool:
+        """Все каналы ЛБП и нагрузки за последнее окно в пределах допуска."""
+        cfg = self.config
+        return is_settled(
+            self.hub,
+            max(t_set, now - cfg.settle_window_s),
+            cfg.settle_rel_tol,
+            cfg.settle_abs_v,
+            cfg.settle_abs_i,
+            cfg.settle_min_samples,
+        )
+
+    # ----------------------------------------------------------
+    # Опрос на время прогона
+    # ----------------------------------------------------------
+    def _fast_polling(self) -> None:
+        cfg = self.config
+        stats = self.scheduler.stats()
+        hub = self.hub
+        psu, load = self.psu, self.load
+
+        def poll_psu():
+            meas = psu.measure()
+            hub.record(PSU_SOURCE, meas)
+            return meas
+
+        def poll_load():
+            meas = load.measure()
+            hub.record(LOAD_SOURCE, meas)
+            return meas
+
+        for job, poll in ((self.psu_job, poll_psu), (self.load_job, poll_load)):
+            if job in stats:
+                # задание панели: оно само пишет в телеметрию, только ускоряем
+                self._restore.append((job, stats[job]["interval_s"]))
+                self.scheduler.set_interval(job, cfg.fast_poll_s)
+            else:
+                name = f"sweep.{job}"
+                self._restore.append((name, None))
+                self.scheduler.add(name, poll, cfg.fast_poll_s)
+
+    def _restore_polling(self) -> None:
+        for name, interval in self._restore:
+            if interval is None:
+                self.scheduler.remove(name)
+            else:
+                self.scheduler.set_interval(name, interval)
+        self._restore = []
+
+    def _status(self, text: str) -> None:
+        if self.on_status is not None:
+            self.on_status(text)
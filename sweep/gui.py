@@ -0,0 +1,228 @@
+# sweep/gui.py
+"""
+Окно прогона КПД: параметры сетки, Start/Stop, тепловая карта КПД,
+заполняемая по мере снятия точек.
+
+Приборы берутся из уже подключённых панелей (ЛБП и Rigol/Atorch), прогон
+идёт в своём потоке (sweep.engine.SweepEngine), точки и статус переносятся
+в Tk-поток через UiQueue.post. Результат сохраняется в <sweeps>/<время>/.
+"""
+
+from __future__ import annotations
+
+import threading
+from typing import Optional
+
+import numpy as np
+from tkinter import Toplevel, Frame, Label, Entry, Button, Canvas, StringVar, BooleanVar, Checkbutton
+from tkinter import LEFT, RIGHT, TOP, BOTH, X
+
+from gui.ui_queue import UiQueue
+from sweep.engine import SweepConfig, SweepEngine, SweepPoint, SweepResult, parse_grid
+
+# Шкала тепловой карты: от худшего КПД к лучшему
+HEAT_COLORS = [(0xd9, 0x30, 0x25), (0xf9, 0xab, 0x00), (0x1e, 0x8e, 0x3e)]
+
+
+def heat_color(x: float) -> str:
+    """x ∈ [0, 1] → цвет шкалы (NaN — серый)."""
+    if not np.isfinite(x):
+        return "#3c4043"
+    x = min(1.0, max(0.0, x)) * (len(HEAT_COLORS) - 1)
+    k = min(int(x), len(HEAT_COLORS) - 2)
+    f = x - k
+    a, b = HEAT_COLORS[k], HEAT_COLORS[k + 1]
+    return "#%02x%02x%02x" % tuple(int(a[j] + (b[j] - a[j]) * f) for j in range(3))
+
+
+class SweepWindow(Toplevel):
+    """
+    psu_panel  — PSUControlPanel (нужен подключённый .psu)
+    load_panel — RigolControlPanel (нужен подключённый .device)
+    """
+
+    def __init__(self, master, psu_panel, load_panel, ui: UiQueue, bg="#202124", fg="#e8eaed"):
+        super().__init__(master, bg=bg)
+        self.title("Прогон КПД: U ЛБП × I нагрузки")
+        self.geometry("720x520")
+        self.psu_panel = psu_panel
+        self.load_panel = load_panel
+        self.ui = ui
+        self.bg = bg
+        self.fg = fg
+
+        self.engine: Optional[SweepEngine] = None
+        self._thread: Optional[threading.Thread] = None
+        self._cfg: Optional[SweepConfig] = None
+        self._eff: Optional[np.ndarray] = None
+
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
+
+        # -------- параметры --------
+        params = Frame(self, bg=bg)
+        params.pack(side=TOP, fill=X, padx=8, pady=4)
+        self.v_var = StringVar(value="12:24:4")
+        self.i_var = StringVar(value="0.5:3:0.5")
+        self.ilim_var = StringVar(value="")
+        self.tol_var = StringVar(value="0.5")
+        self.timeout_var = StringVar(value="15")
+        self.serpentine_var = BooleanVar(value=True)
+        for text, var, width in (
+            ("U ЛБП, В:", self.v_var, 14),
+            ("I нагр., А:", self.i_var, 14),
+            ("I огр. ЛБП:", self.ilim_var, 5),
+            ("допуск, %:", self.tol_var, 4),
+            ("таймаут, с:", self.timeout_var, 4),
+        ):
+            Label(params, text=text, bg=bg, fg=fg).pack(side=LEFT)
+            Entry(params, textvariable=var, width=width, bg="#303134", fg=fg, insertbackground=fg).pack(
+                side=LEFT, padx=(0, 6)
+            )
+        Checkbutton(
+            params, text="змейка", variable=self.serpentine_var,
+            bg=bg, fg=fg, selectcolor="#303134", activebackground=bg, activeforeground=fg,
+        ).pack(side=LEFT)
+
+        # -------- кнопки и статус --------
+        bar = Frame(self, bg=bg)
+        bar.pack(side=TOP, fill=X, padx=8)
+        self.btn_start = Button(bar, text="Start", command=self._start, bg="#1a73e8", fg=fg,
+                                activebackground="#3c4043", activeforeground=fg)
+        self.btn_start.pack(side=LEFT, pady=4)
+        self.btn_stop = Button(bar, text="Stop", command=self._stop, bg="#303134", fg=fg,
+                               activebackground="#3c4043", activeforeground=fg, state="disabled")
+        self.btn_stop.pack(side=LEFT, padx=4, pady=4)
+        self.status_var = StringVar(value="Строки: U, столбцы: I. Диапазон — start:stop:step")
+        Label(bar, textvariable=self.status_var, bg=bg, fg="#80868b", anchor="w").pack(
+            side=LEFT, fill=X, expand=True, padx=6
+        )
+
+        # -------- тепловая карта --------
+        self.canvas = Canvas(self, bg=bg, highlightthickness=0)
+        self.canvas.pack(side=TOP, fill=BOTH, expand=True, padx=8, pady=8)
+        self.canvas.bind("<Configure>", lambda _e: self._draw_heatmap())
+
+    # ----------------------------------------------------------
+    # Запуск / остановка
+    # ----------------------------------------------------------
+    def _start(self):
+        if self._thread is not None:
+            return
+        psu = self.psu_panel.psu if self.psu_panel.connected else None
+        load = self.load_panel.device
+        if psu is None or load is None:
+            self.status_var.set("Подключите ЛБП и нагрузку в их панелях")
+            return
+        try:
+            ilim = self.ilim_var.get().strip()
+            cfg = SweepConfig(
+                voltages=parse_grid(self.v_var.get()),
+                currents=parse_grid(self.i_var.get()),
+                psu_current_limit=float(ilim) if ilim else None,
+                settle_rel_tol=float(self.tol_var.get()) / 100.0,
+                settle_timeout_s=float(self.timeout_var.get()),
+                serpentine=self.serpentine_var.get(),
+            )
+        except ValueError as e:
+            self.status_var.set(f"Ошибка параметров: {e}")
+            return
+
+        self._cfg = cfg
+        self._eff = np.full((len(cfg.voltages), len(cfg.currents)), np.nan)
+        self._draw_heatmap()
+
+        self.engine = SweepEngine(
+            psu,
+            load,
+            cfg,
+            on_point=lambda p, n, total: self.ui.post(self._on_point, p, n, total),
+            on_status=lambda text: self.ui.post(self.status_var.set, text),
+            psu_job=self.psu_panel.POLL_JOB,
+            load_job=self.load_panel.POLL_JOB,
+        )
+        self._thread = threading.Thread(target=self._run, args=(self.engine,), name="sweep", daemon=True)
+        self._thread.start()
+        self.btn_start.config(state="disabled")
+        self.btn_stop.config(state="normal")
+
+    def _run(self, engine: SweepEngine):
+        """Поток прогона: снять сетку и сохранить результат."""
+        try:
+            result = engine.run()
+            path = result.save()
+        except Exception as e:
+            self.ui.post(self._on_failed, e)
+            return
+        self.ui.post(self._on_done, result, path)
+
+    def _stop(self):
+        if self.engine is not None:
+            self.engine.stop()
+            self.status_var.set("Остановка…")
+
+    def _on_close(self):
+        self._stop()
+        self.withdraw()
+
+    # ----------------------------------------------------------
+    # Tk-поток: результаты
+    # ----------------------------------------------------------
+    def _on_point(self, point: SweepPoint, n: int, total: int):
+        cfg = self._cfg
+        if cfg is None or self._eff is None:
+            return
+        self._eff[cfg.voltages.index(point.u_set), cfg.currents.index(point.i_set)] = point.eff
+        self._draw_heatmap()
+        mark = "" if point.settled else " (не установилось)"
+        self.status_var.set(
+            f"{n + 1}/{total}: {point.u_set:g} В × {point.i_set:g} А → "
+            f"КПД {point.eff:.1f}% за {point.settle_s:.1f} с{mark}"
+        )
+
+    def _on_done(self, result: SweepResult, path: str):
+        self._finish()
+        if result.error:
+            state = f"прерван ошибкой ({result.error})"
+        else:
+            state = "остановлен" if result.aborted else "завершён"
+        self.status_var.set(f"Прогон {state} за {result.elapsed_s:.0f} с, {len(result.points)} точек: {path}")
+
+    def _on_failed(self, e: Exception):
+        self._finish()
+        self.status_var.set(f"Ошибка прогона: {e}")
+
+    def _finish(self):
+        self._thread = None
+        self.engine = None
+        self.btn_start.config(state="normal")
+        self.btn_stop.config(state="disabled")
+
+    def _draw_heatmap(self):
+        c = self.canvas
+        c.delete("all")
+        cfg, eff = self._cfg, self._eff
+        if cfg is None or eff is None:
+            return
+        w, h = c.winfo_width(), c.winfo_height()
+        left, top = 56, 20
+        n_v, n_i = eff.shape
+        cw = max(1.0, (w - left) / n_i)
+        ch = max(1.0, (h - top) / n_v)
+
+        finite = eff[np.isfinite(eff)]
+        lo, hi = (float(finite.min()), float(finite.max())) if len(finite) else (0.0, 100.0)
+        span = (hi - lo) or 1.0
+
+        for j, cur in enumerate(cfg.currents):
+            c.create_text(left + (j + 0.5) * cw, top / 2, text=f"{cur:g} A", fill=self.fg, font=("Consolas", 8))
+        for k, volt in enumerate(cfg.voltages):
+            y0 = top + k * ch
+            c.create_text(left - 6, y0 + ch / 2, text=f"{volt:g} V", fill=self.fg, anchor="e", font=("Consolas", 8))
+            for j in range(n_i):
+                x0 = left + j * cw
+                val = eff[k, j]
+                c.create_rectangle(x0, y0, x0 + cw - 1, y0 + ch - 1,
+                                   fill=heat_color((val - lo) / span), outline="")
+                if np.isfinite(val):
+                    c.create_text(x0 + cw / 2, y0 + ch / 2, text=f"{val:.1f}", fill="#ffffff",
+                                  font=("Consolas", 8))
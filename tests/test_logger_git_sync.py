@@ -0,0 +1,87 @@
+# tests/test_logger_git_sync.py
+"""
+Автосинхронизация MPPTLogger с общим репозиторием логов: две станции
+(два клона одного bare-репозитория) пишут PASSED в один и тот же день,
+первая успевает push раньше — вторая должна сделать rebase и догнать.
+
+    python -m pytest -q tests
+"""
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from mppt.logger import LOG_HEADER, MPPTLogger
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="нужен git")
+
+
+def git(cwd, *args):
+    return subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True, check=True).stdout
+
+
+def make_station(tmp_path, name, origin):
+    path = str(tmp_path / name)
+    git(str(tmp_path), "clone", "-q", origin, path)
+    git(path, "checkout", "-q", "-b", "main")
+    git(path, "config", "user.name", name)
+    git(path, "config", "user.email", f"{name}@bench")
+    return MPPTLogger(
+        base_dir=path,
+        status_callback=lambda msg, color="white": None,
+        git_origin_url=origin,
+        auto_sync_rows=0,
+        auto_sync_interval_s=0,
+    )
+
+
+def save_passed(logger, uid):
+    n = len(LOG_HEADER)
+    logger.save_parsed(["PASSED"], ["x"] * n, ["000000"] * n, True, uid[-4:], auto=True, uid=uid)
+
+
+@pytest.fixture
+def origin(tmp_path):
+    path = str(tmp_path / "logs.git")
+    git(str(tmp_path), "init", "-q", "--bare", path)
+    git(path, "symbolic-ref", "HEAD", "refs/heads/main")
+    return path
+
+
+def test_rejected_push_rebases_onto_other_station(tmp_path, origin):
+    a = make_station(tmp_path, "a", origin)
+    b = make_station(tmp_path, "b", origin)
+    try:
+        save_passed(a, "7-c-00000001-00000001")
+        save_passed(b, "7-c-00000002-00000002")
+        assert a._git_commit_job() and b._git_commit_job()
+
+        assert a._git_push_job()
+        # b отстал от origin: push отклонён → fetch + rebase → push
+        assert b._git_push_job()
+        assert b._push_timer is None
+
+        shard = os.path.relpath(b.journal.shard_paths()[0], b.logs_dir).replace(os.sep, "/")
+        remote = git(origin, "show", f"main:{shard}")
+        assert len(remote.splitlines()) == 2
+        assert "7-c-00000001-00000001" in remote and "7-c-00000002-00000002" in remote
+
+        # индекс UID второй станции знает плату первой
+        assert b.id_index.lookup("7-c-00000001-00000001") is not None
+    finally:
+        a.close()
+        b.close()
+
+
+def test_push_to_missing_origin_is_not_retried(tmp_path, origin):
+    a = make_station(tmp_path, "a", origin)
+    try:
+        git(a.logs_dir, "remote", "set-url", "origin", str(tmp_path / "missing.git"))
+        save_passed(a, "7-c-00000001-00000001")
+        assert a._git_commit_job()
+        assert not a._git_push_job()
+        assert a._push_timer is None
+    finally:
+        a.close()
@@ -2,6 +2,7 @@
 import re
 
 SGR_RE = re.compile(r'\x1b\[([0-9;]*)m')
+ANSI_RE = re.compile(r'\x1B\[[0-?]*[ -/]*[@-~]')
 
 COLOR_MAP = {
     '30': '000000', '31': 'FF5555', '32': '50FA7B', '33': 'F1FA8C',
@@ -16,7 +17,10 @@ COLOR_BRIGHT = {
 
 def strip_ansi(s: str) -> str:
     """Удалить все ANSI коды."""
-    return re.sub(r'\x1B\[[0-?]*[ -/]*[@-~]', '', s).replace("\x00", "")
+    if "\x1b" not in s and "\x00" not in s:
+        # строки экрана pyte уже без ESC — не гоняем регулярку
+        return s
+    return ANSI_RE.sub('', s).replace("\x00", "")
 
 
 def parse_ansi_segments(line: str):
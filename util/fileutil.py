@@ -12,8 +12,74 @@ DEFAULT_LOG_DIR = os.path.join(
     "logs",
 )
 
-TXT_LOG = "mppt_log.txt"
-XLSX_LOG = "mppt_log.xlsx"
+# Записи сырого потока MPPT (*.v7cap) — рядом с логами, но НЕ в git-каталоге логов
+DEFAULT_CAPTURE_DIR = os.path.join(
+    os.path.expanduser("~"),
+    "Documents",
+    "v7_terminal",
+    "captures",
+)
+
+# Телеметрия приборов (util.telemetry): каталог на сессию записи, чанки NPZ/CSV
+DEFAULT_TELEMETRY_DIR = os.path.join(
+    os.path.expanduser("~"),
+    "Documents",
+    "v7_terminal",
+    "telemetry",
+)
+
+# Результаты headless-прогонов последовательностей (runner.headless)
+DEFAULT_RUN_DIR = os.path.join(
+    os.path.expanduser("~"),
+    "Documents",
+    "v7_terminal",
+    "runs",
+)
+
+# Снимки проб производительности (util.perf.dump) — для отчётов об ошибках
+DEFAULT_PERF_DIR = os.path.join(
+    os.path.expanduser("~"),
+    "Documents",
+    "v7_terminal",
+    "perf",
+)
+
+# Результаты прогонов КПД (sweep.engine): каталог на прогон
+DEFAULT_SWEEP_DIR = os.path.join(
+    os.path.expanduser("~"),
+    "Documents",
+    "v7_terminal",
+    "sweeps",
+)
+
+TXT_LOG = "mppt_log.txt"          # старый единый txt-лог (только история)
+XLSX_LOG = "mppt_log.xlsx"        # локальное представление, в git не коммитится
+JOURNAL_LOG = "mppt_log.jsonl"    # старый единый журнал (переносится в JOURNAL_DIR)
+ID_INDEX_LOG = "mppt_uids.tsv"    # индекс повторов по полному UID (mppt_ids.tsv по CRC16 — устарел)
+
+# Шардированные по дням логи — то, что коммитится в git:
+#   journal/YYYY-MM-DD.jsonl, txt/YYYY-MM-DD.txt
+JOURNAL_DIR = "journal"
+TXT_DIR = "txt"
+
+# .gitignore каталога логов: xlsx и служебные файлы собираются локально
+LOGS_GITIGNORE = """\
+# v7_terminal: xlsx собирается локально из journal/
+mppt_log.xlsx
+*.tmp
+*.migrated
+*.corrupt
+*.import
+"""
+
+# .gitattributes каталога логов: журналы, txt и индекс UID только дописываются,
+# поэтому при rebase поверх коммитов другой станции строки обеих просто склеиваются
+LOGS_GITATTRIBUTES = """\
+# v7_terminal: append-only логи станций склеиваются при rebase
+journal/*.jsonl merge=union
+txt/*.txt merge=union
+mppt_uids.tsv merge=union
+"""
 
 
 def ensure_dir(path: str):
@@ -29,5 +95,71 @@ def get_log_paths(base_dir: str | None = None):
     )
 
 
+def get_journal_path(base_dir: str | None = None) -> str:
+    base = base_dir or DEFAULT_LOG_DIR
+    ensure_dir(base)
+    return os.path.join(base, JOURNAL_LOG)
+
+
+def get_journal_dir(base_dir: str | None = None) -> str:
+    path = os.path.join(base_dir or DEFAULT_LOG_DIR, JOURNAL_DIR)
+    ensure_dir(path)
+    return path
+
+
+def get_txt_dir(base_dir: str | None = None) -> str:
+    path = os.path.join(base_dir or DEFAULT_LOG_DIR, TXT_DIR)
+    ensure_dir(path)
+    return path
+
+
+def get_id_index_path(base_dir: str | None = None) -> str:
+    base = base_dir or DEFAULT_LOG_DIR
+    ensure_dir(base)
+    return os.path.join(base, ID_INDEX_LOG)
+
+
+def get_capture_path(prefix: str = "mppt", base_dir: str | None = None) -> str:
+    """Новый путь для записи сырого потока: <captures>/<prefix>_YYYYmmdd_HHMMSS.v7cap"""
+    base = base_dir or DEFAULT_CAPTURE_DIR
+    ensure_dir(base)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(base, f"{prefix}_{stamp}.v7cap")
+
+
+def get_telemetry_session_dir(base_dir: str | None = None) -> str:
+    """Новый каталог сессии телеметрии: <telemetry>/YYYYmmdd_HHMMSS/"""
+    base = base_dir or DEFAULT_TELEMETRY_DIR
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(base, stamp)
+    n = 1
+    while os.path.exists(path):
+        n += 1
+        path = os.path.join(base, f"{stamp}_{n}")
+    ensure_dir(path)
+    return path
+
+
+def get_sweep_dir(base_dir: str | None = None) -> str:
+    """Новый каталог результата прогона: <sweeps>/YYYYmmdd_HHMMSS/"""
+    return get_telemetry_session_dir(base_dir or DEFAULT_SWEEP_DIR)
+
+
+def get_run_result_path(name: str = "run", base_dir: str | None = None) -> str:
+    """Новый файл результата последовательности: <runs>/<name>_YYYYmmdd_HHMMSS.json"""
+    base = base_dir or DEFAULT_RUN_DIR
+    ensure_dir(base)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(base, f"{name}_{stamp}.json")
+
+
+def get_perf_dump_path(base_dir: str | None = None) -> str:
+    """Новый файл снимка проб: <perf>/perf_YYYYmmdd_HHMMSS.json"""
+    base = base_dir or DEFAULT_PERF_DIR
+    ensure_dir(base)
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return os.path.join(base, f"perf_{stamp}.json")
+
+
 def timestamp_str():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
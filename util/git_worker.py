@@ -0,0 +1,110 @@
+# util/git_worker.py
+"""
+Фоновый исполнитель git-операций для каталога логов.
+
+- все git-команды идут в ОДНОМ фоновом потоке по очереди (очередь заданий),
+  GUI-поток никогда не ждёт сеть;
+- у каждой команды есть таймаут (недоступный сервер не вешает поток навсегда);
+- одинаковые задания, ещё не начатые, склеиваются: десять нажатий Commit
+  подряд дают один commit, Push — один push;
+- статус отдаётся через status(msg, color) — вызывается из фонового потока,
+  получатель сам переносит его в Tk-поток.
+"""
+
+from __future__ import annotations
+
+import queue
+import subprocess
+import threading
+from typing import Callable, Optional, Set
+
+
+class GitWorker:
+    """
+    repo_dir  — каталог репозитория
+    status    — callback статуса (msg, color)
+    timeout_s — таймаут одной git-команды по умолчанию
+    """
+
+    def __init__(
+        self,
+        repo_dir: str,
+        status: Optional[Callable[[str, str], None]] = None,
+        timeout_s: float = 30.0,
+    ):
+        self.repo_dir = repo_dir
+        self.status = status
+        self.timeout_s = timeout_s
+
+        self._q: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self.current: Optional[str] = None  # имя выполняемого задания
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    # ----------------------------------------------------------
+    def submit(self, name: str, func: Callable[[], None]) -> bool:
+        """
+        Поставить задание в очередь. Если задание с тем же именем уже ждёт
+        своей очереди — новое склеивается с ним (возвращает False).
+        """
+        with self._lock:
+            if name in self._pending:
+                return False
+            self._pending.add(name)
+        self._q.put((name, func))
+        return True
+
+    def is_busy(self) -> bool:
+        with self._lock:
+            return self.current is not None or bool(self._pending)
+
+    def stop(self) -> None:
+        self._q.put(None)
+
+    # ----------------------------------------------------------
+    def run(self, *args: str, timeout: Optional[float] = None) -> subprocess.CompletedProcess:
+        """
+        Запуск git-команды в repo_dir с захватом вывода.
+        Таймаут/отсутствие git не бросают исключение: returncode = -1, причина в stderr.
+        """
+        try:
+            return subprocess.run(
+                args,
+                cwd=self.repo_dir,
+                capture_output=True,
+                text=True,
+                timeout=self.timeout_s if timeout is None else timeout,
+            )
+        except subprocess.TimeoutExpired:
+            return subprocess.CompletedProcess(
+                args, -1, "", f"таймаут {timeout or self.timeout_s:.0f} с"
+            )
+        except OSError as e:
+            return subprocess.CompletedProcess(args, -1, "", str(e))
+
+    # ----------------------------------------------------------
+    def _run(self) -> None:
+        while True:
+            item = self._q.get()
+            if item is None:
+                return
+            name, func = item
+            with self._lock:
+                self._pending.discard(name)
+                self.current = name
+            try:
+                func()
+            except Exception as e:
+                self._set_status(f"Git: ошибка ({name}): {e}", "red")
+            finally:
+                with self._lock:
+                    self.current = None
+
+    def _set_status(self, msg: str, color: str) -> None:
+        if self.status:
+            self.status(msg, color)
+        else:
+            print(msg)
@@ -0,0 +1,129 @@
+# util/import_timing.py
+"""
+Замер времени импорта модулей при холодном старте (прогонять на каждом релизе).
+
+Каждый модуль импортируется в отдельном свежем интерпретаторе с -X importtime,
+из вывода берётся собственное и накопленное время самого модуля и самые
+тяжёлые вложенные импорты. Так видно, что именно тянет старт окна.
+
+    python -m util.import_timing                      # модули по умолчанию
+    python -m util.import_timing gui.layout pyvisa --repeat 5 --top 10
+    python -m util.import_timing --json timings.json  # сохранить для сравнения релизов
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+# Путь старта окна + бэкенды, которые должны импортироваться лениво
+DEFAULT_MODULES = (
+    "gui.layout",
+    "mppt.gui",
+    "psu.gui",
+    "rigol.gui",
+    "pyte",
+    "serial.tools.list_ports",
+    "openpyxl",
+    "owon_psu",
+    "pyvisa",
+)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """Строки "import time: self | cumulative | name" → [(name, self_us, cum_us), ...]."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us = int(parts[0])
+            cum_us = int(parts[1])
+        except ValueError:
+            # строка-заголовок
+            continue
+        rows.append((parts[2].strip(), self_us, cum_us))
+    return rows
+
+
+def time_module(name: str) -> Optional[Dict]:
+    """Один холодный импорт модуля. None — модуль не импортируется."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {name}"],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        return None
+    rows = parse_importtime(proc.stderr)
+    total = next((cum for mod, _, cum in rows if mod == name), None)
+    if total is None:
+        return None
+    return {"cumulative_us": total, "rows": rows}
+
+
+def measure(modules, repeat: int) -> Dict[str, Optional[Dict]]:
+    """Лучшее из repeat холодных импортов каждого модуля."""
+    result: Dict[str, Optional[Dict]] = {}
+    for name in modules:
+        best = None
+        for _ in range(repeat):
+            r = time_module(name)
+            if r is None:
+                break
+            if best is None or r["cumulative_us"] < best["cumulative_us"]:
+                best = r
+        result[name] = best
+    return result
+
+
+def format_report(result: Dict[str, Optional[Dict]], top: int) -> str:
+    lines = []
+    for name, r in result.items():
+        if r is None:
+            lines.append(f"{name:<28} не импортируется")
+            continue
+        lines.append(f"{name:<28} {r['cumulative_us'] / 1000:8.1f} мс")
+        heavy = sorted(
+            (row for row in r["rows"] if row[0] != name),
+            key=lambda row: row[1],
+            reverse=True,
+        )[:top]
+        for mod, self_us, cum_us in heavy:
+            lines.append(f"    {mod.strip():<40} self {self_us / 1000:7.1f} мс | cum {cum_us / 1000:7.1f} мс")
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="время холодного импорта модулей v7 Terminal")
+    ap.add_argument("modules", nargs="*", default=list(DEFAULT_MODULES))
+    ap.add_argument("--repeat", type=int, default=3, help="замеров на модуль (берётся лучший)")
+    ap.add_argument("--top", type=int, default=5, help="самых тяжёлых вложенных импортов")
+    ap.add_argument("--json", help="сохранить итог {модуль: мс} в файл")
+    args = ap.parse_args(argv)
+
+    result = measure(args.modules, max(1, args.repeat))
+    print(format_report(result, args.top))
+
+    if args.json:
+        summary = {
+            name: (None if r is None else round(r["cumulative_us"] / 1000, 1))
+            for name, r in result.items()
+        }
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "modules_ms": summary}, f, ensure_ascii=False, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
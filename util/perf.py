@@ -0,0 +1,250 @@
+# util/perf.py
+"""
+Пробы производительности горячих путей: счётчики, гистограммы задержек,
+датчики очередей.
+
+    PROBE = perf.probe("mppt.render")          # один раз, на уровне модуля
+
+    t0 = PROBE.start()                          # 0.0, если пробы выключены
+    render()
+    PROBE.stop(t0)                              # при t0 == 0 — ничего
+
+- выключено (по умолчанию): start() — одна проверка флага, stop() — одна
+  проверка аргумента; ни часов, ни записи;
+- включено: время — time.perf_counter(), запись — инкремент корзины
+  логарифмической гистограммы (HIST_BOUNDS, 1 мкс … 100 с, 8 корзин
+  на декаду) и счётчиков. Без блокировок: при одновременной записи из
+  нескольких потоков изредка теряется инкремент — для диагностики не важно;
+- counter(name).add(n) — события без длительности (байты, потерянные кадры);
+- gauge(name, fn) — датчик: fn() вызывается только при снимке (глубина
+  очереди, пропущенные кадры рендера), горячий путь не трогает;
+- snapshot() — по пробам: частота с прошлого снимка, p50/p99/max, счётчики,
+  датчики; format_lines() — строки для оверлея; dump() — всё в JSON-файл
+  (для приложения к отчёту об ошибке).
+
+Включение: perf.enable(True) (кнопка «Perf» в верхней панели,
+runner.headless --perf) или переменная окружения V7_PERF=1.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from util.fileutil import get_perf_dump_path
+
+_clock = time.perf_counter
+_enabled = os.environ.get("V7_PERF", "") not in ("", "0")
+
+# Верхние границы корзин гистограммы, с: 1 мкс … 100 с, 8 на декаду
+HIST_BOUNDS: List[float] = [10 ** (k / 8.0) * 1e-6 for k in range(0, 8 * 8 + 1)]
+
+
+def enable(state: bool = True) -> None:
+    global _enabled
+    _enabled = bool(state)
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+class Probe:
+    """Длительности одного горячего пути."""
+
+    __slots__ = ("name", "count", "total_s", "max_s", "buckets", "_prev_count", "_prev_t")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.reset()
+
+    def reset(self) -> None:
+        self.count = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.buckets = [0] * (len(HIST_BOUNDS) + 1)
+        self._prev_count = 0
+        self._prev_t = _clock()
+
+    def start(self) -> float:
+        return _clock() if _enabled else 0.0
+
+    def stop(self, t0: float) -> None:
+        if t0:
+            self.record(_clock() - t0)
+
+    def record(self, dt: float) -> None:
+        self.count += 1
+        self.total_s += dt
+        if dt > self.max_s:
+            self.max_s = dt
+        self.buckets[bisect.bisect_left(HIST_BOUNDS, dt)] += 1
+
+    def percentile(self, q: float) -> float:
+        """Оценка перцентиля (0..100) по гистограмме — верхняя граница корзины, с."""
+        buckets = list(self.buckets)
+        n = sum(buckets)
+        if not n:
+            return 0.0
+        rank = n * q / 100.0
+        acc = 0
+        for k, c in enumerate(buckets):
+            acc += c
+            if acc >= rank and c:
+                return min(HIST_BOUNDS[k] if k < len(HIST_BOUNDS) else self.max_s, self.max_s)
+        return self.max_s
+
+    def snapshot(self, now: float) -> dict:
+        count = self.count
+        dt = now - self._prev_t
+        rate = (count - self._prev_count) / dt if dt > 0 else 0.0
+        self._prev_count, self._prev_t = count, now
+        return {
+            "count": count,
+            "rate_hz": rate,
+            "avg_ms": (self.total_s / count * 1000.0) if count else 0.0,
+            "p50_ms": self.percentile(50) * 1000.0,
+            "p99_ms": self.percentile(99) * 1000.0,
+            "max_ms": self.max_s * 1000.0,
+        }
+
+
+class Counter:
+    """Событие без длительности: байты, потерянные кадры и т.п."""
+
+    __slots__ = ("name", "value", "_prev_value", "_prev_t")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.reset()
+
+    def reset(self) -> None:
+        self.value = 0
+        self._prev_value = 0
+        self._prev_t = _clock()
+
+    def add(self, n: int = 1) -> None:
+        if _enabled:
+            self.value += n
+
+    def snapshot(self, now: float) -> dict:
+        value = self.value
+        dt = now - self._prev_t
+        rate = (value - self._prev_value) / dt if dt > 0 else 0.0
+        self._prev_value, self._prev_t = value, now
+        return {"value": value, "rate_hz": rate}
+
+
+_lock = threading.Lock()
+_probes: Dict[str, Probe] = {}
+_counters: Dict[str, Counter] = {}
+_gauges: Dict[str, Callable[[], Any]] = {}
+
+
+def probe(name: str) -> Probe:
+    """Проба по имени (создаётся при первом обращении; одна на имя)."""
+    with _lock:
+        p = _probes.get(name)
+        if p is None:
+            p = _probes[name] = Probe(name)
+        return p
+
+
+def counter(name: str) -> Counter:
+    with _lock:
+        c = _counters.get(name)
+        if c is None:
+            c = _counters[name] = Counter(name)
+        return c
+
+
+def gauge(name: str, fn: Callable[[], Any]) -> None:
+    """Датчик: fn() → число или словарь, вызывается только при снимке (из потока снимка)."""
+    with _lock:
+        _gauges[name] = fn
+
+
+def remove_gauge(name: str) -> None:
+    with _lock:
+        _gauges.pop(name, None)
+
+
+def reset() -> None:
+    with _lock:
+        items = list(_probes.values()) + list(_counters.values())
+    for item in items:
+        item.reset()
+
+
+def snapshot() -> dict:
+    """Снимок всех проб, счётчиков и датчиков (частоты — с прошлого снимка)."""
+    now = _clock()
+    with _lock:
+        probes = dict(_probes)
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+    values: Dict[str, Any] = {}
+    for name, fn in sorted(gauges.items()):
+        try:
+            values[name] = fn()
+        except Exception as e:
+            values[name] = f"ошибка: {e}"
+    return {
+        "enabled": _enabled,
+        "probes": {name: p.snapshot(now) for name, p in sorted(probes.items()) if p.count},
+        "counters": {name: c.snapshot(now) for name, c in sorted(counters.items()) if c.value},
+        "gauges": values,
+    }
+
+
+def format_lines(snap: Optional[dict] = None) -> List[str]:
+    """Строки для оверлея: проба — частота, p50/p99/max; счётчики; датчики."""
+    snap = snap or snapshot()
+    lines = []
+    for name, s in snap["probes"].items():
+        lines.append(
+            f"{name:<18} {s['rate_hz']:7.1f}/s  p50 {s['p50_ms']:7.3f}  p99 {s['p99_ms']:7.3f}  "
+            f"max {s['max_ms']:7.2f} мс  n={s['count']}"
+        )
+    for name, s in snap["counters"].items():
+        lines.append(f"{name:<18} {s['rate_hz']:9.1f}/s  всего {s['value']}")
+    for name, v in snap["gauges"].items():
+        if isinstance(v, dict):
+            v = "  ".join(f"{k}={x:.4g}" if isinstance(x, float) else f"{k}={x}" for k, x in v.items())
+        lines.append(f"{name:<18} {v}")
+    if not snap["enabled"]:
+        lines.insert(0, "(пробы выключены)")
+    return lines
+
+
+def dump(path: Optional[str] = None, extra: Optional[dict] = None) -> str:
+    """
+    Записать снимок + полные гистограммы в JSON (по умолчанию
+    <perf>/perf_YYYYmmdd_HHMMSS.json). Возвращает путь.
+    """
+    path = path or get_perf_dump_path()
+    snap = snapshot()
+    with _lock:
+        probes = dict(_probes)
+    data = {
+        "time": datetime.now().isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "hist_bounds_s": HIST_BOUNDS,
+        "histograms": {name: list(p.buckets) for name, p in sorted(probes.items()) if p.count},
+        **snap,
+    }
+    if extra:
+        data["extra"] = extra
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=1, default=str)
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,273 @@
+# util/poll_scheduler.py
+"""
+Единый планировщик опроса приборов (ЛБП, нагрузка, MPPT, …).
+
+Раньше у каждого прибора был свой цикл: Tk after в GUI-потоке (ЛБП),
+поток со sleep(0.5) (нагрузка), отдельный reader-поток (MPPT). Теперь
+прибор регистрирует задание:
+
+    sched = get_scheduler()
+    sched.add("psu", poll_psu, interval_s=0.2, on_result=show, on_error=warn)
+    ...
+    sched.remove("psu")
+
+- задания выполняются в небольшом пуле потоков; одно задание никогда
+  не выполняется параллельно само с собой;
+- время — по сетке дедлайнов (t0 + k·interval), а не «sleep после опроса»:
+  частота не плывёт от длительности опроса; если опрос не уложился
+  в интервал, пропущенные слоты не догоняются пачкой (считаются в overruns);
+- при исключении включается экспоненциальная задержка (interval·2^n, но не
+  больше backoff_max_s), после первого успешного опроса — обычный интервал;
+- stats() — по каждому заданию: достигнутая частота, задержка опроса
+  (средняя / p95 / max), ошибки, пропуски.
+
+on_result(result) и on_error(exc) вызываются в потоке пула — в Tk их
+переносит вызывающий (gui.ui_bus.UiBus / gui.ui_queue.UiQueue).
+"""
+
+from __future__ import annotations
+
+import heapq
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+
+class PollJob:
+    """Одно зарегистрированное задание опроса и его статистика."""
+
+    # окно для достигнутой частоты, с
+    RATE_WINDOW_S = 5.0
+    # сколько последних задержек держать для перцентилей
+    LATENCY_SAMPLES = 200
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        interval_s: float,
+        on_result: Optional[Callable[[Any], None]],
+        on_error: Optional[Callable[[Exception], None]],
+        backoff_max_s: float,
+    ):
+        self.name = name
+        self.func = func
+        self.interval_s = interval_s
+        self.on_result = on_result
+        self.on_error = on_error
+        self.backoff_max_s = backoff_max_s
+
+        self.added_at = time.monotonic()
+        self.due = 0.0          # ближайший дедлайн (time.monotonic())
+        self.running = False
+        self.removed = False
+
+        # статистика
+        self.calls = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.overruns = 0
+        self.last_error: Optional[str] = None
+        self._done_times: deque = deque()
+        self._latencies: deque = deque(maxlen=self.LATENCY_SAMPLES)
+
+    def next_delay(self) -> float:
+        """Интервал до следующего опроса с учётом backoff."""
+        if not self.consecutive_errors:
+            return self.interval_s
+        return min(self.interval_s * (2 ** self.consecutive_errors), self.backoff_max_s)
+
+    def record(self, started: float, finished: float) -> None:
+        self.calls += 1
+        self._latencies.append(finished - started)
+        self._done_times.append(finished)
+        edge = finished - self.RATE_WINDOW_S
+        while self._done_times and self._done_times[0] < edge:
+            self._done_times.popleft()
+
+    def stats(self) -> dict:
+        # копии снимаются одним вызовом C — поток пула может дописывать параллельно
+        lat = sorted(self._latencies)
+        n = len(lat)
+        now = time.monotonic()
+        edge = now - self.RATE_WINDOW_S
+        done = [t for t in list(self._done_times) if t >= edge]
+        # только что добавленное задание: окно — время с момента добавления
+        window = max(1e-3, min(self.RATE_WINDOW_S, now - self.added_at))
+        return {
+            "interval_s": self.interval_s,
+            "rate_hz": len(done) / window,
+            "calls": self.calls,
+            "errors": self.errors,
+            "consecutive_errors": self.consecutive_errors,
+            "backoff_s": self.next_delay() if self.consecutive_errors else 0.0,
+            "overruns": self.overruns,
+            "lat_avg_ms": (sum(lat) / n * 1000.0) if n else 0.0,
+            "lat_p95_ms": (lat[min(n - 1, int(n * 0.95))] * 1000.0) if n else 0.0,
+            "lat_max_ms": (lat[-1] * 1000.0) if n else 0.0,
+            "last_error": self.last_error,
+        }
+
+
+class PollScheduler:
+    """
+    workers — потоков пула (не меньше числа одновременно опрашиваемых
+              приборов, иначе медленный прибор задерживает остальных)
+    """
+
+    def __init__(self, workers: int = 4):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="poll")
+        self._lock = threading.Lock()
+        self._cv = threading.Condition(self._lock)
+        self._jobs: Dict[str, PollJob] = {}
+        self._heap: List[tuple] = []   # (due, seq, job)
+        self._seq = 0
+
+        self._thread = threading.Thread(target=self._run, name="poll-scheduler", daemon=True)
+        self._thread.start()
+
+    # ----------------------------------------------------------
+    # API (из любого потока)
+    # ----------------------------------------------------------
+    def add(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        interval_s: float,
+        on_result: Optional[Callable[[Any], None]] = None,
+        on_error: Optional[Callable[[Exception], None]] = None,
+        backoff_max_s: float = 5.0,
+    ) -> PollJob:
+        """
+        Зарегистрировать опрос (задание с тем же именем заменяется).
+        Первый опрос — сразу.
+        """
+        job = PollJob(name, func, interval_s, on_result, on_error, backoff_max_s)
+        with self._cv:
+            old = self._jobs.get(name)
+            if old is not None:
+                old.removed = True
+            self._jobs[name] = job
+            job.due = time.monotonic()
+            self._push_locked(job)
+            self._cv.notify()
+        return job
+
+    def remove(self, name: str) -> None:
+        """Снять опрос. Уже идущий вызов доработает, его результат не доставляется."""
+        with self._cv:
+            job = self._jobs.pop(name, None)
+            if job is not None:
+                job.removed = True
+
+    def set_interval(self, name: str, interval_s: float) -> None:
+        with self._cv:
+            job = self._jobs.get(name)
+            if job is not None:
+                job.interval_s = interval_s
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {job.name: job.stats() for job in jobs}
+
+    def format_stats(self) -> str:
+        """Короткая строка для статус-строки: имя частота/с задержка."""
+        parts = []
+        for name, st in sorted(self.stats().items()):
+            s = f"{name} {st['rate_hz']:.1f}/s {st['lat_avg_ms']:.0f} мс"
+            if st["consecutive_errors"]:
+                s += f" (ошибки, пауза {st['backoff_s']:.1f} с)"
+            parts.append(s)
+        return " | ".join(parts)
+
+    # ----------------------------------------------------------
+    # Поток диспетчера
+    # ----------------------------------------------------------
+    def _push_locked(self, job: PollJob) -> None:
+        self._seq += 1
+        heapq.heappush(self._heap, (job.due, self._seq, job))
+
+    def _run(self) -> None:
+        while True:
+            with self._cv:
+                while True:
+                    # выбросить снятые задания с вершины
+                    while self._heap and self._heap[0][2].removed:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._cv.wait()
+                        continue
+                    due = self._heap[0][0]
+                    delay = due - time.monotonic()
+                    if delay <= 0:
+                        break
+                    self._cv.wait(delay)
+                _, _, job = heapq.heappop(self._heap)
+                job.running = True
+            try:
+                self._pool.submit(self._execute, job)
+            except RuntimeError:
+                # пул остановлен — интерпретатор завершается
+                return
+
+    def _execute(self, job: PollJob) -> None:
+        started = time.monotonic()
+        result = None
+        error: Optional[Exception] = None
+        try:
+            result = job.func()
+        except Exception as e:
+            error = e
+        finished = time.monotonic()
+
+        job.record(started, finished)
+        if error is None:
+            job.consecutive_errors = 0
+        else:
+            job.errors += 1
+            job.consecutive_errors += 1
+            job.last_error = str(error)
+
+        if not job.removed:
+            try:
+                if error is None:
+                    if job.on_result is not None:
+                        job.on_result(result)
+                elif job.on_error is not None:
+                    job.on_error(error)
+            except Exception as e:
+                print(f"PollScheduler: ошибка обработчика '{job.name}': {e}")
+
+        with self._cv:
+            job.running = False
+            if job.removed:
+                return
+            if job.consecutive_errors:
+                # backoff — от момента ошибки
+                job.due = finished + job.next_delay()
+            else:
+                # следующая точка сетки дедлайнов; пропущенные — не догоняем
+                nxt = job.due + job.interval_s
+                if nxt < finished:
+                    missed = int((finished - nxt) / job.interval_s) + 1
+                    job.overruns += missed
+                    nxt += missed * job.interval_s
+                job.due = nxt
+            self._push_locked(job)
+            self._cv.notify()
+
+
+_scheduler: Optional[PollScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> PollScheduler:
+    """Единственный на процесс планировщик (создаётся при первом обращении)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = PollScheduler()
+        return _scheduler
@@ -0,0 +1,177 @@
+# util/port_registry.py
+"""
+Общий реестр COM-портов: одно перечисление на всё приложение.
+
+Раньше каждая панель (MPPT, ЛБП, нагрузка) сама вызывала
+list_ports.comports(), а автоконнект MPPT — каждые 500 мс, пока порт не
+открыт. Теперь перечисляет только фоновый поток реестра:
+    - раз в poll_interval_s (или сразу по rescan()) снимает список портов;
+    - сравнивает с прошлым снимком (по device + описанию/hwid);
+    - при изменении (подключили/вынули адаптер) уведомляет подписчиков;
+    - остальные берут готовый снимок через ports() — без обращения к ОС.
+На Linux, если установлен pyudev, событие tty-подсистемы будит поток сразу,
+без ожидания очередного опроса.
+
+Подписчик вызывается ИЗ ФОНОВОГО ПОТОКА реестра:
+    cb(ports, added, removed) — ports: полный список ListPortInfo,
+                                added/removed: списки имён устройств.
+GUI-панели переносят вызов в Tk-поток сами (gui.ui_queue.UiQueue.post).
+
+    from util.port_registry import get_registry
+    reg = get_registry()
+    reg.subscribe(lambda ports, added, removed: ui.post(apply, ports))
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+from typing import Callable, List, Optional, Tuple
+
+Subscriber = Callable[[list, List[str], List[str]], None]
+
+
+def _port_key(p) -> Tuple[str, str, str]:
+    return (p.device, p.description or "", p.hwid or "")
+
+
+class PortRegistry:
+    """
+    poll_interval_s — период опроса ОС, с
+    """
+
+    def __init__(self, poll_interval_s: float = 1.0):
+        self.poll_interval_s = poll_interval_s
+
+        self._lock = threading.Lock()
+        self._ports: Optional[list] = None     # последний снимок (None — ещё не снимали)
+        self._keys: frozenset = frozenset()
+        self._subs: List[Subscriber] = []
+        self._wake = threading.Event()
+        self._force_notify = False
+        self._scanned = threading.Event()
+
+        # счётчики
+        self.scans = 0
+        self.changes = 0
+
+        self._thread = threading.Thread(target=self._run, name="port-registry", daemon=True)
+        self._thread.start()
+        self._start_udev()
+
+    # ----------------------------------------------------------
+    # API (из любого потока)
+    # ----------------------------------------------------------
+    def ports(self, wait_s: float = 2.0) -> list:
+        """
+        Последний снимок портов. Если реестр ещё ни разу не опрашивал ОС —
+        ждёт первого снимка (не дольше wait_s).
+        """
+        if self._ports is None:
+            self._scanned.wait(wait_s)
+        return list(self._ports or [])
+
+    def subscribe(self, cb: Subscriber) -> None:
+        """Подписаться на изменения. Если снимок уже есть — cb сразу получает его."""
+        with self._lock:
+            self._subs.append(cb)
+            ports = self._ports
+        if ports is not None:
+            self._notify_one(cb, list(ports), [], [])
+
+    def unsubscribe(self, cb: Subscriber) -> None:
+        with self._lock:
+            if cb in self._subs:
+                self._subs.remove(cb)
+
+    def rescan(self) -> None:
+        """
+        Опросить ОС сейчас (кнопка «Обновить»). Подписчики получат снимок,
+        даже если ничего не изменилось. Несколько вызовов подряд — один опрос.
+        """
+        with self._lock:
+            self._force_notify = True
+        self._wake.set()
+
+    def stats(self) -> dict:
+        return {"scans": self.scans, "changes": self.changes, "ports": len(self._ports or [])}
+
+    # ----------------------------------------------------------
+    # Фоновый поток
+    # ----------------------------------------------------------
+    def _run(self) -> None:
+        while True:
+            self._scan()
+            self._wake.wait(self.poll_interval_s)
+            self._wake.clear()
+
+    def _scan(self) -> None:
+        try:
+            from serial.tools import list_ports
+
+            ports = list(list_ports.comports())
+        except Exception:
+            ports = []
+        self.scans += 1
+
+        keys = frozenset(_port_key(p) for p in ports)
+        with self._lock:
+            first = self._ports is None
+            old_devices = {k[0] for k in self._keys}
+            changed = keys != self._keys
+            force = self._force_notify
+            self._force_notify = False
+            self._ports = ports
+            self._keys = keys
+            subs = list(self._subs)
+        self._scanned.set()
+
+        if not (changed or force or first):
+            return
+        if changed and not first:
+            self.changes += 1
+
+        new_devices = {k[0] for k in keys}
+        added = sorted(new_devices - old_devices)
+        removed = sorted(old_devices - new_devices)
+        for cb in subs:
+            self._notify_one(cb, list(ports), added, removed)
+
+    @staticmethod
+    def _notify_one(cb: Subscriber, ports: list, added: List[str], removed: List[str]) -> None:
+        try:
+            cb(ports, added, removed)
+        except Exception as e:
+            print(f"PortRegistry: ошибка подписчика: {e}")
+
+    def _start_udev(self) -> None:
+        """Linux + pyudev: будить опрос по событию tty, не дожидаясь таймера."""
+        if not sys.platform.startswith("linux"):
+            return
+        try:
+            import pyudev
+        except ImportError:
+            return
+        try:
+            context = pyudev.Context()
+            monitor = pyudev.Monitor.from_netlink(context)
+            monitor.filter_by(subsystem="tty")
+            observer = pyudev.MonitorObserver(monitor, callback=lambda device: self._wake.set())
+            observer.daemon = True
+            observer.start()
+        except Exception:
+            # нет доступа к netlink и т.п. — хватит опроса
+            pass
+
+
+_registry: Optional[PortRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> PortRegistry:
+    """Единственный на процесс реестр (создаётся при первом обращении)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = PortRegistry()
+        return _registry
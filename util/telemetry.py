@@ -0,0 +1,474 @@
+# util/telemetry.py
+"""
+Синхронная по времени телеметрия всех приборов: ЛБП (U/I), нагрузка (V/I),
+числовые поля кадров MPPT.
+
+- у каждого источника свой кольцевой буфер на заранее выделенных массивах
+  NumPy (время + столбцы полей): память ограничена capacity строк на
+  источник, сколько бы ни длился прогон;
+- время — time.monotonic() у всех источников, поэтому отсчёты разных
+  приборов сопоставимы; привязка к настенным часам (t0_wall/t0_mono)
+  пишется в meta.json сессии;
+- пока идёт запись (start_session), фоновый поток раз в flush_interval_s
+  (или когда накопилось flush_rows строк) сбрасывает НОВЫЕ строки каждого
+  источника пачкой в отдельный файл-чанк: <сессия>/<источник>_00000.npz
+  (или .csv) — столбцы t, <поле>, <поле>…; в имени файла источник без
+  разделителей пути и ":" ("mppt./dev/ttyACM0" → "mppt._dev_ttyACM0"),
+  исходное имя и имя файла — в meta.json ("files");
+- если диск не успевает и кольцо переписывает несброшенные строки,
+  они считаются в dropped (в файл не попадут, но память не растёт);
+- без сессии буферы всё равно наполняются — их читают живые графики
+  (window / latest).
+
+    hub = get_telemetry()
+    hub.register("psu", ("u", "i"))
+    hub.record("psu", (12.01, 0.53))          # из любого потока
+    hub.start_session()                        # запись на диск
+    t, cols = hub.window("psu", seconds=30)    # последние 30 с
+
+Чтение записанной сессии: load_session(path) → {источник: (t, {поле: массив})}.
+"""
+
+from __future__ import annotations
+
+import csv
+import glob
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from util.fileutil import get_telemetry_session_dir
+
+# Источники приборов и их поля (единицы — как отдаёт прибор / кадр MPPT)
+PSU_SOURCE = "psu"
+PSU_FIELDS = ("u", "i")
+LOAD_SOURCE = "load"
+LOAD_FIELDS = ("v", "i")
+MPPT_SOURCE = "mppt"
+
+# numpy импортируется при первом кольцевом буфере (_numpy()), а не при импорте
+# модуля: util.telemetry импортируют все панели, а numpy на пути старта окна не нужен.
+# Методы RingBuffer берут модульный np — буфер без _numpy() не создаётся.
+np = None
+
+
+def _numpy():
+    global np
+    if np is None:
+        import numpy
+
+        np = numpy
+    return np
+
+
+_UNSAFE_FILE_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+
+
+def source_file_prefix(source: str) -> str:
+    """Имя источника для файлов чанков: порт станции (/dev/ttyACM0, COM5) без разделителей пути."""
+    return _UNSAFE_FILE_CHARS.sub("_", source)
+
+
+def _empty() -> Tuple[np.ndarray, np.ndarray]:
+    """(t, values) источника, которого нет."""
+    np = _numpy()
+    return np.empty(0), np.empty((0, 0))
+
+
+class RingBuffer:
+    """
+    Кольцо фиксированной ёмкости: t (float64) + values (capacity × n_fields, float64).
+    written — сколько строк записано всего, flushed — сколько из них уже на диске.
+    """
+
+    def __init__(self, fields: Sequence[str], capacity: int):
+        np = _numpy()
+        self.fields = tuple(fields)
+        self.capacity = capacity
+        self.t = np.zeros(capacity, dtype=np.float64)
+        self.values = np.full((capacity, len(self.fields)), np.nan, dtype=np.float64)
+        self.written = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.lock = threading.Lock()
+
+    def append(self, t: float, values: Sequence[float]) -> None:
+        with self.lock:
+            idx = self.written % self.capacity
+            self.t[idx] = t
+            self.values[idx] = values
+            self.written += 1
+            # несброшенные строки переписаны — сдвигаем границу, считаем потерю
+            lost = self.written - self.flushed - self.capacity
+            if lost > 0:
+                self.dropped += lost
+                self.flushed += lost
+
+    def _slice(self, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Копия строк [start, stop) по сквозной нумерации (под lock)."""
+        n = stop - start
+        if n <= 0:
+            return np.empty(0), np.empty((0, len(self.fields)))
+        idx = np.arange(start, stop) % self.capacity
+        return self.t[idx], self.values[idx]
+
+    def take_unflushed(self) -> Tuple[int, np.ndarray, np.ndarray]:
+        """Забрать несброшенные строки: (номер первой строки, t, values)."""
+        with self.lock:
+            start, stop = self.flushed, self.written
+            t, v = self._slice(start, stop)
+            self.flushed = stop
+        return start, t, v
+
+    def read_from(self, index: int) -> Tuple[int, np.ndarray, np.ndarray]:
+        """
+        Строки начиная со сквозного номера index (что уже переписано — пропускается).
+        Возвращает (номер следующей строки, t, values) — для инкрементального чтения.
+        """
+        with self.lock:
+            stop = self.written
+            start = max(index, stop - self.capacity)
+            t, v = self._slice(start, stop)
+        return stop, t, v
+
+    def latest(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        with self.lock:
+            stop = self.written
+            start = max(0, stop - min(n, self.capacity))
+            return self._slice(start, stop)
+
+    def since(self, t_from: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Строки с t >= t_from (в пределах кольца)."""
+        with self.lock:
+            stop = self.written
+            start = max(0, stop - self.capacity)
+            t, v = self._slice(start, stop)
+        mask = t >= t_from
+        return t[mask], v[mask]
+
+
+class TelemetryHub:
+    """
+    capacity         — строк в кольце каждого источника
+    flush_rows       — сбрасывать источник, когда накопилось столько строк
+    flush_interval_s — и не реже, чем раз в столько секунд
+    fmt              — "npz" или "csv"
+    """
+
+    def __init__(
+        self,
+        capacity: int = 65536,
+        flush_rows: int = 4096,
+        flush_interval_s: float = 30.0,
+        fmt: str = "npz",
+    ):
+        if fmt not in ("npz", "csv"):
+            raise ValueError(f"неизвестный формат телеметрии: {fmt}")
+        self.capacity = capacity
+        self.flush_rows = flush_rows
+        self.flush_interval_s = flush_interval_s
+        self.fmt = fmt
+
+        self._rings: Dict[str, RingBuffer] = {}
+        self._lock = threading.Lock()
+        self._chunks: Dict[str, int] = {}
+        self._prefixes: Dict[str, str] = {}  # источник → имя в файлах чанков
+
+        self.session_dir: Optional[str] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # счётчики
+        self.chunks_written = 0
+        self.rows_written = 0
+
+    # ----------------------------------------------------------
+    # Источники и отсчёты (из любого потока)
+    # ----------------------------------------------------------
+    def register(self, source: str, fields: Sequence[str]) -> RingBuffer:
+        """Завести источник (повторная регистрация с теми же полями — без изменений)."""
+        with self._lock:
+            ring = self._rings.get(source)
+            if ring is not None:
+                if ring.fields != tuple(fields):
+                    raise ValueError(f"телеметрия '{source}': поля {ring.fields} ≠ {tuple(fields)}")
+                return ring
+            ring = RingBuffer(fields, self.capacity)
+            self._rings[source] = ring
+            prefix = base = source_file_prefix(source)
+            taken = set(self._prefixes.values())
+            k = 2
+            while prefix in taken:
+                prefix = f"{base}-{k}"
+                k += 1
+            self._prefixes[source] = prefix
+        # источник появился посреди записи (новая станция MPPT) — обновить meta.json
+        session = self.session_dir
+        if session is not None:
+            self._write_meta(session)
+        return ring
+
+    def record(self, source: str, values: Sequence[float], t: Optional[float] = None) -> None:
+        """Отсчёт источника; t — time.monotonic() момента измерения (по умолчанию — сейчас)."""
+        ring = self._rings.get(source)
+        if ring is None:
+            return
+        ring.append(time.monotonic() if t is None else t, values)
+        if self.session_dir is not None and ring.written - ring.flushed >= self.flush_rows:
+            self._wake.set()
+
+    def record_mppt(self, values: Sequence[str], station: Optional[str] = None) -> None:
+        """
+        Кадр MPPT (значения колонок LOG_HEADER, строки) → числовые поля.
+        Станции многостанционного режима — отдельные источники "mppt.<порт>".
+        """
+        source = MPPT_SOURCE if station is None else f"{MPPT_SOURCE}.{station}"
+        ring = self._rings.get(source)
+        if ring is None:
+            ring = self.register(source, mppt_fields())
+        sample = []
+        for col in _mppt_columns():
+            try:
+                sample.append(float(values[col]))
+            except (IndexError, ValueError, TypeError):
+                sample.append(float("nan"))
+        self.record(source, sample)
+
+    def sources(self) -> Dict[str, Tuple[str, ...]]:
+        with self._lock:
+            return {name: ring.fields for name, ring in self._rings.items()}
+
+    def latest(self, source: str, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        ring = self._rings.get(source)
+        if ring is None:
+            return _empty()
+        return ring.latest(n)
+
+    def read_from(self, source: str, index: int) -> Tuple[int, np.ndarray, np.ndarray]:
+        """Новые строки источника после прошлого чтения (см. RingBuffer.read_from)."""
+        ring = self._rings.get(source)
+        if ring is None:
+            return (index,) + _empty()
+        return ring.read_from(index)
+
+    def since(self, source: str, t_from: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Отсчёты источника с t >= t_from (в пределах кольца)."""
+        ring = self._rings.get(source)
+        if ring is None:
+            return _empty()
+        return ring.since(t_from)
+
+    def window(self, source: str, seconds: float, now: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Отсчёты источника за последние seconds секунд."""
+        ring = self._rings.get(source)
+        if ring is None:
+            return _empty()
+        now = time.monotonic() if now is None else now
+        return ring.since(now - seconds)
+
+    # ----------------------------------------------------------
+    # Запись на диск
+    # ----------------------------------------------------------
+    @property
+    def recording(self) -> bool:
+        return self.session_dir is not None
+
+    def start_session(self, base_dir: Optional[str] = None) -> str:
+        """Начать запись: новые отсчёты (с этого момента) сбрасываются в каталог сессии."""
+        if self.session_dir is not None:
+            return self.session_dir
+        session = get_telemetry_session_dir(base_dir)
+        # до начала сессии — только для живых графиков, в файл не пишем
+        for ring in list(self._rings.values()):
+            with ring.lock:
+                ring.flushed = ring.written
+        self._chunks = {}
+        self._write_meta(session)
+        self.session_dir = session
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="telemetry-flush", daemon=True)
+        self._thread.start()
+        return session
+
+    def stop_session(self, timeout: Optional[float] = 10.0) -> Optional[str]:
+        """Сбросить хвост и закончить запись. Возвращает каталог сессии."""
+        session = self.session_dir
+        if session is None:
+            return None
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+        self.session_dir = None
+        return session
+
+    def stats(self) -> dict:
+        with self._lock:
+            rings = dict(self._rings)
+        return {
+            "recording": self.recording,
+            "session_dir": self.session_dir,
+            "chunks": self.chunks_written,
+            "rows": self.rows_written,
+            "sources": {
+                name: {"written": r.written, "pending": r.written - r.flushed, "dropped": r.dropped}
+                for name, r in rings.items()
+            },
+        }
+
+    def _write_meta(self, session: str) -> None:
+        """
+        meta.json сессии. Под self._lock: источники регистрируются из потоков
+        станций одновременно (первые кадры), и каждый поток переписывает файл;
+        временный файл — свой у каждого потока.
+        """
+        path = os.path.join(session, "meta.json")
+        with self._lock:
+            if os.path.exists(path):
+                # перезапись при новом источнике — привязка времени прежняя
+                with open(path, encoding="utf-8") as f:
+                    old = json.load(f)
+                t0_wall, t0_mono = old["t0_wall"], old["t0_mono"]
+            else:
+                t0_wall = datetime.now().isoformat(timespec="milliseconds")
+                t0_mono = time.monotonic()
+            meta = {
+                "t0_wall": t0_wall,
+                "t0_mono": t0_mono,
+                "format": self.fmt,
+                "sources": {name: list(ring.fields) for name, ring in self._rings.items()},
+                "files": dict(self._prefixes),
+            }
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, path)
+
+    def _run(self) -> None:
+        session = self.session_dir
+        while True:
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            stopping = self._stop.is_set()
+            self.flush(session)
+            if stopping:
+                return
+
+    def flush(self, session: Optional[str] = None) -> int:
+        """Сбросить несброшенные строки всех источников. Возвращает число строк."""
+        session = session or self.session_dir
+        if session is None:
+            return 0
+        with self._lock:
+            rings = dict(self._rings)
+        total = 0
+        for name, ring in rings.items():
+            _, t, v = ring.take_unflushed()
+            if not len(t):
+                continue
+            try:
+                self._write_chunk(session, name, ring.fields, t, v)
+            except OSError as e:
+                # диск недоступен — строки потеряны, но запись не падает
+                with ring.lock:
+                    ring.dropped += len(t)
+                print(f"Телеметрия: ошибка записи {name}: {e}")
+                continue
+            total += len(t)
+        self.rows_written += total
+        return total
+
+    def _write_chunk(self, session: str, source: str, fields, t: np.ndarray, v: np.ndarray) -> None:
+        n = self._chunks.get(source, 0)
+        self._chunks[source] = n + 1
+        base = os.path.join(session, f"{self._prefixes[source]}_{n:05d}")
+        tmp = f"{base}.tmp"
+        if self.fmt == "npz":
+            arrays = {"t": t}
+            for i, field in enumerate(fields):
+                arrays[field] = v[:, i]
+            with open(tmp, "wb") as f:
+                np.savez(f, **arrays)
+            os.replace(tmp, base + ".npz")
+        else:
+            with open(tmp, "w", encoding="utf-8", newline="") as f:
+                w = csv.writer(f)
+                w.writerow(("t",) + tuple(fields))
+                for ti, row in zip(t.tolist(), v.tolist()):
+                    w.writerow([repr(ti)] + [repr(x) for x in row])
+            os.replace(tmp, base + ".csv")
+        self.chunks_written += 1
+
+
+def load_session(path: str) -> Dict[str, Tuple[np.ndarray, Dict[str, np.ndarray]]]:
+    """Собрать записанную сессию: {источник: (t, {поле: массив})} (чанки по порядку)."""
+    np = _numpy()
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    fmt = meta.get("format", "npz")
+    prefixes = meta.get("files", {})
+    result = {}
+    for source, fields in meta.get("sources", {}).items():
+        prefix = prefixes.get(source) or source_file_prefix(source)
+        files = sorted(glob.glob(os.path.join(glob.escape(path), f"{glob.escape(prefix)}_{'[0-9]' * 5}.{fmt}")))
+        ts: List[np.ndarray] = []
+        cols: Dict[str, List[np.ndarray]] = {f: [] for f in fields}
+        for fn in files:
+            if fmt == "npz":
+                with np.load(fn) as z:
+                    ts.append(z["t"])
+                    for field in fields:
+                        cols[field].append(z[field])
+            else:
+                data = np.loadtxt(fn, delimiter=",", skiprows=1, ndmin=2)
+                ts.append(data[:, 0])
+                for i, field in enumerate(fields):
+                    cols[field].append(data[:, i + 1])
+        t = np.concatenate(ts) if ts else np.empty(0)
+        result[source] = (t, {f: (np.concatenate(c) if c else np.empty(0)) for f, c in cols.items()})
+    return result
+
+
+def _mppt_rules() -> List[Tuple[str, int]]:
+    from mppt.logger import FIELD_RULES
+
+    return [(label, col) for label, col, mode in FIELD_RULES if mode == "number"]
+
+
+def mppt_fields() -> Tuple[str, ...]:
+    """Числовые поля кадра MPPT (mode "number" в FIELD_RULES)."""
+    return tuple(label for label, _col in _mppt_rules())
+
+
+_mppt_cols: Optional[Tuple[int, ...]] = None
+
+
+def _mppt_columns() -> Tuple[int, ...]:
+    """Индексы числовых полей в строке LOG_HEADER (кэшируются)."""
+    global _mppt_cols
+    if _mppt_cols is None:
+        _mppt_cols = tuple(col for _label, col in _mppt_rules())
+    return _mppt_cols
+
+
+_hub: Optional[TelemetryHub] = None
+_hub_lock = threading.Lock()
+
+
+def get_telemetry() -> TelemetryHub:
+    """Единственный на процесс хаб телеметрии (источники приборов заведены заранее)."""
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = TelemetryHub()
+            _hub.register(PSU_SOURCE, PSU_FIELDS)
+            _hub.register(LOAD_SOURCE, LOAD_FIELDS)
+            _hub.register(MPPT_SOURCE, mppt_fields())
+        return _hub
@@ -0,0 +1,63 @@
+# util/warmup.py
+"""
+Фоновый прогрев тяжёлых модулей после показа окна.
+
+Бэкенды приборов (pyvisa, owon_psu, serial.tools.list_ports) и openpyxl
+импортируются лениво — при первом обращении. Чтобы первое нажатие
+«Подключить» не ждало импорта, после старта GUI они импортируются
+в фоновом daemon-потоке. Если модуль к этому моменту уже нужен GUI-потоку,
+тот просто дождётся его импорта (блокировка импорта модуля в Python).
+
+Отсутствующий модуль не ошибка: прибор просто не будет доступен.
+"""
+
+from __future__ import annotations
+
+import importlib
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+# Модули, которые не нужны до первого кадра MPPT.
+# Список продублирован в hiddenimports main.spec — импорт по строке
+# PyInstaller сам не видит.
+WARMUP_MODULES = (
+    "serial.tools.list_ports",
+    "openpyxl",
+    "owon_psu",
+    "pyvisa",
+)
+
+
+def warm_up(modules: Iterable[str] = WARMUP_MODULES) -> Dict[str, Optional[float]]:
+    """Импортировать модули по очереди. Возвращает {модуль: секунды или None — не найден}."""
+    timings: Dict[str, Optional[float]] = {}
+    for name in modules:
+        t0 = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except Exception:
+            timings[name] = None
+            continue
+        timings[name] = time.perf_counter() - t0
+    return timings
+
+
+def start_warmup(
+    modules: Iterable[str] = WARMUP_MODULES,
+    on_done: Optional[Callable[[Dict[str, Optional[float]]], None]] = None,
+) -> threading.Thread:
+    """
+    Запустить warm_up в фоновом потоке.
+    on_done(timings) вызывается из фонового потока.
+    """
+    modules = tuple(modules)
+
+    def run():
+        timings = warm_up(modules)
+        if on_done is not None:
+            on_done(timings)
+
+    t = threading.Thread(target=run, name="warmup", daemon=True)
+    t.start()
+    return t